@@ -1,36 +1,139 @@
-from flask import Flask, render_template, request
+import json
+from flask import Flask, Response, render_template, request
 
 app = Flask(__name__)
 
-def int_to_roman(num):
+MIN_NUMBER = 1
+MAX_NUMBER = 3999
+# Extended mode writes the thousands with an overline (vinculum): V̅ = 5000
+MAX_EXTENDED_NUMBER = 3_999_999
+OVERLINE = '\u0305'
+# Most numbers one /api/convert request may ask for
+MAX_CONVERSIONS = 1_000_000
+# Larger responses are streamed, STREAM_CHUNK entries at a time
+STREAM_THRESHOLD = 1000
+STREAM_CHUNK = 1000
+
+def _build_table():
+    """Roman numerals of 0..3999 (index 0 is ""), composed digit by digit."""
+    thousands = ['', 'M', 'MM', 'MMM']
+    hundreds = ['', 'C', 'CC', 'CCC', 'CD', 'D', 'DC', 'DCC', 'DCCC', 'CM']
+    tens = ['', 'X', 'XX', 'XXX', 'XL', 'L', 'LX', 'LXX', 'LXXX', 'XC']
+    ones = ['', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX']
+    return tuple(thousands[n // 1000] + hundreds[n // 100 % 10] + tens[n // 10 % 10] + ones[n % 10]
+                 for n in range(MAX_NUMBER + 1))
+
+def _overline(numeral):
+    return ''.join(symbol + OVERLINE for symbol in numeral)
+
+# Built once at import; a conversion is a tuple lookup
+ROMAN_NUMERALS = _build_table()
+# The same table as ready-made /api/convert result entries
+_JSON_RESULTS = tuple(f'{{"number":{n},"roman":"{roman}"}}' for n, roman in enumerate(ROMAN_NUMERALS))
+# The way back. Only canonical numerals are keys, so a lookup also validates.
+_ROMAN_VALUES = {roman: n for n, roman in enumerate(ROMAN_NUMERALS)}
+# Overlined thousands of extended mode: I̅V̅ = 4000 up to M̅M̅M̅C̅M̅X̅C̅I̅X̅ = 3999000
+_OVERLINED_VALUES = {_overline(roman): n * 1000 for n, roman in enumerate(ROMAN_NUMERALS) if n > MAX_NUMBER // 1000}
+
+def int_to_roman(num, extended=False):
     """
     Convert an integer to a Roman numeral.
-    :param num: Integer to convert (1 <= num <= 3999)
+    :param num: Integer to convert (1 <= num <= 3999, or 3999999 if extended)
+    :param extended: Write numbers from 4000 up with overlined thousands
     :return: Roman numeral as a string
     """
-    if not (1 <= num <= 3999):
-        raise ValueError("Number must be between 1 and 3999")
-
-    roman_numerals = {
-        1000: 'M', 900: 'CM', 500: 'D', 400: 'CD',
-        100: 'C', 90: 'XC', 50: 'L', 40: 'XL',
-        10: 'X', 9: 'IX', 5: 'V', 4: 'IV', 1: 'I'
-    }
-
-    result = ""
-    for value, numeral in roman_numerals.items():
-        while num >= value:
-            result += numeral
-            num -= value
-    return result
+    if extended and MAX_NUMBER < num <= MAX_EXTENDED_NUMBER:
+        return _overline(ROMAN_NUMERALS[num // 1000]) + ROMAN_NUMERALS[num % 1000]
+    if not (MIN_NUMBER <= num <= MAX_NUMBER):
+        raise ValueError(f"Number must be between 1 and {MAX_EXTENDED_NUMBER if extended else MAX_NUMBER}")
+    return ROMAN_NUMERALS[num]
+
+def roman_to_int(numeral, extended=False):
+    """
+    Convert a Roman numeral to an integer.
+    Only the canonical form is accepted, the one int_to_roman returns:
+    IV and MCM are valid, IIII, VX and IM are not.
+    :param numeral: Roman numeral, in upper or lower case
+    :param extended: Also accept overlined thousands for numbers from 4000 up
+    :return: Integer (1 <= result <= 3999, or 3999999 if extended)
+    """
+    text = numeral.strip().upper() if isinstance(numeral, str) else ''
+    split = text.rfind(OVERLINE) + 1 if extended else 0
+    number = _ROMAN_VALUES.get(text[split:])
+    if split and number is not None:
+        # below 1000 after the overlined thousands, so no M
+        thousands = _OVERLINED_VALUES.get(text[:split])
+        number = thousands + number if thousands and number < 1000 else None
+    if not number:
+        raise ValueError(f"{numeral!r} is not a valid Roman numeral")
+    return number
+
+def parse_numbers(items, maximum=MAX_NUMBER):
+    """
+    Turn the "numbers" of an /api/convert request into a list of ints and ranges.
+    :param items: List of integers and "start-end" strings (inclusive ranges)
+    :param maximum: Largest number allowed
+    :return: (list of int or range, total count of numbers)
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('"numbers" must be a non-empty list')
+    numbers = []
+    total = 0
+    for position, item in enumerate(items):
+        if isinstance(item, int) and not isinstance(item, bool):
+            start = end = item
+        elif isinstance(item, str) and item.count('-') == 1 and all(part.strip().isdigit() for part in item.split('-')):
+            start, end = (int(part) for part in item.split('-'))
+            if start > end:
+                raise ValueError(f'numbers[{position}]: range "{item}" is empty')
+        else:
+            raise ValueError(f'numbers[{position}]: expected an integer or a "start-end" range')
+        if start < MIN_NUMBER or end > maximum:
+            raise ValueError(f'numbers[{position}]: numbers must be between {MIN_NUMBER} and {maximum}, inclusively')
+        numbers.append(start if start == end else range(start, end + 1))
+        total += end - start + 1
+        if total > MAX_CONVERSIONS:
+            raise ValueError(f'At most {MAX_CONVERSIONS} numbers can be converted per request')
+    return numbers, total
+
+def _result(number):
+    if number <= MAX_NUMBER:
+        return _JSON_RESULTS[number]
+    return f'{{"number":{number},"roman":"{int_to_roman(number, extended=True)}"}}'
+
+def _results(numbers):
+    for item in numbers:
+        if isinstance(item, range):
+            yield from _JSON_RESULTS[item.start:min(item.stop, MAX_NUMBER + 1)]
+            yield from map(_result, range(max(item.start, MAX_NUMBER + 1), item.stop))
+        else:
+            yield _result(item)
+
+def _stream_results(numbers):
+    yield '{"results":['
+    chunk = []
+    separator = ''
+    for result in _results(numbers):
+        chunk.append(result)
+        if len(chunk) == STREAM_CHUNK:
+            yield separator + ','.join(chunk)
+            separator = ','
+            chunk = []
+    if chunk:
+        yield separator + ','.join(chunk)
+    yield ']}'
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         user_input = request.form.get('number')
-        # Check if the input is a digit
+        # Not a number: convert a Roman numeral back to one
         if not user_input.isdigit():
-            return render_template('index.html', not_valid=True, error="Not Valid! Please enter a number between 1 and 3999, inclusively.")
+            try:
+                number = roman_to_int(user_input)
+            except ValueError:
+                return render_template('index.html', not_valid=True, error="Not Valid! Please enter a number between 1 and 3999, inclusively, or a Roman numeral.")
+            return render_template('result.html', number=number, result=user_input.strip().upper())
 
         number = int(user_input)
         # Check if the number is within the valid range
@@ -42,5 +145,43 @@ def index():
         return render_template('result.html', number=number, result=roman_numeral)
     return render_template('index.html')
 
+# Batch conversion ("extended": true allows numbers up to 3999999):
+#   curl -H 'Content-Type: application/json' -d '{"numbers": [4, 1999, "10-20"]}' http://host/api/convert
+#   -> {"results": [{"number": 4, "roman": "IV"}, {"number": 1999, "roman": "MCMXCIX"}, ...]}
+@app.route('/api/convert', methods=['POST'])
+def api_convert():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        body = {}
+    maximum = MAX_EXTENDED_NUMBER if body.get('extended') is True else MAX_NUMBER
+    try:
+        numbers, total = parse_numbers(body.get('numbers'), maximum)
+    except ValueError as e:
+        return Response(json.dumps({"message": str(e)}), status=400, mimetype='application/json')
+    if total > STREAM_THRESHOLD:
+        return Response(_stream_results(numbers), mimetype='application/json')
+    return Response('{"results":[' + ','.join(_results(numbers)) + ']}', mimetype='application/json')
+
+# Batch conversion back to numbers ("extended": true accepts overlined thousands):
+#   curl -H 'Content-Type: application/json' -d '{"numerals": ["IV", "MCMXCIX"]}' http://host/api/parse
+#   -> {"results": [{"roman": "IV", "number": 4}, {"roman": "MCMXCIX", "number": 1999}]}
+@app.route('/api/parse', methods=['POST'])
+def api_parse():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        body = {}
+    numerals = body.get('numerals')
+    extended = body.get('extended') is True
+    if not isinstance(numerals, list) or not numerals or len(numerals) > MAX_CONVERSIONS:
+        message = f'"numerals" must be a non-empty list of at most {MAX_CONVERSIONS} Roman numerals'
+        return Response(json.dumps({"message": message}), status=400, mimetype='application/json')
+    results = []
+    for position, numeral in enumerate(numerals):
+        try:
+            results.append({"roman": numeral, "number": roman_to_int(numeral, extended)})
+        except ValueError as e:
+            return Response(json.dumps({"message": f"numerals[{position}]: {e}"}), status=400, mimetype='application/json')
+    return Response(json.dumps({"results": results}, ensure_ascii=False), mimetype='application/json')
+
 if __name__ == '__main__':
     app.run(debug=True)
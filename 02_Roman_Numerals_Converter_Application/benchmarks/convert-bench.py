@@ -0,0 +1,87 @@
+# Benchmark: Roman numeral conversion, 1M numbers by default.
+#
+#   loop     - the previous int_to_roman: rebuilds its dict on every call and
+#              concatenates the numeral one symbol at a time
+#   table    - app.int_to_roman, a lookup in the table built at import
+#   api      - one POST /api/convert for all the numbers (as "1-3999" ranges), through
+#              Flask's test client, reading the streamed JSON body
+#   api-old  - just building the same JSON body with the loop and json.dumps, which
+#              is what a batch endpoint on top of the old function would have done
+#
+# Usage:
+#   pip install flask
+#   python benchmarks/convert-bench.py --conversions 1000000
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import app
+
+
+def loop_int_to_roman(num):
+    if not (1 <= num <= 3999):
+        raise ValueError("Number must be between 1 and 3999")
+
+    roman_numerals = {
+        1000: 'M', 900: 'CM', 500: 'D', 400: 'CD',
+        100: 'C', 90: 'XC', 50: 'L', 40: 'XL',
+        10: 'X', 9: 'IX', 5: 'V', 4: 'IV', 1: 'I'
+    }
+
+    result = ""
+    for value, numeral in roman_numerals.items():
+        while num >= value:
+            result += numeral
+            num -= value
+    return result
+
+
+def timed(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversions", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    args = parser.parse_args()
+
+    numbers = [n % 3999 + 1 for n in range(args.conversions)]
+    ranges, rest = divmod(args.conversions, 3999)
+    body = {"numbers": ["1-3999"] * ranges + ([f"1-{rest}"] if rest else [])}
+    client = app.app.test_client()
+    assert [loop_int_to_roman(n) for n in range(1, 4000)] == [app.int_to_roman(n) for n in range(1, 4000)]
+
+    def api():
+        response = client.post("/api/convert", json=body, buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        return size
+
+    def api_old():
+        return len(json.dumps({"results": [{"number": n, "roman": loop_int_to_roman(n)} for n in numbers]}))
+
+    runs = [
+        ("loop", lambda: [loop_int_to_roman(n) for n in numbers]),
+        ("table", lambda: [app.int_to_roman(n) for n in numbers]),
+        ("api-old", api_old),
+        ("api", api),
+    ]
+    print(f"{args.conversions} conversions, best of {args.repeat}")
+    print(f"{'method':<10}{'seconds':>10}{'conversions/s':>16}")
+    for name, run in runs:
+        seconds = timed(run, args.repeat)
+        print(f"{name:<10}{seconds:>10.3f}{args.conversions / seconds:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Checks and benchmark for roman_to_int.
+#
+# First checks these properties, and stops at the first counterexample:
+#   - every number of 1..3999 (and a random sample up to 3999999 in extended mode)
+#     survives int_to_roman -> roman_to_int
+#   - random strings of Roman symbols (some overlined) are accepted exactly when
+#     they are the canonical numeral of the number they are parsed to
+# Then measures numerals parsed per second:
+#   compare   - a plain symbol-by-symbol parser that validates by converting the
+#               result back and comparing it with the input (try-and-compare)
+#   table     - app.roman_to_int, a lookup in the reverse of the numeral table
+#   extended  - app.roman_to_int(extended=True), on numbers up to 3999999
+#
+# Usage:
+#   pip install flask
+#   python benchmarks/parse-bench.py --numerals 1000000
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import app
+
+SYMBOLS = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
+
+
+def compare_roman_to_int(numeral):
+    total = 0
+    for symbol, following in zip(numeral, numeral[1:] + ' '):
+        value = SYMBOLS[symbol]
+        total += -value if value < SYMBOLS.get(following, 0) else value
+    if app.int_to_roman(total) != numeral:
+        raise ValueError(f"{numeral!r} is not a valid Roman numeral")
+    return total
+
+
+def check(samples, rng):
+    for number in range(1, app.MAX_NUMBER + 1):
+        assert app.roman_to_int(app.int_to_roman(number)) == number, number
+        assert app.roman_to_int(app.int_to_roman(number), extended=True) == number, number
+    for number in rng.sample(range(1, app.MAX_EXTENDED_NUMBER + 1), samples):
+        numeral = app.int_to_roman(number, extended=True)
+        assert app.roman_to_int(numeral, extended=True) == number, numeral
+
+    symbols = list(SYMBOLS) + [symbol + app.OVERLINE for symbol in SYMBOLS]
+    accepted = 0
+    for _ in range(samples):
+        numeral = ''.join(rng.choices(symbols, k=rng.randint(1, 8)))
+        for extended in (False, True):
+            try:
+                number = app.roman_to_int(numeral, extended)
+            except ValueError:
+                continue
+            accepted += 1
+            assert app.int_to_roman(number, extended) == numeral, (numeral, number)
+    print(f"round trips and {samples} random strings ok ({accepted} of them canonical)")
+
+
+def timed(parse, numerals):
+    start = time.perf_counter()
+    for numeral in numerals:
+        parse(numeral)
+    return len(numerals) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--numerals", type=int, default=1_000_000)
+    parser.add_argument("--samples", type=int, default=200_000, help="random cases per property")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    check(args.samples, rng)
+
+    numerals = [app.int_to_roman(rng.randint(1, app.MAX_NUMBER)) for _ in range(args.numerals)]
+    extended = [app.int_to_roman(rng.randint(1, app.MAX_EXTENDED_NUMBER), extended=True) for _ in range(args.numerals)]
+    print(f"{'parser':<10}{'numerals/s':>14}")
+    for name, parse, data in [
+        ("compare", compare_roman_to_int, numerals),
+        ("table", app.roman_to_int, numerals),
+        ("extended", lambda numeral: app.roman_to_int(numeral, extended=True), extended),
+    ]:
+        print(f"{name:<10}{timed(parse, data):>14,.0f}")
+
+    # time per numeral should grow no faster than its length
+    print(f"{'symbols':<10}{'ns/numeral':>14}")
+    by_length = {}
+    for numeral in extended:
+        by_length.setdefault(len(numeral), []).append(numeral)
+    for length in sorted(by_length)[::4]:
+        batch = by_length[length][:20_000]
+        if len(batch) < 1000:
+            continue
+        print(f"{length:<10}{1e9 / timed(lambda n: app.roman_to_int(n, extended=True), batch):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Benchmark: Gunicorn worker startup and the Secrets Manager calls it makes.
+#
+# Starts --workers processes at once, like Gunicorn does, and in each one:
+#   boot  - imports app.py. The old app fetched the secret and created/seeded the
+#           table here; now nothing happens until the first request.
+#   first - the first --requests searches (POST / with a keyword), which open the
+#           first database connection
+# and counts the GetSecretValue calls made during boot and during the requests.
+#
+# Secrets Manager is mocked in every worker with moto, and each GetSecretValue call
+# sleeps --latency seconds, about what a call from EC2 takes. The database is a real
+# MySQL server with an "admin" user (app.py always connects as admin), e.g.
+#   docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=secret -e MYSQL_USER=admin \
+#       -e MYSQL_PASSWORD=secret -e MYSQL_DATABASE=emaildb mysql:8
+# With --baseline, the app.py of another commit is measured as well.
+#
+# Usage:
+#   pip install -r requirements.txt moto
+#   python benchmarks/startup-bench.py --workers 8 --password secret --baseline <commit>
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+import ingest
+
+WORKER = """
+import json, os, sys, time
+import boto3
+from moto import mock_aws
+
+latency, requests = float(sys.argv[1]), int(sys.argv[2])
+with mock_aws():
+    boto3.client("secretsmanager", region_name=os.environ["AWS_REGION"]).create_secret(
+        Name=os.environ["SECRET_ARN"], SecretString=os.environ["BENCH_PASSWORD"])
+    calls = []
+
+    def get_secret_value(**kwargs):
+        calls.append(time.perf_counter())
+        time.sleep(latency)
+
+    boto3.DEFAULT_SESSION.events.register("before-call.secrets-manager.GetSecretValue", get_secret_value)
+
+    start = time.perf_counter()
+    import app
+    boot = time.perf_counter() - start
+    boot_calls = len(calls)
+
+    client = app.app.test_client()
+    start = time.perf_counter()
+    for _ in range(requests):
+        assert client.post("/", data={"user_keyword": "d"}).status_code == 200
+    first = time.perf_counter() - start
+    print(json.dumps({"boot": boot, "first": first, "boot_calls": boot_calls, "calls": len(calls)}))
+"""
+
+
+def checkout(ref, target):
+    """Extract this project's directory at `ref` into `target`."""
+    root, prefix = subprocess.run(["git", "rev-parse", "--show-toplevel", "--show-prefix"], cwd=PROJECT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.split()
+    archive = subprocess.run(["git", "archive", "--format=tar", f"{ref}:{prefix}"], cwd=root,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return Path(target)
+
+
+def run_workers(tree, args):
+    env = dict(os.environ, DB_ENDPOINT=args.host, DB_NAME=args.database, AWS_REGION="eu-central-1",
+               SECRET_ARN="emaildb-password", BENCH_PASSWORD=args.password,
+               AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing")
+    env.pop("DATABASE_URL", None)
+    start = time.perf_counter()
+    workers = [subprocess.Popen([sys.executable, "-c", WORKER, str(args.latency), str(args.requests)],
+                                cwd=tree, env=env, stdout=subprocess.PIPE, text=True)
+               for _ in range(args.workers)]
+    results = []
+    for worker in workers:
+        out, _ = worker.communicate()
+        if worker.returncode:
+            sys.exit(f"worker in {tree} failed")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return time.perf_counter() - start, results
+
+
+def report(name, wall, results):
+    print(f"{name:<10}{statistics.median(r['boot'] for r in results) * 1000:>12.0f}"
+          f"{max(r['boot'] for r in results) * 1000:>12.0f}"
+          f"{statistics.median(r['first'] for r in results) * 1000:>12.0f}"
+          f"{sum(r['boot_calls'] for r in results):>12}"
+          f"{sum(r['calls'] for r in results):>12}{wall:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="requests per worker after boot")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per GetSecretValue call")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--database", default="emaildb")
+    parser.add_argument("--password", required=True, help="password of the admin MySQL user")
+    parser.add_argument("--baseline", help="git ref of the app to compare with")
+    args = parser.parse_args()
+
+    # the current app expects `flask init-db` to have run before the workers start
+    engine = create_engine(f"mysql+pymysql://admin:{args.password}@{args.host}/{args.database}")
+    with engine.begin() as connection:
+        connection.execute(ingest.CREATE_USERS_TABLE)
+    engine.dispose()
+
+    print(f"{args.workers} workers, {args.requests} requests each, {args.latency * 1000:.0f} ms per GetSecretValue")
+    print(f"{'app':<10}{'boot p50 ms':>12}{'boot max ms':>12}{'requests ms':>12}{'boot calls':>12}{'all calls':>12}{'wall s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline:
+            report("baseline", *run_workers(checkout(args.baseline, tmp), args))
+        report("current", *run_workers(PROJECT_DIR, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+# How long a fetched secret is used before asking Secrets Manager again
+SECRET_TTL = 300
+
+
+class SecretProvider:
+    """A Secrets Manager secret with an in-memory TTL cache.
+
+    Nothing is fetched until the first get(), so importing the app makes no AWS
+    calls. get(refresh=True) skips the cache, e.g. after the database rejected
+    the password because the secret was rotated. If Secrets Manager cannot be
+    reached, the last known value is used until it can.
+    """
+
+    def __init__(self, secret_arn, region, ttl=SECRET_TTL):
+        self.secret_arn = secret_arn
+        self.region = region
+        self.ttl = ttl
+        self.fetches = 0
+        self._client = None
+        self._value = None
+        self._expires = 0.0
+        # gunicorn threads of one worker share the provider
+        self._lock = threading.Lock()
+
+    def get(self, refresh=False):
+        with self._lock:
+            if refresh or self._value is None or time.monotonic() >= self._expires:
+                try:
+                    self._value = self._fetch()
+                except (BotoCoreError, ClientError) as e:
+                    if self._value is None:
+                        raise
+                    print(f"Error retrieving secret, using the cached value: {e}")
+                self._expires = time.monotonic() + self.ttl
+            return self._value
+
+    def _fetch(self):
+        if self._client is None:
+            self._client = boto3.client('secretsmanager', region_name=self.region)
+        response = self._client.get_secret_value(SecretId=self.secret_arn)
+        self.fetches += 1
+        return response['SecretString']  # the secret is the plain password
@@ -0,0 +1,179 @@
+"""Bulk loading of users with upsert semantics.
+
+Rows are written in batches, each batch one multi-row INSERT that updates the
+email of usernames that already exist:
+  MySQL:  INSERT ... VALUES (...), (...) ON DUPLICATE KEY UPDATE email = VALUES(email)
+  SQLite: INSERT ... VALUES (...), (...) ON CONFLICT(username) DO UPDATE SET email = excluded.email
+That is one round trip per batch instead of a SELECT plus an INSERT per user,
+and no check-then-insert race. Each batch commits on its own, so a failed
+batch does not undo the ones before it.
+
+Also usable from the command line:
+  python ingest.py users.csv --database-url sqlite:///./email.db
+  python ingest.py users.ndjson --batch-size 1000     # DATABASE_URL from the environment
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+
+BATCH_SIZE = 500
+# SQLite allows 32766 bound parameters per statement, two per row
+MAX_BATCH_SIZE = 10_000
+# Rejected rows reported back in detail; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+MAX_LENGTH = 255
+
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+$")
+
+CREATE_USERS_TABLE = text("""
+    CREATE TABLE IF NOT EXISTS users(
+    username VARCHAR(255) NOT NULL PRIMARY KEY,
+    email VARCHAR(255));
+""")
+
+
+@lru_cache(maxsize=32)
+def _upsert_statement(dialect, rows):
+    values = ", ".join(f"(:username_{n}, :email_{n})" for n in range(rows))
+    if dialect == "mysql":
+        conflict = "ON DUPLICATE KEY UPDATE email = VALUES(email)"
+    else:
+        conflict = "ON CONFLICT(username) DO UPDATE SET email = excluded.email"
+    return text(f"INSERT INTO users (username, email) VALUES {values} {conflict}")
+
+
+def upsert_users(connection, users):
+    """Insert or update a list of (username, email) pairs with a single statement."""
+    bind = connection.get_bind() if hasattr(connection, "get_bind") else connection
+    params = {}
+    for n, (username, email) in enumerate(users):
+        params[f"username_{n}"] = username
+        params[f"email_{n}"] = email
+    connection.execute(_upsert_statement(bind.dialect.name, len(users)), params)
+
+
+def validate(record):
+    """Return (username, email) for a record, or raise ValueError."""
+    username = record.get("username")
+    email = record.get("email")
+    if not isinstance(username, str) or not username.strip():
+        raise ValueError("username: must be a non-empty string")
+    if not isinstance(email, str) or not _EMAIL.match(email.strip()):
+        raise ValueError("email: must be an email address")
+    username, email = username.strip(), email.strip()
+    # what the reader decoded from bytes that are not UTF-8
+    if "\ufffd" in username or "\ufffd" in email:
+        raise ValueError("username and email must be valid UTF-8")
+    if len(username) > MAX_LENGTH or len(email) > MAX_LENGTH:
+        raise ValueError(f"username and email can be at most {MAX_LENGTH} characters")
+    return username, email
+
+
+def read_ndjson(lines):
+    """Yield (line number, record or error message) for NDJSON input."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, "invalid JSON"
+            continue
+        yield number, record if isinstance(record, dict) else "expected a JSON object"
+
+
+def read_csv(lines):
+    """Yield (line number, record or error message) for username,email CSV input (header optional)."""
+    reader = csv.reader(lines)
+    for row in reader:
+        number = reader.line_num
+        if not row:
+            continue
+        if number == 1 and [column.strip().lower() for column in row] == ["username", "email"]:
+            continue
+        if len(row) != 2:
+            yield number, "expected 2 columns: username,email"
+            continue
+        yield number, {"username": row[0], "email": row[1]}
+
+
+def ingest(engine, records, batch_size=BATCH_SIZE):
+    """Upsert (line number, record) pairs in batches and return summary counts.
+
+    received = written + rejected + failed + duplicates, where duplicates are rows
+    replaced by a later row for the same username in the same batch.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    summary = {"received": 0, "written": 0, "rejected": 0, "failed": 0, "duplicates": 0, "errors": []}
+    batch = {}          # keyed by username: the last row for a username wins
+    first_line = None
+
+    def report(line, error):
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line, "error": error})
+
+    def flush():
+        try:
+            with engine.begin() as connection:
+                upsert_users(connection, list(batch.items()))
+            summary["written"] += len(batch)
+        except SQLAlchemyError as e:
+            summary["failed"] += len(batch)
+            error = getattr(e, "orig", None) or e
+            report(first_line, f"batch of {len(batch)} rows failed: {error.__class__.__name__}: {error}")
+        batch.clear()
+
+    for line, record in records:
+        summary["received"] += 1
+        try:
+            if isinstance(record, str):
+                raise ValueError(record)
+            username, email = validate(record)
+        except ValueError as e:
+            summary["rejected"] += 1
+            report(line, str(e))
+            continue
+        if not batch:
+            first_line = line
+        if username in batch:
+            summary["duplicates"] += 1
+        batch[username] = email
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk insert or update users from CSV or NDJSON")
+    parser.add_argument("file", help='a .csv or .ndjson file, or "-" for stdin')
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    file_format = args.format or ("ndjson" if args.file.endswith((".ndjson", ".jsonl")) else "csv")
+    reader = read_ndjson if file_format == "ndjson" else read_csv
+    engine = create_engine(args.database_url)
+    with engine.begin() as connection:
+        connection.execute(CREATE_USERS_TABLE)
+    source = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8", errors="replace")
+    with source:
+        summary = ingest(engine, reader(source), args.batch_size)
+    for error in summary.pop("errors"):
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
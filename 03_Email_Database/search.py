@@ -0,0 +1,159 @@
+"""Username search for the users table.
+
+- Prefix search is a range scan on the username primary key, so it never
+  reads the whole table. MySQL range-scans LIKE 'do%' itself; its default
+  collation (utf8mb4_0900_ai_ci) sorts punctuation before letters and digits, so
+  an explicit upper bound such as 'dz' -> 'd{' would be wrong there. SQLite
+  cannot use the index for LIKE (it is case-insensitive, the key is not), but it
+  compares strings byte by byte, so there the range is
+  username >= 'do' AND username < 'dp'.
+- Substring search uses an n-gram index when one exists: a FULLTEXT index with
+  the ngram parser on MySQL, an FTS5 trigram table on SQLite. Without one (or for
+  keywords shorter than the n-gram size) it falls back to LIKE '%keyword%',
+  which has to scan the table.
+- Every query uses bound parameters, and its text is fixed, so the driver and
+  the database can cache the statement.
+- Results are ordered by username and paginated by keyset: pass the last
+  username of a page as `after` to get the next one.
+"""
+from sqlalchemy import text
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Shorter keywords cannot be looked up in the n-gram index
+MIN_NGRAM_KEYWORD = 3
+
+NGRAM_INDEX = "users_username_ngram"
+
+_ALL = text("""
+    SELECT username, email FROM users
+    WHERE username > :after
+    ORDER BY username LIMIT :limit
+""")
+_PREFIX = text("""
+    SELECT username, email FROM users
+    WHERE username LIKE :prefix ESCAPE '!' AND username > :after
+    ORDER BY username LIMIT :limit
+""")
+_PREFIX_RANGE = text("""
+    SELECT username, email FROM users
+    WHERE username >= :low AND username < :high AND username > :after
+    ORDER BY username LIMIT :limit
+""")
+_CONTAINS = text("""
+    SELECT username, email FROM users
+    WHERE username LIKE :pattern ESCAPE '!' AND username > :after
+    ORDER BY username LIMIT :limit
+""")
+# The n-gram index finds candidates; LIKE keeps the exact substring semantics.
+_CONTAINS_NGRAM = {
+    "mysql": text("""
+        SELECT username, email FROM users
+        WHERE MATCH(username) AGAINST (:phrase IN BOOLEAN MODE)
+          AND username LIKE :pattern ESCAPE '!' AND username > :after
+        ORDER BY username LIMIT :limit
+    """),
+    "sqlite": text(f"""
+        SELECT users.username, users.email FROM {NGRAM_INDEX}
+        JOIN users ON users.rowid = {NGRAM_INDEX}.rowid
+        WHERE {NGRAM_INDEX} MATCH :phrase
+          AND users.username LIKE :pattern ESCAPE '!' AND users.username > :after
+        ORDER BY users.username LIMIT :limit
+    """),
+}
+
+
+def _escape_like(value):
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def _phrase(keyword, dialect):
+    if dialect == "mysql":
+        return '"' + keyword.replace('"', " ") + '"'
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def _dialect(connection):
+    # a Session has no .dialect of its own
+    bind = connection.get_bind() if hasattr(connection, "get_bind") else connection
+    return bind.dialect.name
+
+
+def has_ngram_index(connection):
+    dialect = _dialect(connection)
+    if dialect == "mysql":
+        query = text("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'users' AND index_name = :name
+        """)
+    elif dialect == "sqlite":
+        query = text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = :name")
+    else:
+        return False
+    return connection.execute(query, {"name": NGRAM_INDEX}).scalar() > 0
+
+
+def create_ngram_index(connection):
+    """Create the n-gram index for substring search, if it does not exist yet."""
+    dialect = _dialect(connection)
+    if dialect not in _CONTAINS_NGRAM:
+        raise ValueError(f"No n-gram index support for {dialect}")
+    if has_ngram_index(connection):
+        return
+    if dialect == "mysql":
+        connection.execute(text(f"ALTER TABLE users ADD FULLTEXT INDEX {NGRAM_INDEX} (username) WITH PARSER ngram"))
+        return
+    # External content table: the trigrams are indexed, the usernames stay in users.
+    # The triggers keep it in sync with inserts, updates and deletes.
+    connection.execute(text(f"""
+        CREATE VIRTUAL TABLE {NGRAM_INDEX}
+        USING fts5(username, content='users', content_rowid='rowid', tokenize='trigram')
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER {NGRAM_INDEX}_insert AFTER INSERT ON users BEGIN
+            INSERT INTO {NGRAM_INDEX}(rowid, username) VALUES (new.rowid, new.username);
+        END
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER {NGRAM_INDEX}_delete AFTER DELETE ON users BEGIN
+            INSERT INTO {NGRAM_INDEX}({NGRAM_INDEX}, rowid, username) VALUES ('delete', old.rowid, old.username);
+        END
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER {NGRAM_INDEX}_update AFTER UPDATE ON users BEGIN
+            INSERT INTO {NGRAM_INDEX}({NGRAM_INDEX}, rowid, username) VALUES ('delete', old.rowid, old.username);
+            INSERT INTO {NGRAM_INDEX}(rowid, username) VALUES (new.rowid, new.username);
+        END
+    """))
+    connection.execute(text(f"INSERT INTO {NGRAM_INDEX}({NGRAM_INDEX}) VALUES ('rebuild')"))
+
+
+def search_users(connection, keyword, contains=False, limit=DEFAULT_LIMIT, after="", ngram_index=False):
+    """Return one page of (username, email) rows and the `after` value for the next page (or None).
+
+    `connection` is anything with execute(), e.g. a SQLAlchemy Connection or Session.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    # one extra row tells whether there is a next page
+    params = {"after": after or "", "limit": limit + 1}
+    if not keyword:
+        query = _ALL
+    elif not contains and _dialect(connection) == "sqlite":
+        query = _PREFIX_RANGE
+        # in SQLite's binary order, high is the smallest string after every string starting with keyword
+        params.update(low=keyword, high=keyword[:-1] + chr(ord(keyword[-1]) + 1))
+    elif not contains:
+        query = _PREFIX
+        params["prefix"] = f"{_escape_like(keyword)}%"
+    else:
+        params["pattern"] = f"%{_escape_like(keyword)}%"
+        dialect = _dialect(connection)
+        if ngram_index and len(keyword) >= MIN_NGRAM_KEYWORD and dialect in _CONTAINS_NGRAM:
+            query = _CONTAINS_NGRAM[dialect]
+            params["phrase"] = _phrase(keyword, dialect)
+        else:
+            query = _CONTAINS
+    rows = [(row[0], row[1]) for row in connection.execute(query, params)]
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1][0]
+    return rows, None
@@ -17,8 +17,15 @@ wget -P static ${FOLDER}/static/style.css
 wget -P static ${FOLDER}/static/applogo.png
 wget ${FOLDER}/requirements.txt
 wget ${FOLDER}/app.py
+wget ${FOLDER}/search.py
+wget ${FOLDER}/ingest.py
+wget ${FOLDER}/credentials.py
 pip3 install -r requirements.txt
 
+# Create the users table (and the sample users) once, before the workers start
+set -a; source .env; set +a
+flask --app app init-db
+
 # Fix permissions
 chown -R ec2-user:ec2-user /home/ec2-user/Email_Database
 
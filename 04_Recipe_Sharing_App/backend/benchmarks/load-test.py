@@ -0,0 +1,143 @@
+# Load test for the recipe API against an in-memory DynamoDB (moto).
+#
+# Compares requests/sec with concurrent clients when the handlers call boto3
+# directly on the event loop ("blocking", the old behaviour) and when they go
+# through RecipeRepository's thread pool ("threadpool").
+# moto answers instantly, so a fixed network round trip is injected into every
+# DynamoDB call to make the numbers resemble a real deployment.
+#
+# Usage:
+#   pip install -r ../requirements.txt moto httpx
+#   python benchmarks/load-test.py --clients 50 --requests 1000 --latency-ms 50
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import types
+from pathlib import Path
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+REGION = "eu-central-1"
+
+import boto3
+import httpx
+from moto import mock_aws
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def load_main():
+    # setup.sh replaces the SELECTED_REGION placeholder at deploy time; do the same here
+    source = (BACKEND_DIR / "main.py").read_text().replace("SELECTED_REGION", REGION)
+    module = types.ModuleType("main")
+    module.__file__ = str(BACKEND_DIR / "main.py")
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def seed(count):
+    ddb = boto3.client("dynamodb", region_name=REGION)
+    ddb.create_table(TableName="recipes",
+                     KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+                     AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+                     BillingMode="PAY_PER_REQUEST")
+    table = boto3.resource("dynamodb", region_name=REGION).Table("recipes")
+    with table.batch_writer() as batch:
+        for i in range(count):
+            batch.put_item(Item={
+                "id": f"recipe-{i:06d}",
+                "title": f"Recipe {i}",
+                "ingredients": [{"id": n, "description": f"ingredient {n}"} for n in range(8)],
+                "steps": [{"id": n, "description": f"step {n}"} for n in range(5)],
+            })
+
+
+def inject_latency(client, latency):
+    def _sleep(**kwargs):
+        time.sleep(latency)
+    client.meta.events.register("before-send.dynamodb", _sleep)
+
+
+async def run_load(app, clients, total, path):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    health = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(path)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                r = await http.get(path)
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        async def probe_health():
+            # how long does /health take while the recipe requests are running?
+            # The probe sleeps 10 ms between calls; anything above that is time
+            # spent waiting for a blocked event loop.
+            while not queue.empty():
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                await http.get("/health")
+                health.append(time.perf_counter() - start - 0.01)
+
+        start = time.perf_counter()
+        await asyncio.gather(probe_health(), *(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    health.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "health_p99_ms": health[int(len(health) * 0.99) - 1] * 1000 if health else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--recipes", type=int, default=200)
+    parser.add_argument("--path", default="/recipes?limit=20&fields=title")
+    args = parser.parse_args()
+
+    with mock_aws():
+        seed(args.recipes)
+        main_module = load_main()
+        inject_latency(main_module.dynamodb, args.latency_ms / 1000)
+
+        import repository
+
+        class BlockingRecipeRepository(repository.RecipeRepository):
+            # the old behaviour: boto3 runs straight on the event loop
+            async def _run(self, fn, **kwargs):
+                return fn(**kwargs)
+
+        modes = {
+            "blocking": BlockingRecipeRepository(main_module.dynamodb, "recipes"),
+            "threadpool": main_module.recipes,
+        }
+        print(f"{args.clients} clients, {args.requests} requests of {args.path}, "
+              f"{args.latency_ms:g} ms injected DynamoDB latency")
+        print(f"{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'/health p99 ms':>16}")
+        for name, repo in modes.items():
+            main_module.recipes = repo
+            result = asyncio.run(run_load(main_module.app, args.clients, args.requests, args.path))
+            print(f"{name:<12}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+                  f"{result['p99_ms']:>10.1f}{result['health_p99_ms']:>16.1f}")
+            repo.close()
+
+
+if __name__ == "__main__":
+    main()
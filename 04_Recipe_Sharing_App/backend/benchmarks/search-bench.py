@@ -0,0 +1,178 @@
+# Benchmark: GET /recipes/search (inverted index) vs fetching every recipe and
+# filtering on the client, against an in-memory DynamoDB (moto).
+#
+# The recipes are loaded through POST /recipes/import, so the recipe-search
+# index is built by the same code path the API uses. Their ingredients follow a
+# Zipf-like distribution over a small vocabulary. Each query is answered:
+#   scan + filter  GET /recipes (a full scan), then tokenize and match in Python
+#   index          GET /recipes/search: one Query per term, BatchGetItem on the matches
+# moto evaluates everything in Python, so the DynamoDB items read are shown as well:
+# on DynamoDB they are what a query costs.
+#
+# Checks:
+#   - both ways find the same recipes, in the same order (unless the response is partial)
+#   - a created recipe can be found, and no longer once it is deleted
+#   - a recipe overwritten by an import has no index entries left for its old ingredients
+#
+# Usage:
+#   pip install -r ../requirements.txt moto httpx
+#   python benchmarks/search-bench.py --recipes 5000
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import types
+from pathlib import Path
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+REGION = "eu-central-1"
+
+import boto3
+import httpx
+from moto import mock_aws
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from search import MAX_FETCHED, rank, tokens
+
+INGREDIENTS = [
+    "salt", "olive oil", "garlic cloves", "onions", "black pepper", "butter", "eggs", "flour", "sugar",
+    "tomatoes", "lemon juice", "chicken breasts", "parsley", "milk", "carrots", "potatoes", "cream",
+    "basil leaves", "rice", "parmesan", "ginger", "soy sauce", "honey", "paprika", "cumin", "thyme",
+    "bell peppers", "mushrooms", "spinach", "beef mince", "bacon", "chili flakes", "coriander", "lime",
+    "mozzarella", "yogurt", "celery", "shallots", "white wine", "chickpeas", "coconut milk", "noodles",
+    "pasta", "salmon fillets", "shrimps", "tofu", "zucchini", "eggplant", "feta", "oregano", "rosemary",
+    "cinnamon", "vanilla", "almonds", "walnuts", "oats", "bananas", "strawberries", "blueberries",
+    "apples", "cabbage", "leeks", "peas", "corn", "black beans", "lentils", "avocados", "cheddar",
+    "pork belly", "lamb shoulder", "turmeric", "cardamom", "saffron", "jalapeños", "capers", "anchovies",
+]
+DISHES = ["soup", "stew", "salad", "curry", "pie", "risotto", "tacos", "bake", "stir fry", "pasta", "bowl"]
+STYLES = ["Quick", "Spicy", "Creamy", "Rustic", "Weeknight", "Summer", "Winter", "Smoky", "Zesty"]
+UNITS = ["2 cups", "1 tbsp", "3 tsp", "200 g", "1 pinch of", "4 large", "a handful of", "1 can of"]
+QUERIES = [("chicken garlic", "and"), ("tomato basil mozzarella", "and"), ("saffron risotto", "and"),
+           ("tofu shrimp", "or"), ("lemon", "or")]
+
+
+def load_main():
+    # setup.sh replaces the SELECTED_REGION placeholder at deploy time; do the same here
+    source = (BACKEND_DIR / "main.py").read_text().replace("SELECTED_REGION", REGION)
+    module = types.ModuleType("main")
+    module.__file__ = str(BACKEND_DIR / "main.py")
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def create_tables():
+    # mirror RecipesTable and RecipeSearchTable in CFN-Template.yaml
+    ddb = boto3.client("dynamodb", region_name=REGION)
+    ddb.create_table(TableName="recipes",
+                     KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+                     AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+                     BillingMode="PAY_PER_REQUEST")
+    ddb.create_table(TableName="recipe-search",
+                     KeySchema=[{"AttributeName": "token", "KeyType": "HASH"},
+                                {"AttributeName": "recipe_id", "KeyType": "RANGE"}],
+                     AttributeDefinitions=[{"AttributeName": "token", "AttributeType": "S"},
+                                           {"AttributeName": "recipe_id", "AttributeType": "S"}],
+                     BillingMode="PAY_PER_REQUEST")
+
+
+def ndjson(count):
+    rng = random.Random(42)
+    weights = [1 / (rank + 1) ** 0.7 for rank in range(len(INGREDIENTS))]
+    lines = []
+    for i in range(count):
+        names = list(dict.fromkeys(rng.choices(INGREDIENTS, weights, k=rng.randint(5, 12))))
+        lines.append(json.dumps({
+            "id": f"recipe-{i:06d}",
+            "title": f"{rng.choice(STYLES)} {rng.choice(names).split()[0]} {rng.choice(DISHES)}",
+            "ingredients": [{"id": n, "description": f"{rng.choice(UNITS)} {name}"} for n, name in enumerate(names)],
+            "steps": [{"id": n, "description": f"step {n}"} for n in range(4)],
+        }))
+    return "\n".join(lines).encode()
+
+
+def count_reads(client):
+    reads = {"items": 0}
+
+    def _count(parsed, model, **kwargs):
+        if model.name in ("Query", "Scan"):
+            reads["items"] += parsed.get("ScannedCount", 0)
+        elif model.name == "BatchGetItem":
+            reads["items"] += sum(len(items) for items in parsed.get("Responses", {}).values())
+    client.meta.events.register("after-call.dynamodb", _count)
+    return reads
+
+
+async def run(main_module, args):
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        start = time.perf_counter()
+        r = await http.post("/recipes/import", content=ndjson(args.recipes))
+        assert r.json()["imported"] == args.recipes, r.json()
+        print(f"imported and indexed {args.recipes} recipes in {time.perf_counter() - start:.1f}s")
+
+        reads = count_reads(main_module.dynamodb)
+        print(f"{'query':<28}{'mode':>5}{'matches':>9}{'scan ms':>10}{'read':>9}{'index ms':>10}{'read':>9}")
+        for query, mode in QUERIES:
+            params = {"q": query, "mode": mode, "limit": args.limit}
+            # the responses are cached, so start every run from an empty cache
+            main_module.list_cache.clear()
+            reads["items"], start = 0, time.perf_counter()
+            everything = (await http.get("/recipes")).json()
+            expected = rank(everything, tokens(query), mode)
+            scan_ms, scanned = (time.perf_counter() - start) * 1000, reads["items"]
+
+            main_module.list_cache.clear()
+            reads["items"], start = 0, time.perf_counter()
+            found = (await http.get("/recipes/search", params=params)).json()
+            index_ms, read = (time.perf_counter() - start) * 1000, reads["items"]
+            assert found["total"] == len(expected), (query, found["total"], len(expected))
+            assert found["partial"] == (len(expected) > MAX_FETCHED), query
+            if not found["partial"]:
+                assert found["recipes"] == expected[:args.limit], query
+            print(f"{query:<28}{mode:>5}{found['total']:>9}{scan_ms:>10.1f}{scanned:>9}{index_ms:>10.1f}{read:>9}")
+
+        async def ids(query):
+            return [r["id"] for r in (await http.get("/recipes/search", params={"q": query})).json()["recipes"]]
+
+        recipe = {"id": "", "title": "Fruit pancakes", "steps": [],
+                  "ingredients": [{"id": 0, "description": "1 ripe durian"}, {"id": 1, "description": "flour"}]}
+        await http.post("/recipes", json=recipe)
+        [new_id] = await ids("durian pancake")
+        await http.delete(f"/recipes/{new_id}")
+        assert await ids("durian") == []
+        original = json.loads(ndjson(1))
+        overwritten = {**original, "ingredients": [{"id": 0, "description": "2 ripe mangoes"}]}
+        await http.post("/recipes/import", content=json.dumps(overwritten).encode())
+        assert "recipe-000000" in await ids("mango")
+        gone = set().union(*(tokens(i["description"]) for i in original["ingredients"])) - set(tokens(original["title"]))
+        index = boto3.client("dynamodb", region_name=REGION)
+        for token in gone:
+            assert "recipe-000000" not in await ids(token), token
+            key = {"token": {"S": token}, "recipe_id": {"S": "recipe-000000"}}
+            assert "Item" not in index.get_item(TableName="recipe-search", Key=key), token
+        print("created, deleted and overwritten recipes are found exactly under their current words")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with mock_aws():
+        create_tables()
+        main_module = load_main()
+        asyncio.run(run(main_module, args))
+        main_module.recipes.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
-from fastapi import FastAPI, status
+from fastapi import FastAPI, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from typing import Union
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+from decimal import Decimal
+import base64
+import binascii
+import hashlib
+import json
 import uuid
 import boto3
+from botocore.config import Config
+from cache import TTLCache
+from repository import BATCH_WRITE_SIZE, MAX_WORKERS, RecipeRepository
+from search import MAX_FETCHED, MAX_TERMS, rank, tokens
 
 class Ingredient(BaseModel):
     id: int
@@ -20,19 +32,54 @@ class Recipe(BaseModel):
     ingredients: List[Ingredient]
     steps: List[Step]
 
+class ImportedRecipe(Recipe):
+    # imported recipes keep their id when they have one
+    id: Optional[str] = None
+
 session = boto3.Session(
        region_name='SELECTED_REGION'
    )
 
-dynamodb = session.resource('dynamodb')
-table = dynamodb.Table('recipes')
+# Keep-alive connections and a pool large enough for every repository worker
+dynamodb = session.client('dynamodb', config=Config(
+    max_pool_connections=MAX_WORKERS,
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5,
+    retries={'max_attempts': 3, 'mode': 'standard'},
+))
+recipes = RecipeRepository(dynamodb, 'recipes', search_table='recipe-search')
+
+# Largest page a client may ask for with ?limit=
+MAX_PAGE_SIZE = 100
+SEARCH_PAGE_SIZE = 20
+RECIPE_FIELDS = set(Recipe.model_fields)
+# Bulk import/export: 25-item batches written at the same time, and scan segments read in parallel
+IMPORT_CONCURRENCY = 8
+EXPORT_SEGMENTS = 8
+# Rejected import lines reported back in detail; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Recipes change far less often than they are read. Writes made through this
+# instance invalidate the caches; the TTL bounds staleness for writes made
+# through other instances behind the load balancer.
+list_cache = TTLCache(maxsize=64, ttl=30)       # serialized GET /recipes and /recipes/search responses
+recipe_cache = TTLCache(maxsize=1024, ttl=60)   # serialized single recipes
+# A streamed GET /recipes is only cached while it stays below this size; a larger
+# table is streamed without keeping a copy, so memory does not grow with it.
+MAX_CACHED_STREAM_CHARS = 4 * 1024 * 1024
 
 # Configure CORS
 origins = [
     "*", 
 ]
 
-app = FastAPI(title="Recipe Sharing API")
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    recipes.close()
+
+app = FastAPI(title="Recipe Sharing API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -47,46 +94,312 @@ app.add_middleware(
 async def health_check():
     return {"message": "Service is healthy"}
 
+# cache counters in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    lines = []
+    for name, cache in (("list", list_cache), ("recipe", recipe_cache)):
+        lines += [
+            f'recipe_cache_hits_total{{cache="{name}"}} {cache.hits}',
+            f'recipe_cache_misses_total{{cache="{name}"}} {cache.misses}',
+            f'recipe_cache_evictions_total{{cache="{name}"}} {cache.evictions}',
+            f'recipe_cache_entries{{cache="{name}"}} {len(cache)}',
+        ]
+    return "\n".join(lines) + "\n"
+
+# pagination helpers
+def _json_default(o):
+    # DynamoDB numbers come back as Decimal
+    if isinstance(o, Decimal):
+        return int(o) if o == o.to_integral_value() else float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def _encode_cursor(last_key):
+    """Wrap a LastEvaluatedKey into an opaque, URL-safe token."""
+    raw = json.dumps(last_key, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_key = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(last_key, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return last_key
+
+def _scan_kwargs(fields):
+    """Build the scan arguments for an optional comma-separated field list."""
+    if not fields:
+        return {}
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - RECIPE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id is always returned so clients can address the recipe
+    names = sorted(names | {"id"})
+    return {
+        "ProjectionExpression": ", ".join(f"#f{i}" for i in range(len(names))),
+        "ExpressionAttributeNames": {f"#f{i}": name for i, name in enumerate(names)},
+    }
+
+async def _stream_recipes(first_page, pages, cache_key, generation):
+    # Emit a JSON array one DynamoDB page at a time instead of building it in memory.
+    # The chunks of a small response are kept so it can be cached afterwards;
+    # past MAX_CACHED_STREAM_CHARS they are dropped and nothing is cached.
+    chunks, size = ["["], 1
+    yield "["
+    separator = ""
+    items = first_page
+    while items is not None:
+        if items:
+            chunk = separator + ",".join(json.dumps(item, default=_json_default) for item in items)
+            if chunks is not None:
+                size += len(chunk)
+                if size <= MAX_CACHED_STREAM_CHARS:
+                    chunks.append(chunk)
+                else:
+                    chunks = None
+            yield chunk
+            separator = ","
+        items = await anext(pages, None)
+    yield "]"
+    if chunks is not None:
+        body = "".join(chunks + ["]"]).encode()
+        list_cache.set(cache_key, (body, _etag(body)), generation=generation)
+
+# caching helpers
+def _etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def _cached_response(request, body, etag):
+    # Let clients holding the current version skip the payload entirely
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+def _invalidate(recipe_id):
+    list_cache.clear()
+    recipe_cache.pop(recipe_id)
+
+# bulk helpers
+async def _ndjson_lines(request):
+    # Split the request body into lines as it arrives instead of reading it all first
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+def _validation_error(e):
+    error = e.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
 # read recipes
+#   GET /recipes                      -> every recipe, streamed page by page
+#   GET /recipes?fields=title         -> only id + title for each recipe
+#   GET /recipes?limit=20[&cursor=..] -> {"items": [...], "next_cursor": "..." | null}
 @app.get("/recipes", status_code=status.HTTP_200_OK)
-async def get_all_recipes(): 
+async def get_all_recipes(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    scan_kwargs = _scan_kwargs(fields)
+    start_key = _decode_cursor(cursor) if cursor else None
+    projected = tuple(sorted(scan_kwargs.get("ExpressionAttributeNames", {}).values()))
+    cache_key = (projected, limit, cursor)
+    cached = list_cache.get(cache_key)
+    if cached:
+        return _cached_response(request, *cached)
+    generation = list_cache.generation
     try:
-        response = table.scan()
-        recipes = response['Items']
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            recipes.extend(response['Items'])
-        recipes_list = [Recipe(**recipe) for recipe in recipes]
-        return recipes_list
+        if limit is None and cursor is None:
+            # the first page is fetched eagerly so scan errors still surface as a normal response
+            pages = recipes.scan_pages(**scan_kwargs)
+            first_page = await anext(pages)
+            return StreamingResponse(_stream_recipes(first_page, pages, cache_key, generation),
+                                     media_type="application/json")
+        items, last_key = await recipes.scan_page(limit=limit or MAX_PAGE_SIZE,
+                                                  start_key=start_key, **scan_kwargs)
+        body = json.dumps({
+            "items": items,
+            "next_cursor": _encode_cursor(last_key) if last_key else None,
+        }, default=_json_default).encode()
+        etag = _etag(body)
+        list_cache.set(cache_key, (body, etag), generation=generation)
+        return _cached_response(request, body, etag)
     except Exception as e:
         return {"message": f"Error retrieving recipes: {e}"}
 
 
+# export recipes as NDJSON, read with a parallel scan
+@app.get("/recipes/export", status_code=status.HTTP_200_OK)
+async def export_recipes(segments: int = Query(EXPORT_SEGMENTS, ge=1, le=64)):
+    async def lines():
+        async for items in recipes.scan_segments(segments):
+            yield "".join(json.dumps(item, default=_json_default) + "\n" for item in items)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# search recipes by ingredient and title words, through the recipe-search index
+#   GET /recipes/search?q=chicken garlic           -> recipes containing every term
+#   GET /recipes/search?q=chicken garlic&mode=or   -> recipes containing any term, most terms first
+@app.get("/recipes/search", status_code=status.HTTP_200_OK)
+async def search_recipes(
+    request: Request,
+    q: str,
+    mode: str = Query("and", pattern="^(and|or)$"),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    terms = tokens(q)[:MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="q must contain at least one ingredient or title word")
+    cache_key = ("search", tuple(terms), mode, limit)
+    cached = list_cache.get(cache_key)
+    if cached:
+        return _cached_response(request, *cached)
+    generation = list_cache.generation
+    try:
+        items, total = await recipes.search(terms, mode)
+    except Exception as e:
+        return JSONResponse({"message": f"Error searching recipes: {e}"},
+                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    body = json.dumps({
+        "terms": terms,
+        "mode": mode,
+        "total": total,
+        # only MAX_FETCHED of the matches were read and ranked
+        "partial": total > MAX_FETCHED,
+        "recipes": rank(items, terms, mode)[:limit],
+    }, default=_json_default).encode()
+    etag = _etag(body)
+    list_cache.set(cache_key, (body, etag), generation=generation)
+    return _cached_response(request, body, etag)
+
+
+# read one recipe
+@app.get("/recipes/{recipe_id}", status_code=status.HTTP_200_OK)
+async def get_recipe(recipe_id: str, request: Request):
+    cached = recipe_cache.get(recipe_id)
+    if cached:
+        return _cached_response(request, *cached)
+    generation = list_cache.generation
+    try:
+        item = await recipes.get(recipe_id)
+    except Exception as e:
+        return JSONResponse({"message": f"Error retrieving recipe: {e}"},
+                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if item is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+    body = json.dumps(item, default=_json_default).encode()
+    etag = _etag(body)
+    # list_cache.generation also moves on every write, so a concurrent delete is not undone
+    if generation == list_cache.generation:
+        recipe_cache.set(recipe_id, (body, etag))
+    return _cached_response(request, body, etag)
+
+
 #create recipe
 @app.post("/recipes", status_code=status.HTTP_200_OK)
 async def create_recipe(recipe: Recipe):
     try:
-        table.put_item( Item={
+        item = {
             'id': str(uuid.uuid4()),
             'title': recipe.title,
             'ingredients':  [ingredient.dict() for ingredient in recipe.ingredients],
             'steps':  [steps.dict() for steps in recipe.steps]
             }
-            )
+        await recipes.put(item)
+        _invalidate(item['id'])
         return {"message": "Recipe created successfully"}
     except Exception as e:
         return {"message": f"Error creating recipe: {e}"}
 
 
+#bulk import recipes from an NDJSON body, one recipe per line
+@app.post("/recipes/import", status_code=status.HTTP_200_OK)
+async def import_recipes(request: Request):
+    rejected = 0
+    errors = []
+    batch = {}          # keyed by id: BatchWriteItem rejects duplicate keys in one call
+    in_flight = {}      # task -> ids of the items it writes
+    writing = {}        # id -> the task writing it
+    written = {}        # id -> whether its last write succeeded; each id is counted once
+
+    async def collect(tasks):
+        for task in tasks:
+            ids = in_flight.pop(task)
+            try:
+                unprocessed = set(task.result())
+            except Exception as e:
+                print(f"Error importing batch: {e}")
+                unprocessed = set(ids)
+            for recipe_id in ids:
+                written[recipe_id] = recipe_id not in unprocessed
+                if writing.get(recipe_id) is task:
+                    del writing[recipe_id]
+
+    async def submit(batch):
+        # An id that an earlier batch is still writing waits for it, so the
+        # later line wins, as it does within a batch
+        earlier = {writing[recipe_id] for recipe_id in batch if recipe_id in writing}
+        if earlier:
+            await asyncio.wait(earlier)
+            await collect(earlier)
+        task = asyncio.create_task(recipes.batch_put(list(batch.values())))
+        in_flight[task] = list(batch)
+        for recipe_id in batch:
+            writing[recipe_id] = task
+
+    line_number = 0
+    async for line in _ndjson_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            recipe = ImportedRecipe.model_validate_json(line)
+        except ValidationError as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_number, "error": _validation_error(e)})
+            continue
+        item = recipe.model_dump()
+        item['id'] = recipe.id or str(uuid.uuid4())
+        batch[item['id']] = item
+        if len(batch) == BATCH_WRITE_SIZE:
+            await submit(batch)
+            batch = {}
+            if len(in_flight) >= IMPORT_CONCURRENCY:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                await collect(done)
+    if batch:
+        await submit(batch)
+    if in_flight:
+        done, _ = await asyncio.wait(in_flight)
+        await collect(done)
+
+    list_cache.clear()
+    recipe_cache.clear()
+    imported = sum(written.values())
+    return {"imported": imported, "failed": len(written) - imported, "rejected": rejected, "errors": errors}
+
+
 #delete recipe
 @app.delete("/recipes/{recipe_id}", status_code=status.HTTP_200_OK)
 async def delete_recipe(recipe_id: str):
     try:
-        response = table.delete_item(
-            Key={
-                'id': recipe_id
-            }
-        )
+        response = await recipes.delete(recipe_id)
+        _invalidate(recipe_id)
         return {"message":response}
     except Exception as e:
         return {"message": f"Error deleting recipe: {e}"}
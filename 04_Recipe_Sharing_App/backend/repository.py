@@ -0,0 +1,228 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from search import MAX_FETCHED, match, recipe_tokens
+
+# Number of boto3 calls that may be in flight at the same time.
+# The botocore connection pool (max_pool_connections) should be at least this big.
+MAX_WORKERS = 16
+# BatchWriteItem accepts at most 25 put/delete requests per call
+BATCH_WRITE_SIZE = 25
+# BatchGetItem reads at most 100 keys per call
+BATCH_GET_SIZE = 100
+MAX_BATCH_RETRIES = 8
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+def to_dynamodb(item):
+    return {k: _serializer.serialize(v) for k, v in item.items()}
+
+def from_dynamodb(item):
+    return {k: _deserializer.deserialize(v) for k, v in item.items()}
+
+
+class RecipeRepository:
+    """Async data access for the recipes table.
+
+    boto3 is synchronous, so every call is handed to a bounded thread pool
+    and awaited, which keeps the event loop free for other requests.
+    A low-level client is used because, unlike boto3 resources, it is thread safe.
+
+    With a search_table, every write also maintains the search index
+    (see search.py): index entries are written before a recipe and removed after it,
+    including the entries of a version that an import overwrites.
+    """
+
+    def __init__(self, client, table_name, max_workers=MAX_WORKERS, search_table=None):
+        self._client = client
+        self._table_name = table_name
+        self._search_table = search_table
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="dynamodb")
+
+    async def _run(self, fn, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, **kwargs))
+
+    async def scan_page(self, limit=None, start_key=None, **scan_kwargs):
+        """Return one page of recipes and the key to continue from (or None)."""
+        if limit:
+            scan_kwargs['Limit'] = limit
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = to_dynamodb(start_key)
+        response = await self._run(self._client.scan, TableName=self._table_name, **scan_kwargs)
+        last_key = response.get('LastEvaluatedKey')
+        items = [from_dynamodb(item) for item in response['Items']]
+        return items, from_dynamodb(last_key) if last_key else None
+
+    async def scan_pages(self, start_key=None, **scan_kwargs):
+        """Yield the whole table one page at a time."""
+        while True:
+            items, start_key = await self.scan_page(start_key=start_key, **scan_kwargs)
+            yield items
+            if start_key is None:
+                break
+
+    async def scan_segments(self, total_segments, **scan_kwargs):
+        """Yield pages from a parallel scan, as they arrive from any of the segments."""
+        # bounded so a slow client applies back pressure to the scanners
+        queue = asyncio.Queue(maxsize=total_segments * 2)
+
+        async def scan_segment(segment):
+            try:
+                async for items in self.scan_pages(Segment=segment, TotalSegments=total_segments,
+                                                   **scan_kwargs):
+                    await queue.put(items)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(scan_segment(segment)) for segment in range(total_segments)]
+        try:
+            remaining = total_segments
+            while remaining:
+                items = await queue.get()
+                if items is None:
+                    remaining -= 1
+                elif isinstance(items, Exception):
+                    raise items
+                else:
+                    yield items
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def get(self, recipe_id):
+        """Return a single recipe, or None if it does not exist."""
+        response = await self._run(self._client.get_item, TableName=self._table_name,
+                                   Key=to_dynamodb({'id': recipe_id}))
+        item = response.get('Item')
+        return from_dynamodb(item) if item else None
+
+    async def put(self, item):
+        # Index first: if the put then fails, search skips the entries of a recipe
+        # that does not exist, whereas a recipe without entries could not be found.
+        if self._search_table and await self._run(self._write_index, items=[item]):
+            raise RuntimeError("search index writes unprocessed after retries")
+        return await self._run(self._client.put_item, TableName=self._table_name,
+                               Item=to_dynamodb(item))
+
+    def _batch_write(self, requests, table_name=None):
+        # Runs in a worker thread. Unprocessed items (throttling, partition limits)
+        # are retried with capped exponential backoff and full jitter.
+        # Returns the requests that were still unprocessed after retries.
+        table_name = table_name or self._table_name
+        pending = {table_name: requests}
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            response = self._client.batch_write_item(RequestItems=pending)
+            pending = response.get('UnprocessedItems')
+            if not pending:
+                return []
+            if attempt < MAX_BATCH_RETRIES:
+                time.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+        return pending[table_name]
+
+    def _write_index(self, items, add=True):
+        # Runs in a worker thread: one index entry per token of each recipe.
+        # Returns how many entries were still unprocessed after retries.
+        return self._write_entries([(token, item['id']) for item in items for token in recipe_tokens(item)], add)
+
+    def _write_entries(self, entries, add=True):
+        # (token, recipe_id) pairs to put or delete
+        requests = []
+        for token, recipe_id in entries:
+            key = {'token': {'S': token}, 'recipe_id': {'S': recipe_id}}
+            requests.append({'PutRequest': {'Item': key}} if add else {'DeleteRequest': {'Key': key}})
+        return sum(len(self._batch_write(requests[i:i + BATCH_WRITE_SIZE], self._search_table))
+                   for i in range(0, len(requests), BATCH_WRITE_SIZE))
+
+    def _batch_write_recipes(self, items):
+        # returns the ids of the recipes that were not written
+        if not self._search_table:
+            return [r['PutRequest']['Item']['id']['S']
+                    for r in self._batch_write([{'PutRequest': {'Item': to_dynamodb(item)}} for item in items])]
+        # the versions being overwritten tell which index entries become stale
+        old = self._batch_get([item['id'] for item in items])
+        # a batch whose index entries could not all be written is not imported
+        if self._write_index(items):
+            return [item['id'] for item in items]
+        unprocessed = [r['PutRequest']['Item']['id']['S']
+                       for r in self._batch_write([{'PutRequest': {'Item': to_dynamodb(item)}} for item in items])]
+        current = {item['id']: recipe_tokens(item) for item in items if item['id'] not in unprocessed}
+        stale = [(token, item['id']) for item in old if item['id'] in current
+                 for token in recipe_tokens(item) - current[item['id']]]
+        # entries left behind are skipped by search.rank, so a failure here is not fatal
+        self._write_entries(stale, add=False)
+        return unprocessed
+
+    async def batch_put(self, items):
+        """Write up to BATCH_WRITE_SIZE items; return the ids of those still unprocessed after retries."""
+        return await self._run(self._batch_write_recipes, items=items)
+
+    async def delete(self, recipe_id):
+        if not self._search_table:
+            return await self._run(self._client.delete_item, TableName=self._table_name,
+                                   Key=to_dynamodb({'id': recipe_id}))
+        # the deleted item tells which index entries to remove
+        response = await self._run(self._client.delete_item, TableName=self._table_name,
+                                   Key=to_dynamodb({'id': recipe_id}), ReturnValues='ALL_OLD')
+        old = response.pop('Attributes', None)
+        if old:
+            await self._run(self._write_index, items=[from_dynamodb(old)], add=False)
+        return response
+
+    def _posting_list(self, token):
+        ids = []
+        kwargs = {
+            'TableName': self._search_table,
+            'KeyConditionExpression': '#token = :token',
+            'ExpressionAttributeNames': {'#token': 'token', '#id': 'recipe_id'},
+            'ExpressionAttributeValues': {':token': {'S': token}},
+            'ProjectionExpression': '#id',
+        }
+        while True:
+            response = self._client.query(**kwargs)
+            ids += [item['recipe_id']['S'] for item in response['Items']]
+            if 'LastEvaluatedKey' not in response:
+                return ids
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _batch_get(self, ids):
+        # id, title, ingredients and likes of up to BATCH_GET_SIZE recipes
+        items = []
+        request = {self._table_name: {
+            'Keys': [to_dynamodb({'id': recipe_id}) for recipe_id in ids],
+            'ProjectionExpression': '#id, #title, #ingredients, #likes',
+            'ExpressionAttributeNames': {f'#{name}': name for name in ('id', 'title', 'ingredients', 'likes')},
+        }}
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            response = self._client.batch_get_item(RequestItems=request)
+            items += [from_dynamodb(item) for item in response['Responses'].get(self._table_name, [])]
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+            time.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+        return items
+
+    async def search(self, terms, mode='and'):
+        """Return the recipes the index matches for terms, and how many it matched.
+
+        The posting lists are read at the same time; of the matches, the
+        MAX_FETCHED matching the most terms are read from the recipes table.
+        With more matches than that, the recipes returned are only a part of them.
+        """
+        postings = await asyncio.gather(*(self._run(self._posting_list, token=token) for token in terms))
+        matched = match(postings, mode)
+        ids = sorted(matched, key=lambda recipe_id: (-matched[recipe_id], recipe_id))[:MAX_FETCHED]
+        pages = await asyncio.gather(*(self._run(self._batch_get, ids=ids[i:i + BATCH_GET_SIZE])
+                                       for i in range(0, len(ids), BATCH_GET_SIZE)))
+        return [item for page in pages for item in page], len(matched)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,89 @@
+import re
+import unicodedata
+from collections import Counter
+
+# Recipe search with an inverted index: the recipe-search table holds one item
+# per (token, recipe_id) for the normalized words of each recipe's title and
+# ingredient descriptions. The repository keeps it up to date on every write;
+# a query reads the posting list of each term and intersects (AND) or merges (OR)
+# them, so the recipes table is only read for the matches, never scanned.
+
+# Words that say nothing about what is in a recipe: articles, quantities, units
+STOPWORDS = {
+    'a', 'an', 'and', 'as', 'at', 'by', 'for', 'from', 'in', 'into', 'of', 'on', 'or', 'the', 'to',
+    'with', 'without', 'some', 'few', 'half', 'quarter', 'whole', 'large', 'medium', 'small',
+    'cup', 'tablespoon', 'tbsp', 'teaspoon', 'tsp', 'g', 'gram', 'kg', 'kilogram', 'mg', 'ml', 'l',
+    'litre', 'liter', 'oz', 'ounce', 'lb', 'pound', 'pinch', 'dash', 'handful', 'piece', 'slice',
+    'can', 'package', 'taste',
+}
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Terms per query, and matches read from the recipes table to rank them
+MAX_TERMS = 10
+MAX_FETCHED = 1000
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'                                  # berries -> berry
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'xes', 'sses')):
+        return word[:-2]                                        # tomatoes -> tomato
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]                                        # onions -> onion
+    return word
+
+
+def tokens(text):
+    """The normalized search tokens of a piece of text, in order, without duplicates."""
+    # "Jalapeños" and "jalapenos" are the same token
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    found = {}
+    for word in _WORD.findall(text):
+        word = _singular(word)
+        if len(word) > 1 and word not in STOPWORDS:
+            found[word] = None
+    return list(found)
+
+
+def recipe_tokens(recipe):
+    """The tokens a recipe is indexed under: title and ingredient words."""
+    text = [recipe.get('title') or '']
+    text += [i.get('description') or '' for i in recipe.get('ingredients') or [] if isinstance(i, dict)]
+    return set(tokens(' '.join(text)))
+
+
+def match(postings, mode='and'):
+    """{recipe_id: number of terms matched} for the posting lists of the terms.
+
+    AND intersects the lists, smallest first, and stops as soon as nothing is left;
+    OR counts every id in any list.
+    """
+    if mode == 'or':
+        return Counter(recipe_id for ids in postings for recipe_id in ids)
+    postings = sorted(postings, key=len)
+    ids = set(postings[0]) if postings else set()
+    for other in postings[1:]:
+        if not ids:
+            break
+        ids.intersection_update(other)
+    return dict.fromkeys(ids, len(postings))
+
+
+def rank(items, terms, mode='and'):
+    """The recipes among items that match terms, best first.
+
+    Matches are checked again against the recipe itself: index entries are written
+    before a recipe and removed after it, so for a moment (or for good, if removing
+    them failed) the index can list a recipe under words it no longer contains.
+    Recipes matching more terms come first, then the most liked ones.
+    """
+    terms = set(terms)
+    recipes = []
+    for item in items:
+        matched = len(terms & recipe_tokens(item))
+        if matched == len(terms) or (mode == 'or' and matched):
+            recipes.append({'id': item['id'], 'title': item['title'],
+                            'likes': item.get('likes', 0), 'matched': matched})
+    recipes.sort(key=lambda r: (-r['matched'], -r['likes'], r['id']))
+    return recipes
@@ -15,6 +15,9 @@ source venv/bin/activate
 FOLDER="https://raw.githubusercontent.com/shahinam2/AWS-DevOps-Projects/refs/heads/main/04_Recipe_Sharing_App/backend"
 wget ${FOLDER}/requirements.txt
 wget ${FOLDER}/main.py
+wget ${FOLDER}/repository.py
+wget ${FOLDER}/cache.py
+wget ${FOLDER}/search.py
 # Get the token, find the region and replace in main.py file
 TOKEN=$(curl -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 21600")
 sed -i "s/SELECTED_REGION/$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/dynamic/instance-identity/document | jq -r '.region')/g" main.py
@@ -0,0 +1,138 @@
+# Cold-start benchmark for the recipe Lambdas.
+#
+# Every run starts a fresh Python interpreter, like a new Lambda execution
+# environment, and measures for each handler:
+#   init  - importing index.py, which is what Lambda reports as "Init Duration"
+#   ready - init plus creating the DynamoDB client. The recipes-common layer
+#           postpones that to the first call that needs it; the old handlers
+#           created a boto3 resource at import, so for them ready == init.
+# With --baseline, the handlers of another commit are measured as well, so the
+# table shows before/after. Handlers whose imports are not installed locally
+# (the old post-recipe needs aws_lambda_powertools) are reported as n/a.
+#
+# Usage:
+#   pip install boto3
+#   python benchmarks/cold-start.py --baseline <commit> --runs 10
+#   python benchmarks/cold-start.py --importtime get-recipes    # slowest imports of one handler
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+LAYER_PATH = Path("layers") / "recipes-common" / "python"
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    import index
+except ImportError as e:
+    print(json.dumps({"error": f"{type(e).__name__}: {e.name}"}))
+    sys.exit()
+init = time.perf_counter() - start
+if "recipes_common.dynamodb" in sys.modules:
+    sys.modules["recipes_common.dynamodb"].client()
+print(json.dumps({"init": init, "ready": time.perf_counter() - start}))
+"""
+
+
+def environment(tree):
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "eu-central-1"),
+               AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing")
+    if (tree / LAYER_PATH).is_dir():
+        env["PYTHONPATH"] = str(tree / LAYER_PATH)
+    return env
+
+
+def measure(tree, handler, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", MEASURE], cwd=tree / "lambdas" / handler,
+                             env=environment(tree), capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        if "error" in result:
+            return result["error"]
+        results.append(result)
+    return (statistics.median(r["init"] for r in results) * 1000,
+            statistics.median(r["ready"] for r in results) * 1000)
+
+
+def checkout(ref, target):
+    """Extract this project's directory at `ref` into `target`."""
+    root, prefix = subprocess.run(["git", "rev-parse", "--show-toplevel", "--show-prefix"], cwd=PROJECT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.split()
+    archive = subprocess.run(["git", "archive", "--format=tar", f"{ref}:{prefix}"], cwd=root,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return Path(target)
+
+
+def import_time(handler, top):
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import index"],
+                            cwd=PROJECT_DIR / "lambdas" / handler, env=environment(PROJECT_DIR),
+                            capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative), name.rstrip()))
+    # children are listed before their parent and indented deeper; keep only what index pulled in
+    end = next(i for i, (_, name) in enumerate(rows) if name.strip() == "index")
+    depth = len(rows[end][1]) - len(rows[end][1].lstrip())
+    start = end
+    while start > 0 and len(rows[start - 1][1]) - len(rows[start - 1][1].lstrip()) > depth:
+        start -= 1
+    print(f"{handler}: import index took {rows[end][0] / 1000:.1f} ms")
+    for us, name in sorted(rows[start:end], reverse=True)[:top]:
+        print(f"{us / 1000:>10.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", help="git ref to compare against, e.g. a commit before the layer")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", metavar="HANDLER", help="show the slowest imports of one handler")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    if args.importtime:
+        import_time(args.importtime, args.top)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trees = {"current": PROJECT_DIR}
+        if args.baseline:
+            trees = {args.baseline: checkout(args.baseline, tmp), **trees}
+        handlers = sorted(p.name for p in (PROJECT_DIR / "lambdas").iterdir() if (p / "index.py").is_file())
+
+        notes = []
+        print(f"median of {args.runs} fresh interpreters, in ms")
+        print(f"{'handler':<16}" + "".join(f"{name[:12] + ' init':>18}{'ready':>8}" for name in trees))
+        for handler in handlers:
+            row = f"{handler:<16}"
+            for name, tree in trees.items():
+                if not (tree / "lambdas" / handler / "index.py").is_file():
+                    row += f"{'-':>18}{'-':>8}"
+                    continue
+                result = measure(tree, handler, args.runs)
+                if isinstance(result, str):
+                    row += f"{'n/a':>18}{'':>8}"
+                    notes.append(f"{handler} at {name}: {result}")
+                else:
+                    row += f"{result[0]:>18.1f}{result[1]:>8.1f}"
+            print(row)
+        for note in notes:
+            print(f"n/a - {note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# Benchmark: DynamoDB write units per 10k likes, one write per like vs batched.
+#
+#   direct  - like-recipe: one UpdateItem per like
+#   batched - likes go to a queue (an in-memory stand-in for SQS) and flush-likes
+#             applies one transactional "ADD likes :n" per recipe per batch, with a
+#             conditional put of each message id in the same transaction
+#
+# Likes follow a Zipf-like distribution so a few recipes are "viral".
+# moto does not report real consumed capacity, so write units are computed from
+# the item size the same way DynamoDB bills them: 1 WCU per started KB for a
+# standard write and 2 WCU per started KB for a transactional write.
+#
+# After the batched run, a fifth of the messages is delivered again in new
+# batches, as SQS does after a crash; the like counts must not change.
+#
+# Usage:
+#   pip install boto3 moto
+#   python benchmarks/likes-bench.py --likes 10000 --recipes 500 --batch-size 1000
+#
+#   10000 likes over 500 recipes, batch size 1000
+#   mode        write requests       WCU   invocations   seconds
+#   direct               10000     10000         10000      48.2
+#   batched              12686     25372            10      33.5
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, deque
+from decimal import Decimal
+from pathlib import Path
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+
+import boto3
+from moto import mock_aws
+
+LAMBDAS_DIR = Path(__file__).resolve().parent.parent / "lambdas"
+# the recipes-common layer, as Lambda puts it on sys.path
+sys.path.insert(0, str(LAMBDAS_DIR.parent / "layers" / "recipes-common" / "python"))
+
+from recipes_common import dynamodb
+
+
+@contextlib.contextmanager
+def one_backup_per_transaction():
+    """moto backs up a table before each action of a transaction, a deep copy of the
+    whole table each time. With up to 100 message puts per transaction into a table
+    that keeps growing, that makes the batched run quadratic. Copy each table once
+    per transaction instead; moto still restores it when the transaction is cancelled."""
+    from moto.dynamodb import models
+    backend_class = models.DynamoDBBackend
+    transact, real_copy = backend_class.transact_write_items, models.copy
+    backups = {}
+
+    class Copy:
+        @staticmethod
+        def deepcopy(value):
+            if not isinstance(value, models.Table):
+                return real_copy.deepcopy(value)
+            if id(value) not in backups:
+                backups[id(value)] = real_copy.deepcopy(value)
+            return backups[id(value)]
+
+    def transact_write_items(self, transact_items):
+        backups.clear()
+        try:
+            return transact(self, transact_items)
+        finally:
+            backups.clear()
+
+    models.copy, backend_class.transact_write_items = Copy, transact_write_items
+    try:
+        yield
+    finally:
+        models.copy, backend_class.transact_write_items = real_copy, transact
+
+
+def load_lambda(name):
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), LAMBDAS_DIR / name / "index.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def item_size(value):
+    """Approximate DynamoDB item size in bytes."""
+    if isinstance(value, dict):
+        return 3 + sum(len(k.encode()) + item_size(v) + 1 for k, v in value.items())
+    if isinstance(value, list):
+        return 3 + sum(item_size(v) + 1 for v in value)
+    if isinstance(value, (int, float, Decimal)):
+        return math.ceil(len(str(value).lstrip("-").replace(".", "")) / 2) + 1
+    return len(str(value).encode())
+
+
+def count_writes():
+    # the handlers share the layer's client; start each run with a fresh one
+    dynamodb._client = None
+    client = dynamodb.client()
+    writes = Counter()
+
+    def _count(params, model, **kwargs):
+        if model.name == "UpdateItem":
+            writes["standard"] += 1
+        elif model.name == "TransactWriteItems":
+            # recipe updates, and the message id items (under 1 KB) that make them idempotent
+            writes["transactional"] += sum("Update" in action for action in params["TransactItems"])
+            writes["messages"] += sum("Put" in action for action in params["TransactItems"])
+    client.meta.events.register("provide-client-params.dynamodb", _count)
+    return writes
+
+
+def setup(recipes):
+    ddb = boto3.resource("dynamodb")
+    ddb.create_table(TableName="recipes",
+                     KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+                     AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+                     BillingMode="PAY_PER_REQUEST")
+    ddb.create_table(TableName="like-messages",
+                     KeySchema=[{"AttributeName": "message_id", "KeyType": "HASH"}],
+                     AttributeDefinitions=[{"AttributeName": "message_id", "AttributeType": "S"}],
+                     BillingMode="PAY_PER_REQUEST")
+    table = ddb.Table("recipes")
+    with table.batch_writer() as batch:
+        for i in range(recipes):
+            batch.put_item(Item={
+                "id": f"recipe-{i:05d}",
+                "kind": "recipe",
+                "title": f"Recipe {i}",
+                "likes": 0,
+                "ingredients": [{"id": n, "description": f"ingredient {n}"} for n in range(6)],
+                "steps": [{"id": n, "description": f"step {n} of the recipe"} for n in range(4)],
+            })
+    return table
+
+
+def check_counts(table, expected):
+    for recipe_id, likes in expected.most_common(20):
+        assert table.get_item(Key={"id": recipe_id})["Item"]["likes"] == likes, recipe_id
+
+
+def run_direct(table, likes):
+    like_recipe = load_lambda("like-recipe")
+    writes = count_writes()
+    start = time.perf_counter()
+    for recipe_id in likes:
+        like_recipe.lambda_handler({"pathParameters": {"recipe_id": recipe_id}}, None)
+    return writes, len(likes), time.perf_counter() - start
+
+
+class LocalQueue:
+    """In-memory stand-in for the SQS likes queue (moto's SQS is too slow at this volume)."""
+
+    def __init__(self):
+        self._messages = deque()
+
+    def send(self, body):
+        self._messages.append({"messageId": str(uuid.uuid4()), "body": body})
+
+    def receive(self, max_messages):
+        count = min(max_messages, len(self._messages))
+        return [self._messages.popleft() for _ in range(count)]
+
+
+def run_batched(table, likes, batch_size):
+    flush_likes = load_lambda("flush-likes")
+    writes = count_writes()
+    queue = LocalQueue()
+    for recipe_id in likes:
+        queue.send(recipe_id)
+
+    invocations, delivered = 0, []
+    start = time.perf_counter()
+    # what the event source mapping does: deliver up to batch_size messages per invocation
+    while records := queue.receive(batch_size):
+        invocations += 1
+        result = flush_likes.lambda_handler({"Records": records}, None)
+        failed = {f["itemIdentifier"] for f in result["batchItemFailures"]}
+        assert not failed, f"{len(failed)} likes failed"
+        delivered += records
+    elapsed, counted = time.perf_counter() - start, Counter(writes)
+
+    # SQS delivers again what a function that crashed after its writes did not delete,
+    # grouped with other messages: a fifth of the likes, in new batches
+    rng = random.Random(3)
+    again = rng.sample(delivered, len(delivered) // 5)
+    for i in range(0, len(again), batch_size):
+        result = flush_likes.lambda_handler({"Records": again[i:i + batch_size]}, None)
+        assert not result["batchItemFailures"]
+    return counted, invocations, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--likes", type=int, default=10_000)
+    parser.add_argument("--recipes", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(args.recipes)]
+    likes = rng.choices([f"recipe-{i:05d}" for i in range(args.recipes)], weights, k=args.likes)
+    expected = Counter(likes)
+
+    print(f"{args.likes} likes over {args.recipes} recipes, batch size {args.batch_size}")
+    print(f"{'mode':<10}{'write requests':>16}{'WCU':>10}{'invocations':>14}{'seconds':>10}")
+    for mode in ("direct", "batched"):
+        with mock_aws(), one_backup_per_transaction():
+            table = setup(args.recipes)
+            kb = math.ceil(item_size(table.get_item(Key={"id": "recipe-00000"})["Item"]) / 1024)
+            with contextlib.redirect_stdout(io.StringIO()):   # the handlers log every call
+                if mode == "direct":
+                    writes, invocations, elapsed = run_direct(table, likes)
+                else:
+                    writes, invocations, elapsed = run_batched(table, likes, args.batch_size)
+            check_counts(table, expected)
+        wcu = writes["standard"] * kb + writes["transactional"] * 2 * kb + writes["messages"] * 2
+        print(f"{mode:<10}{sum(writes.values()):>16}{wcu:>10}{invocations:>14}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# Benchmark: ingredient search, inverted index vs scan + filter.
+#
+# Seeds a local recipes table (moto by default, or DynamoDB Local with
+# --endpoint-url http://localhost:8000) with --recipes recipes whose ingredients
+# follow a Zipf-like distribution over a small vocabulary, plus their
+# recipe-search index items, and runs a few AND / OR queries two ways:
+#   scan + filter  scan title, ingredients and likes of every recipe, tokenize
+#                  them in Python and keep the matches (what the API had to do)
+#   index          recipes_common.search.search: one Query per term, then
+#                  BatchGetItem on the matches or the likes-index for large results
+# Both rank by likes. Items read are reported next to the wall time, because moto
+# evaluates everything in Python; on DynamoDB Local or AWS the reads are what you pay.
+#
+# Checks:
+#   - both ways return the same number of matches and the same likes, in order,
+#     and every recipe the index returns really matches (ids are compared too
+#     when the matches are ranked by key, where ties are broken by id)
+#   - index-recipes, fed stream records, indexes a new recipe, re-indexes only the
+#     tokens an edit changed, writes nothing for a likes update and unindexes a
+#     deleted recipe; search-recipes finds the recipe, or no longer does
+#
+# Usage:
+#   docker run -p 8000:8000 amazon/dynamodb-local
+#   python benchmarks/search-bench.py --recipes 100000 --endpoint-url http://localhost:8000
+#   python benchmarks/search-bench.py --recipes 10000     # moto, pip install moto
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+
+import boto3
+
+LAMBDAS_DIR = Path(__file__).resolve().parent.parent / "lambdas"
+# the recipes-common layer, as Lambda puts it on sys.path
+sys.path.insert(0, str(LAMBDAS_DIR.parent / "layers" / "recipes-common" / "python"))
+
+from recipes_common import dynamodb, search
+
+INGREDIENTS = [
+    "salt", "olive oil", "garlic cloves", "onions", "black pepper", "butter", "eggs", "flour", "sugar",
+    "tomatoes", "lemon juice", "chicken breasts", "parsley", "milk", "carrots", "potatoes", "cream",
+    "basil leaves", "rice", "parmesan", "ginger", "soy sauce", "honey", "paprika", "cumin", "thyme",
+    "bell peppers", "mushrooms", "spinach", "beef mince", "bacon", "chili flakes", "coriander", "lime",
+    "mozzarella", "yogurt", "celery", "shallots", "white wine", "chickpeas", "coconut milk", "noodles",
+    "pasta", "salmon fillets", "shrimps", "tofu", "zucchini", "eggplant", "feta", "oregano", "rosemary",
+    "cinnamon", "vanilla", "almonds", "walnuts", "oats", "bananas", "strawberries", "blueberries",
+    "apples", "cabbage", "leeks", "peas", "corn", "black beans", "lentils", "avocados", "cheddar",
+    "pork belly", "lamb shoulder", "turmeric", "cardamom", "saffron", "jalapeños", "capers", "anchovies",
+]
+DISHES = ["soup", "stew", "salad", "curry", "pie", "risotto", "tacos", "bake", "stir fry", "pasta", "bowl"]
+STYLES = ["Quick", "Spicy", "Creamy", "Rustic", "Weeknight", "Summer", "Winter", "Smoky", "Zesty"]
+UNITS = ["2 cups", "1 tbsp", "3 tsp", "200 g", "1 pinch of", "4 large", "a handful of", "1 can of"]
+QUERIES = [("chicken garlic", "and"), ("tomato basil mozzarella", "and"), ("saffron risotto", "and"),
+           ("salt", "and"), ("tofu shrimp", "or"), ("lemon", "or")]
+
+
+def load_lambda(name):
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), LAMBDAS_DIR / name / "index.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_tables(ddb):
+    # mirror RecipesTable and RecipeSearchTable in CFN-Template.yaml
+    ddb.create_table(
+        TableName="recipes",
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "kind", "AttributeType": "S"},
+            {"AttributeName": "likes", "AttributeType": "N"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "likes-index",
+            "KeySchema": [{"AttributeName": "kind", "KeyType": "HASH"},
+                          {"AttributeName": "likes", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["title"]},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    ddb.create_table(
+        TableName="recipe-search",
+        KeySchema=[{"AttributeName": "token", "KeyType": "HASH"},
+                   {"AttributeName": "recipe_id", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "token", "AttributeType": "S"},
+                              {"AttributeName": "recipe_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return ddb.Table("recipes")
+
+
+def make_recipe(rng, i, weights):
+    ingredients = rng.choices(INGREDIENTS, weights, k=rng.randint(5, 12))
+    return {
+        "id": f"recipe-{i:07d}",
+        "kind": "recipe",
+        "title": f"{rng.choice(STYLES)} {rng.choice(ingredients).split()[0]} {rng.choice(DISHES)}",
+        "likes": int(rng.paretovariate(1.2)),
+        "ingredients": [{"id": n, "description": f"{rng.choice(UNITS)} {name}"}
+                        for n, name in enumerate(dict.fromkeys(ingredients))],
+        "steps": [{"id": n, "description": f"step {n}"} for n in range(4)],
+    }
+
+
+def seed(table, count):
+    rng = random.Random(42)
+    weights = [1 / (rank + 1) ** 0.7 for rank in range(len(INGREDIENTS))]
+    changes = {}
+    with table.batch_writer() as batch:
+        for i in range(count):
+            recipe = make_recipe(rng, i, weights)
+            batch.put_item(Item=recipe)
+            changes.update(((token, recipe["id"]), True) for token in search.recipe_tokens(recipe))
+    search.write(changes)
+    return len(changes)
+
+
+def scan_search(client, query, mode, limit):
+    terms = set(search.tokens(query))
+    kwargs = {"TableName": "recipes", "ProjectionExpression": "id, title, ingredients, likes"}
+    matches, read = [], 0
+    while True:
+        response = client.scan(**kwargs)
+        read += response["ScannedCount"]
+        for item in response["Items"]:
+            recipe = dynamodb.from_item(item)
+            found = len(terms & search.recipe_tokens(recipe))
+            if found == len(terms) or (mode == "or" and found):
+                matches.append({"id": recipe["id"], "title": recipe["title"],
+                                "likes": recipe["likes"], "matched": found})
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    matches.sort(key=lambda r: (-r["likes"], r["id"]))
+    return matches[:limit], len(matches), read, {r["id"] for r in matches}
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def count_calls():
+    # items read (posting list entries, recipes, likes-index entries) and index writes
+    client = dynamodb.client()
+    calls = {"reads": 0, "writes": 0}
+
+    def _writes(params, model, **kwargs):
+        if model.name == "BatchWriteItem":
+            calls["writes"] += sum(len(r) for r in params["RequestItems"].values())
+
+    def _reads(parsed, model, **kwargs):
+        if model.name == "Query":
+            calls["reads"] += parsed.get("ScannedCount", 0)
+        elif model.name == "BatchGetItem":
+            calls["reads"] += sum(len(items) for items in parsed.get("Responses", {}).values())
+    client.meta.events.register("provide-client-params.dynamodb", _writes)
+    client.meta.events.register("after-call.dynamodb", _reads)
+    return calls
+
+
+def check_stream(table):
+    """Feed index-recipes stream records and search through search-recipes."""
+    indexer, api = load_lambda("index-recipes"), load_lambda("search-recipes")
+    calls = count_calls()
+    sequence = 0
+
+    def stream(event_name, old=None, new=None):
+        nonlocal sequence
+        sequence += 1
+        images = {"Keys": {"id": {"S": (new or old)["id"]}}, "SequenceNumber": str(sequence)}
+        if old:
+            images["OldImage"] = dynamodb.to_item(old)
+        if new:
+            images["NewImage"] = dynamodb.to_item(new)
+        if event_name == "REMOVE":
+            table.delete_item(Key={"id": old["id"]})
+        else:
+            table.put_item(Item=new)
+        before = calls["writes"]
+        assert indexer.lambda_handler({"Records": [{"eventName": event_name, "dynamodb": images}]},
+                                      None) == {"batchItemFailures": []}
+        return calls["writes"] - before
+
+    def found(query):
+        response = api.lambda_handler({"queryStringParameters": {"q": query}}, None)
+        assert response["statusCode"] == 200, response
+        return [r["id"] for r in json.loads(response["body"])["recipes"]]
+
+    recipe = {"id": "recipe-new", "kind": "recipe", "title": "Fruit pancakes", "likes": 0,
+              "ingredients": [{"id": 0, "description": "1 ripe durian"}, {"id": 1, "description": "flour"}],
+              "steps": []}
+    assert stream("INSERT", new=recipe) == 5 and found("durian flour") == ["recipe-new"]
+    edited = {**recipe, "ingredients": [{"id": 0, "description": "2 ripe mangoes"}, recipe["ingredients"][1]]}
+    assert stream("MODIFY", recipe, edited) == 2                 # -durian +mango
+    assert found("durian") == [] and found("mango pancake") == ["recipe-new"]
+    assert stream("MODIFY", edited, {**edited, "likes": 7}) == 0
+    assert stream("REMOVE", old={**edited, "likes": 7}) == 5 and found("mango") == []
+    assert api.lambda_handler({"queryStringParameters": {"q": "the of"}}, None)["statusCode"] == 400
+    print("index-recipes keeps the index in step with inserts, edits and deletes; likes updates write nothing")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--endpoint-url", default=None)
+    args = parser.parse_args()
+
+    if args.endpoint_url:
+        mock = nullcontext()
+        # the layer creates its own client, from botocore
+        os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = args.endpoint_url
+    else:
+        from moto import mock_aws
+        mock = mock_aws()
+
+    with mock:
+        ddb = boto3.resource("dynamodb", endpoint_url=args.endpoint_url)
+        table = create_tables(ddb)
+        start = time.perf_counter()
+        entries = seed(table, args.recipes)
+        print(f"seeded {args.recipes} recipes and {entries} index items in {time.perf_counter() - start:.1f}s")
+
+        dynamodb._client = None
+        calls = count_calls()
+        client = dynamodb.client()
+        print(f"{'query':<28}{'mode':>5}{'matches':>9}{'scan ms':>10}{'read':>9}{'index ms':>10}{'read':>9}")
+        for query, mode in QUERIES:
+            scan_ms, (expected, total, scanned, matching) = timed(
+                lambda: scan_search(client, query, mode, args.limit), 1)
+            calls["reads"] = 0
+            index_ms, (recipes, index_total) = timed(lambda: search.search(query, mode, args.limit), args.repeat)
+            read = calls["reads"] // args.repeat
+            assert index_total == total, (query, index_total, total)
+            assert [r["likes"] for r in recipes] == [r["likes"] for r in expected], query
+            assert {r["id"] for r in recipes} <= matching, query
+            if total <= search.MAX_FETCHED:
+                assert recipes == expected, query
+            print(f"{query:<28}{mode:>5}{total:>9}{scan_ms:>10.1f}{scanned:>9}{index_ms:>10.1f}{read:>9}")
+
+        check_stream(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# Micro-benchmark: turning scanned DynamoDB items into the get-recipes response body.
+#
+#   old       - the previous get-recipes: TypeDeserializer -> Recipe/Ingredient/Step
+#               dict subclasses -> json.dumps with a Decimal hook, plus printing the
+#               list and the type of every recipe (sent to /dev/null here)
+#   new       - recipes_common.dynamodb.write_json_object, straight from the wire
+#               format one scan page at a time
+#   new+gzip  - new, then gzip + base64 as returned to clients sending Accept-Encoding: gzip
+#
+# The scan responses are generated in memory (no DynamoDB involved). Each mode runs in
+# its own process; "peak RSS" is how much the peak resident memory grew while
+# serializing, on top of the scanned pages themselves.
+#
+# Usage:
+#   pip install boto3
+#   python benchmarks/serialize-bench.py --items 10000 100000
+
+import argparse
+import base64
+import contextlib
+import gzip
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "layers" / "recipes-common" / "python"))
+
+from recipes_common import dynamodb
+
+PAGE_SIZE = 1000
+RECIPE_FIELDS = ("id", "title", "ingredients", "steps", "likes")
+
+
+def scan_pages(count):
+    """Scan responses (wire format) for `count` recipes, PAGE_SIZE items per page."""
+    def item(i):
+        return {
+            "id": {"S": f"0b5c3f0e-7d3c-4b8e-9a51-{i:012d}"},
+            "title": {"S": f"Grandma's recipe number {i}"},
+            "kind": {"S": "recipe"},
+            "likes": {"N": str(i % 977)},
+            "ingredients": {"L": [{"M": {"id": {"N": str(n)}, "description": {"S": f"{n + 1} cups of ingredient {n}"}}}
+                                  for n in range(8)]},
+            "steps": {"L": [{"M": {"id": {"N": str(n)}, "description": {"S": f"Step {n}: mix everything and wait a bit"}}}
+                            for n in range(5)]},
+        }
+    return [[item(i) for i in range(start, min(start + PAGE_SIZE, count))]
+            for start in range(0, count, PAGE_SIZE)]
+
+
+def old(pages):
+    from boto3.dynamodb.types import TypeDeserializer
+    deserializer = TypeDeserializer()
+
+    class Ingredient(dict):
+        def __init__(self, id, description):
+            super().__init__(id=id, description=description)
+
+    class Step(Ingredient):
+        pass
+
+    class Recipe(dict):
+        def __init__(self, id, title, ingredients, steps, likes):
+            super().__init__(id=id, title=title, ingredients=ingredients, steps=steps, likes=likes)
+
+    def _conv(o):
+        if isinstance(o, Decimal):
+            return int(o) if o == o.to_integral_value() else float(o)
+        raise TypeError
+
+    recipes = [{k: deserializer.deserialize(v) for k, v in item.items()} for page in pages for item in page]
+    recipes_list = []
+    for recipe in recipes:
+        ingredients = [Ingredient(ing['id'], ing['description']) for ing in recipe['ingredients']]
+        steps = [Step(step['id'], step['description']) for step in recipe['steps']]
+        recipes_list.append(Recipe(recipe['id'], recipe['title'], ingredients, steps, recipe['likes']))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        print("--------")
+        print(recipes_list)
+        for i in recipes_list:
+            print(type(i))
+    return json.dumps(recipes_list, default=_conv)
+
+
+def new(pages):
+    chunks = ["["]
+    separator = ""
+    for page in pages:
+        out = []
+        for item in page:
+            out.append(separator)
+            dynamodb.write_json_object(item, out, RECIPE_FIELDS)
+            separator = ","
+        chunks.append("".join(out))
+    chunks.append("]")
+    return "".join(chunks)
+
+
+def new_gzip(pages):
+    return base64.b64encode(gzip.compress(new(pages).encode(), compresslevel=5)).decode()
+
+
+MODES = {"old": old, "new": new, "new+gzip": new_gzip}
+
+
+def child(mode, count):
+    pages = scan_pages(count)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    body = MODES[mode](pages)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    if mode != "new+gzip":
+        assert len(json.loads(body)) == count
+    # ru_maxrss is in KB on Linux
+    print(json.dumps({"seconds": elapsed, "peak_kb": peak, "bytes": len(body)}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'items':>8}  {'mode':<10}{'items/s':>10}{'seconds':>9}{'peak RSS MB':>13}{'body MB':>9}")
+    for count in args.items:
+        for mode in MODES:
+            out = subprocess.run([sys.executable, __file__, "--child", mode, str(count)],
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out)
+            print(f"{count:>8}  {mode:<10}{count / result['seconds']:>10.0f}{result['seconds']:>9.2f}"
+                  f"{result['peak_kb'] / 1024:>13.1f}{result['bytes'] / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
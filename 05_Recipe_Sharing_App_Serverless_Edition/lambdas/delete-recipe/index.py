@@ -1,13 +1,12 @@
 import json
-import boto3
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('recipes')
+from recipes_common import dynamodb
 def lambda_handler(event, context):
     try:
         recipe_id = event['pathParameters']['recipe_id']
-        response = table.delete_item(
+        response = dynamodb.client().delete_item(
+            TableName=dynamodb.TABLE_NAME,
             Key={
-                'id': recipe_id
+                'id': {'S': recipe_id}
             }
         )
         return {
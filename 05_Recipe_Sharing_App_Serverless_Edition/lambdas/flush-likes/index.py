@@ -0,0 +1,122 @@
+import os
+import random
+import time
+from botocore.exceptions import ClientError
+from recipes_common import dynamodb
+# Consumes the likes queue. Every SQS message body is a recipe id (one like);
+# API Gateway sends them straight to SQS and the event source mapping delivers
+# them in batches, at most MaximumBatchingWindowInSeconds after the first like.
+# Each recipe then gets a single "ADD likes :n" instead of one write per like.
+#
+# SQS delivers at least once, and a redelivered message can arrive in any batch
+# with any other messages. So every like is applied exactly once per message: the
+# transaction that adds a recipe's likes also puts one item per SQS message id
+# into LIKE_MESSAGES_TABLE, on condition that it is not there yet. A message that
+# is already there was applied before and is skipped.
+MESSAGES_TABLE = os.environ.get('LIKE_MESSAGES_TABLE', 'like-messages')
+# Longer than a message can stay in the likes queue (4 days), so a redelivered
+# message always finds its item; DynamoDB TTL deletes them afterwards for free.
+MESSAGE_TTL_SECONDS = 5 * 24 * 3600
+# TransactWriteItems accepts at most 100 actions, and one action per item
+TRANSACTION_LIMIT = 100
+# transactions cancelled by a conflict with another batch, or by throttling
+MAX_RETRIES = 5
+def _chunks(groups):
+    """Split (recipe_id, [message ids]) into transactions of at most TRANSACTION_LIMIT actions:
+    one update per recipe plus one put per message, and each recipe once per transaction."""
+    chunk, size = [], 0
+    for recipe_id, ids in groups:
+        while ids:
+            if size + 2 > TRANSACTION_LIMIT:
+                yield chunk
+                chunk, size = [], 0
+            take = min(len(ids), TRANSACTION_LIMIT - size - 1)
+            chunk.append((recipe_id, ids[:take]))
+            size += take + 1
+            ids = ids[take:]
+            if ids:
+                # the rest of a recipe's likes go into the next transaction
+                yield chunk
+                chunk, size = [], 0
+    if chunk:
+        yield chunk
+def _actions(groups, expires_at):
+    for recipe_id, ids in groups:
+        yield {'Update': {
+            'TableName': dynamodb.TABLE_NAME,
+            'Key': {'id': {'S': recipe_id}},
+            'UpdateExpression': 'ADD likes :n',
+            # never create a stub item for a recipe that was deleted
+            'ConditionExpression': 'attribute_exists(id)',
+            'ExpressionAttributeValues': {':n': {'N': str(len(ids))}},
+        }}
+        for mid in ids:
+            yield {'Put': {
+                'TableName': MESSAGES_TABLE,
+                'Item': {'message_id': {'S': mid}, 'recipe_id': {'S': recipe_id},
+                         'expires_at': {'N': str(expires_at)}},
+                'ConditionExpression': 'attribute_not_exists(message_id)',
+            }}
+def _apply(groups):
+    """Apply one chunk of (recipe_id, [message ids]).
+
+    Returns the message ids that failed, the groups dropped because their recipe
+    was deleted, and the message ids skipped because they were applied before.
+    """
+    dropped, applied_before = [], []
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            dynamodb.client().transact_write_items(
+                TransactItems=list(_actions(groups, int(time.time()) + MESSAGE_TTL_SECONDS)))
+            return [], dropped, applied_before
+        except ClientError as e:
+            error = e
+        if error.response['Error']['Code'] != 'TransactionCanceledException':
+            break
+        # the reasons are in the order of the actions: the update, then the puts of each group
+        codes = iter(r.get('Code', 'None') for r in error.response.get('CancellationReasons') or [])
+        remaining, retry = [], False
+        for recipe_id, ids in groups:
+            update = next(codes, 'None')
+            puts = [next(codes, 'None') for _ in ids]
+            # another batch is writing the same recipe, or the table is throttled
+            retry |= bool({'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded'}
+                          & {update, *puts})
+            if update == 'ConditionalCheckFailed':
+                # drop likes for deleted recipes
+                dropped.append((recipe_id, ids))
+                continue
+            applied_before += [mid for mid, code in zip(ids, puts) if code == 'ConditionalCheckFailed']
+            ids = [mid for mid, code in zip(ids, puts) if code != 'ConditionalCheckFailed']
+            if ids:
+                remaining.append((recipe_id, ids))
+        if not remaining:
+            return [], dropped, applied_before
+        if remaining == groups and not retry:
+            break
+        if retry:
+            time.sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+        groups = remaining
+    print(f"Error flushing likes: {error}")
+    return [mid for _, ids in groups for mid in ids], dropped, applied_before
+def lambda_handler(event, context):
+    # a message delivered twice in one batch is one like (and one item per transaction)
+    records = {record['messageId']: record for record in event['Records']}
+    likes = {}
+    for mid, record in records.items():
+        likes.setdefault(record['body'].strip(), []).append(mid)
+    groups = sorted(likes.items())
+    failed, dropped, applied_before = [], [], []
+    for chunk in _chunks(groups):
+        chunk_failed, chunk_dropped, chunk_applied_before = _apply(chunk)
+        failed += chunk_failed
+        dropped += chunk_dropped
+        applied_before += chunk_applied_before
+    not_applied = set(failed) | set(applied_before) | {mid for _, ids in dropped for mid in ids}
+    recipes = sum(1 for _, ids in groups if any(mid not in not_applied for mid in ids))
+    dropped_likes = sum(len(ids) for _, ids in dropped)
+    print(f"Applied {len(records) - len(not_applied)} likes to {recipes} recipes; "
+          f"skipped {len(applied_before)} likes applied before; dropped {dropped_likes} likes "
+          f"for deleted recipes; {len(failed)} likes failed")
+    # only the failed messages go back to the queue
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in failed]}
@@ -0,0 +1,26 @@
+import json
+from decimal import Decimal
+from recipes_common import dynamodb
+def _conv(o):
+    if isinstance(o, Decimal):
+        return int(o) if o == o.to_integral_value() else float(o)
+    raise TypeError
+def lambda_handler(event, context):
+    try:
+        recipe_id = event['pathParameters']['recipe_id']
+        response = dynamodb.client().get_item(TableName=dynamodb.TABLE_NAME, Key={'id': {'S': recipe_id}})
+        if 'Item' not in response:
+            return {
+                "statusCode": 404,
+                "body": json.dumps({"message": "Recipe not found"})
+            }
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(dynamodb.from_item(response['Item']), default=_conv)
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": f"Error retrieving recipe: {e}"})
+        }
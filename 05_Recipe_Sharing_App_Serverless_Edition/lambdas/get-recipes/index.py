@@ -1,35 +1,95 @@
+import base64
+import gzip
 import json
-import boto3
-from typing import List, Dict
-from decimal import Decimal
-from boto3.dynamodb.conditions import Key
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('recipes')
-class Ingredient(Dict):
-    def __init__(self, id: int, description: str):
-        super().__init__(id=id, description=description)
-class Step(Dict):
-    def __init__(self, id: int, description: str):
-        super().__init__(id=id, description=description)
-class Recipe(Dict):
-    def __init__(self, id: str, title: str, ingredients: List[Ingredient], steps: List[Step], likes: int):
-        super().__init__(id=id, title=title, ingredients=ingredients, steps=steps, likes=likes)
+import os
+import time
+import hashlib
+from recipes_common import dynamodb
+# The cache lives at module scope so it survives warm invocations.
+# Writes happen in other functions and cannot invalidate it, so keep the TTL short.
+CACHE_TTL = float(os.environ.get('RECIPES_CACHE_TTL', '10'))
+CACHE_MAX_BYTES = int(os.environ.get('RECIPES_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+_cache = {'body': None, 'gzip': None, 'etag': None, 'expires': 0.0}
+# Smaller bodies are not worth compressing
+GZIP_MIN_BYTES = 1024
+# The fields of a recipe returned by the API, in this order
+RECIPE_FIELDS = ('id', 'title', 'ingredients', 'steps', 'likes')
+def _emit_cache_metric(hit):
+    # CloudWatch embedded metric format: turned into CacheHits/CacheMisses metrics
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": "RecipeSharing",
+                "Dimensions": [["Function"]],
+                "Metrics": [{"Name": "CacheHits", "Unit": "Count"},
+                            {"Name": "CacheMisses", "Unit": "Count"}],
+            }],
+        },
+        "Function": "get-recipes",
+        "CacheHits": int(hit),
+        "CacheMisses": int(not hit),
+    }))
+def _render_recipes():
+    """Scan the table and return all recipes as a JSON array.
+
+    Items are written to JSON straight from the scan response, one page at a time,
+    so only the current page and the JSON text are held in memory.
+    """
+    client = dynamodb.client()
+    kwargs = {
+        'TableName': dynamodb.TABLE_NAME,
+        'ProjectionExpression': ', '.join(f'#f{n}' for n in range(len(RECIPE_FIELDS))),
+        'ExpressionAttributeNames': {f'#f{n}': name for n, name in enumerate(RECIPE_FIELDS)},
+    }
+    pages = ['[']
+    separator = ''
+    while True:
+        response = client.scan(**kwargs)
+        out = []
+        for item in response['Items']:
+            out.append(separator)
+            dynamodb.write_json_object(item, out, RECIPE_FIELDS)
+            separator = ','
+        pages.append(''.join(out))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    pages.append(']')
+    return ''.join(pages)
+def _accepts_gzip(request_headers):
+    return any(coding.split(';')[0].strip() == 'gzip'
+               for coding in request_headers.get('accept-encoding', '').split(','))
 def lambda_handler(event, context):
     try:
-        response = table.scan()
-        recipes = response['Items']
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            recipes.extend(response['Items'])
-        recipes_list = []
-        for recipe in recipes:
-            ingredients = [Ingredient(ing['id'], ing['description']) for ing in recipe['ingredients']]
-            steps = [Step(step['id'], step['description']) for step in recipe['steps']]
-            recipes_list.append(Recipe(recipe['id'], recipe['title'], ingredients, steps, recipe['likes']))
-        print("--------")
-        print(recipes_list)
-        for i in recipes_list:
-            print(type(i))
-        return recipes_list
+        request_headers = event.get('headers') or {}
+        # "Cache-Control: no-cache" lets a client that just wrote read its own write
+        hit = (_cache['body'] is not None and _cache['expires'] > time.monotonic()
+               and 'no-cache' not in request_headers.get('cache-control', ''))
+        _emit_cache_metric(hit)
+        if hit:
+            body, etag = _cache['body'], _cache['etag']
+        else:
+            body = _render_recipes()
+            etag = '"' + hashlib.blake2b(body.encode(), digest_size=16).hexdigest() + '"'
+            if len(body) <= CACHE_MAX_BYTES:
+                _cache.update(body=body, gzip=None, etag=etag, expires=time.monotonic() + CACHE_TTL)
+        use_gzip = len(body) >= GZIP_MIN_BYTES and _accepts_gzip(request_headers)
+        # each encoding is a different representation, so it gets its own ETag
+        headers = {"ETag": etag[:-1] + '-gzip"' if use_gzip else etag, "Vary": "Accept-Encoding",
+                   "X-Cache": "HIT" if hit else "MISS"}
+        if_none_match = request_headers.get('if-none-match', '')
+        if if_none_match == '*' or headers["ETag"] in (tag.strip() for tag in if_none_match.split(',')):
+            return {"statusCode": 304, "headers": headers}
+        headers["Content-Type"] = "application/json"
+        if not use_gzip:
+            return {"statusCode": 200, "headers": headers, "body": body}
+        compressed = _cache['gzip'] if hit else None
+        if compressed is None:
+            compressed = base64.b64encode(gzip.compress(body.encode(), compresslevel=5)).decode()
+            if _cache['etag'] == etag:
+                _cache['gzip'] = compressed
+        headers["Content-Encoding"] = "gzip"
+        return {"statusCode": 200, "headers": headers, "body": compressed, "isBase64Encoded": True}
     except Exception as e:
-        return {"message": f"Error retrieving recipes: {e}"}
\ No newline at end of file
+        return {"statusCode": 500, "body": json.dumps({"message": f"Error retrieving recipes: {e}"})}
\ No newline at end of file
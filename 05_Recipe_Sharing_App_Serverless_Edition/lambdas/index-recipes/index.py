@@ -0,0 +1,28 @@
+from recipes_common import dynamodb, search
+# Consumes the DynamoDB stream of the recipes table (NEW_AND_OLD_IMAGES) and keeps
+# the recipe-search index in step: a new recipe adds one item per token, a deleted
+# one removes them, and an edit only writes the tokens that changed. Likes updates
+# leave title and ingredients alone, so they write nothing.
+def _changes(records):
+    # Later records win for the same (token, recipe): they follow the earlier ones
+    # on the shard, and BatchWriteItem rejects two requests for one key anyway.
+    changes = {}
+    for record in records:
+        images = record['dynamodb']
+        recipe_id = images['Keys']['id']['S']
+        old = search.recipe_tokens(dynamodb.from_item(images.get('OldImage', {})))
+        new = search.recipe_tokens(dynamodb.from_item(images.get('NewImage', {})))
+        for token in old - new:
+            changes[(token, recipe_id)] = False
+        for token in new - old:
+            changes[(token, recipe_id)] = True
+    return changes
+def lambda_handler(event, context):
+    records = event['Records']
+    try:
+        search.write(_changes(records))
+    except Exception as e:
+        # Index writes are idempotent: retry the whole batch from its first record
+        print(f"Error indexing recipes: {e}")
+        return {"batchItemFailures": [{"itemIdentifier": records[0]['dynamodb']['SequenceNumber']}]}
+    return {"batchItemFailures": []}
@@ -1,16 +1,15 @@
 import json
-import boto3
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('recipes')
+from recipes_common import dynamodb
 def lambda_handler(event, context):
     
     recipe_id = event['pathParameters']['recipe_id']
     print(recipe_id)
     try:
-        response = table.update_item(
-            Key={'id': recipe_id},
+        response = dynamodb.client().update_item(
+            TableName=dynamodb.TABLE_NAME,
+            Key={'id': {'S': recipe_id}},
             UpdateExpression='SET likes = likes + :val',
-            ExpressionAttributeValues={':val': 1},
+            ExpressionAttributeValues={':val': {'N': '1'}},
             ReturnValues='UPDATED_NEW'
         )
         return {"message": "Recipe liked successfully"}
@@ -0,0 +1,42 @@
+import json
+from recipes_common import search
+# GET /recipes/search?q=chicken garlic&mode=and|or&limit=20
+# Answered from the recipe-search inverted index: one Query per term, then the
+# matches are ranked by likes with BatchGetItem, or by reading the likes-index
+# when there are many. The recipes table is never scanned.
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MODES = ('and', 'or')
+def _bad_request(message):
+    return {
+        "statusCode": 400,
+        "body": json.dumps({"message": message})
+    }
+def lambda_handler(event, context):
+    params = event.get('queryStringParameters') or {}
+    query = params.get('q', '')
+    mode = params.get('mode', 'and').lower()
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        return _bad_request(f"limit must be between 1 and {MAX_LIMIT}")
+    if mode not in MODES:
+        return _bad_request("mode must be 'and' or 'or'")
+    terms = search.tokens(query)
+    if not terms:
+        return _bad_request("q must contain at least one ingredient or title word")
+    try:
+        recipes, total = search.search(query, mode, limit)
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"terms": terms[:search.MAX_TERMS], "mode": mode, "total": total,
+                                "recipes": recipes})
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": f"Error searching recipes: {e}"})
+        }
@@ -0,0 +1,41 @@
+import json
+import os
+from recipes_common import dynamodb
+# Every recipe carries kind = "recipe", so the likes-index GSI keeps all of them in
+# one partition sorted by likes; reading it backwards gives the ranking in N reads.
+LIKES_INDEX = os.environ.get('LIKES_INDEX', 'likes-index')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+def lambda_handler(event, context):
+    params = event.get('queryStringParameters') or {}
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"message": f"limit must be between 1 and {MAX_LIMIT}"})
+        }
+    try:
+        response = dynamodb.client().query(
+            TableName=dynamodb.TABLE_NAME,
+            IndexName=LIKES_INDEX,
+            KeyConditionExpression='#kind = :kind',
+            ExpressionAttributeNames={'#kind': 'kind'},
+            ExpressionAttributeValues={':kind': {'S': 'recipe'}},
+            ScanIndexForward=False,
+            Limit=limit,
+        )
+        recipes = [{'id': item['id']['S'], 'title': item['title']['S'], 'likes': int(item['likes']['N'])}
+                   for item in response['Items']]
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(recipes)
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": f"Error retrieving top recipes: {e}"})
+        }
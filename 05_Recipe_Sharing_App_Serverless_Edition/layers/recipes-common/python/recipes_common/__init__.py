@@ -0,0 +1,19 @@
+"""Shared runtime for the recipe Lambdas, deployed as the recipes-common layer.
+
+Nothing heavy is imported up front: botocore is only loaded the first time a
+handler asks for the DynamoDB client, and the models (dataclasses) only when
+a handler uses them, so handlers that return early never pay for either.
+"""
+import importlib
+
+__all__ = ["Ingredient", "Recipe", "Step", "ValidationError", "dynamodb", "search"]
+
+_MODELS = {"Ingredient", "Recipe", "Step", "ValidationError"}
+
+
+def __getattr__(name):
+    if name in _MODELS:
+        return getattr(importlib.import_module("recipes_common.models"), name)
+    if name in ("dynamodb", "search"):
+        return importlib.import_module(f"recipes_common.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,110 @@
+import os
+from decimal import Decimal
+from json.encoder import encode_basestring_ascii as _json_string
+
+TABLE_NAME = os.environ.get('RECIPES_TABLE', 'recipes')
+
+_client = None
+
+def client():
+    """Return the shared low-level DynamoDB client, creating it on first use.
+
+    It is kept at module scope so warm invocations reuse the client and its
+    open (keep-alive) connections.
+    """
+    global _client
+    if _client is None:
+        import botocore.session
+        from botocore.config import Config
+        _client = botocore.session.get_session().create_client('dynamodb', config=Config(
+            tcp_keepalive=True,
+            connect_timeout=1,
+            read_timeout=3,
+            max_pool_connections=10,
+            retries={'max_attempts': 3, 'mode': 'standard'},
+        ))
+    return _client
+
+# Minimal replacement for boto3's TypeSerializer/TypeDeserializer, covering the
+# types recipes use, so the handlers do not need to import boto3 at all.
+def serialize(value):
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': {k: serialize(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(v) for v in value]}
+    raise TypeError(f"Unsupported DynamoDB type: {type(value).__name__}")
+
+def deserialize(attribute):
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return int(value) if value.lstrip('-').isdigit() else Decimal(value)
+    if kind == 'M':
+        return {k: deserialize(v) for k, v in value.items()}
+    if kind == 'L':
+        return [deserialize(v) for v in value]
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'SS':
+        return set(value)
+    if kind == 'NS':
+        return {int(v) if v.lstrip('-').isdigit() else Decimal(v) for v in value}
+    raise TypeError(f"Unsupported DynamoDB type: {kind}")
+
+def to_item(data):
+    return {k: serialize(v) for k, v in data.items()}
+
+def from_item(item):
+    return {k: deserialize(v) for k, v in item.items()}
+
+# JSON straight from the wire format: no Python objects are rebuilt, and numbers
+# are copied as DynamoDB sent them, so there is no Decimal or float round trip.
+def write_json(attribute, out):
+    """Append the JSON text of one attribute value to the list `out`."""
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        out.append(_json_string(value))
+    elif kind == 'N':
+        out.append(value)
+    elif kind == 'M':
+        write_json_object(value, out)
+    elif kind == 'L':
+        out.append('[')
+        separator = ''
+        for element in value:
+            out.append(separator)
+            write_json(element, out)
+            separator = ','
+        out.append(']')
+    elif kind == 'BOOL':
+        out.append('true' if value else 'false')
+    elif kind == 'NULL':
+        out.append('null')
+    elif kind == 'SS':
+        out.append('[' + ','.join(_json_string(v) for v in value) + ']')
+    elif kind == 'NS':
+        out.append('[' + ','.join(value) + ']')
+    else:
+        raise TypeError(f"Unsupported DynamoDB type: {kind}")
+
+def write_json_object(item, out, fields=None):
+    """Append an item (or map) as a JSON object; `fields` picks and orders the keys."""
+    out.append('{')
+    separator = ''
+    for name in fields or item:
+        if name in item:
+            out.append(separator + _json_string(name) + ':')
+            write_json(item[name], out)
+            separator = ','
+    out.append('}')
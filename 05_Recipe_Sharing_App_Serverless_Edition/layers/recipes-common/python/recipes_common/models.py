@@ -0,0 +1,73 @@
+from dataclasses import asdict, dataclass, field
+from typing import List
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def _require(data, name, kind, where):
+    value = data.get(name)
+    # bool is an int subclass; true/false is not a valid id
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ValidationError(f"{where}{name}: expected {kind.__name__}")
+    return value
+
+
+@dataclass
+class _Entry:
+    id: int
+    description: str
+
+    @classmethod
+    def from_dict(cls, data, where=""):
+        if not isinstance(data, dict):
+            raise ValidationError(f"{where.rstrip('.')}: expected object")
+        return cls(_require(data, 'id', int, where), _require(data, 'description', str, where))
+
+
+class Ingredient(_Entry):
+    pass
+
+
+class Step(_Entry):
+    pass
+
+
+@dataclass
+class Recipe:
+    """A recipe as stored in the recipes table.
+
+    Plain dataclasses instead of pydantic: validation is a handful of type
+    checks and importing this module costs next to nothing.
+    """
+    id: str
+    title: str
+    ingredients: List[Ingredient]
+    steps: List[Step]
+    likes: int = 0
+    kind: str = field(default='recipe')
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ValidationError("expected a JSON object")
+        ingredients = data.get('ingredients')
+        steps = data.get('steps')
+        if not isinstance(ingredients, list):
+            raise ValidationError("ingredients: expected list")
+        if not isinstance(steps, list):
+            raise ValidationError("steps: expected list")
+        likes = data.get('likes', 0)
+        if not isinstance(likes, int) or isinstance(likes, bool) or likes < 0:
+            raise ValidationError("likes: expected a non-negative int")
+        return cls(
+            id=_require(data, 'id', str, ''),
+            title=_require(data, 'title', str, ''),
+            ingredients=[Ingredient.from_dict(i, f"ingredients.{n}.") for n, i in enumerate(ingredients)],
+            steps=[Step.from_dict(s, f"steps.{n}.") for n, s in enumerate(steps)],
+            likes=likes,
+        )
+
+    def to_dict(self):
+        return asdict(self)
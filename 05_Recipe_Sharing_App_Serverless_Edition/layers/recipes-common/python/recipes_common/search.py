@@ -0,0 +1,209 @@
+"""Inverted index for recipe search, kept in its own table (SEARCH_TABLE).
+
+Every recipe is indexed under the normalized words of its title and ingredient
+descriptions: one item per (token, recipe_id), so a token's posting list is a
+single Query on the partition. The index-recipes function keeps it in step with
+the recipes table from its DynamoDB stream; search() queries the posting lists
+of the query terms, intersects (AND) or merges (OR) them, and ranks the matches
+by likes.
+"""
+import os
+import random
+import re
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from recipes_common import dynamodb
+
+TABLE_NAME = os.environ.get('SEARCH_TABLE', 'recipe-search')
+LIKES_INDEX = os.environ.get('LIKES_INDEX', 'likes-index')
+
+# Words that say nothing about what is in a recipe: articles, quantities, units
+STOPWORDS = {
+    'a', 'an', 'and', 'as', 'at', 'by', 'for', 'from', 'in', 'into', 'of', 'on', 'or', 'the', 'to',
+    'with', 'without', 'some', 'few', 'half', 'quarter', 'whole', 'large', 'medium', 'small',
+    'cup', 'tablespoon', 'tbsp', 'teaspoon', 'tsp', 'g', 'gram', 'kg', 'kilogram', 'mg', 'ml', 'l',
+    'litre', 'liter', 'oz', 'ounce', 'lb', 'pound', 'pinch', 'dash', 'handful', 'piece', 'slice',
+    'can', 'package', 'taste',
+}
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Terms per query. Up to MAX_FETCHED matches are ranked by reading them by key
+# (BatchGetItem reads 100 keys per call), more by walking the likes-index.
+MAX_TERMS = 10
+MAX_FETCHED = 1000
+BATCH_GET_SIZE = 100
+LIKES_PAGE_SIZE = 500
+# BatchWriteItem accepts at most 25 put/delete requests per call
+BATCH_WRITE_SIZE = 25
+MAX_BATCH_RETRIES = 8
+
+_pool = None
+
+
+def _executor():
+    # as many threads as the shared client has connections
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=10, thread_name_prefix='search')
+    return _pool
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'                                  # berries -> berry
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'xes', 'sses')):
+        return word[:-2]                                        # tomatoes -> tomato
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]                                        # onions -> onion
+    return word
+
+
+def tokens(text):
+    """The normalized search tokens of a piece of text, in order, without duplicates."""
+    # "Jalapeños" and "jalapenos" are the same token
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    found = {}
+    for word in _WORD.findall(text):
+        word = _singular(word)
+        if len(word) > 1 and word not in STOPWORDS:
+            found[word] = None
+    return list(found)
+
+
+def recipe_tokens(recipe):
+    """The tokens a recipe (a plain dict) is indexed under: title and ingredient words."""
+    text = [recipe.get('title') or '']
+    text += [i.get('description') or '' for i in recipe.get('ingredients') or [] if isinstance(i, dict)]
+    return set(tokens(' '.join(text)))
+
+
+def write(changes):
+    """Apply {(token, recipe_id): True to add, False to remove} to the index.
+
+    Raises if some writes are still unprocessed after the retries; every write is
+    idempotent, so the caller can simply run the same changes again.
+    """
+    requests = [
+        {'PutRequest': {'Item': {'token': {'S': token}, 'recipe_id': {'S': recipe_id}}}} if add else
+        {'DeleteRequest': {'Key': {'token': {'S': token}, 'recipe_id': {'S': recipe_id}}}}
+        for (token, recipe_id), add in changes.items()
+    ]
+    batches = [requests[i:i + BATCH_WRITE_SIZE] for i in range(0, len(requests), BATCH_WRITE_SIZE)]
+    unprocessed = sum(_executor().map(_batch_write, batches))
+    if unprocessed:
+        raise RuntimeError(f"{unprocessed} search index writes unprocessed after retries")
+
+
+def _batch_write(requests):
+    pending = {TABLE_NAME: requests}
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        pending = dynamodb.client().batch_write_item(RequestItems=pending).get('UnprocessedItems')
+        if not pending:
+            return 0
+        if attempt < MAX_BATCH_RETRIES:
+            time.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+    return len(pending[TABLE_NAME])
+
+
+def posting_list(token):
+    """The ids of the recipes indexed under token."""
+    ids = []
+    kwargs = {
+        'TableName': TABLE_NAME,
+        'KeyConditionExpression': '#token = :token',
+        'ExpressionAttributeNames': {'#token': 'token', '#id': 'recipe_id'},
+        'ExpressionAttributeValues': {':token': {'S': token}},
+        'ProjectionExpression': '#id',
+    }
+    while True:
+        response = dynamodb.client().query(**kwargs)
+        ids += [item['recipe_id']['S'] for item in response['Items']]
+        if 'LastEvaluatedKey' not in response:
+            return ids
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def match(postings, mode='and'):
+    """{recipe_id: number of terms matched} for the posting lists of the terms.
+
+    AND intersects the lists, smallest first, and stops as soon as nothing is left;
+    OR counts every id in any list.
+    """
+    if mode == 'or':
+        return Counter(recipe_id for ids in postings for recipe_id in ids)
+    postings = sorted(postings, key=len)
+    ids = set(postings[0]) if postings else set()
+    for other in postings[1:]:
+        if not ids:
+            break
+        ids.intersection_update(other)
+    return dict.fromkeys(ids, len(postings))
+
+
+def _batch_get(ids):
+    # title and likes of up to BATCH_GET_SIZE recipes; unprocessed keys are retried
+    items = []
+    request = {dynamodb.TABLE_NAME: {
+        'Keys': [{'id': {'S': recipe_id}} for recipe_id in ids],
+        'ProjectionExpression': 'id, title, likes',
+    }}
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        response = dynamodb.client().batch_get_item(RequestItems=request)
+        items += response['Responses'].get(dynamodb.TABLE_NAME, [])
+        request = response.get('UnprocessedKeys')
+        if not request:
+            break
+        time.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+    return items
+
+
+def _top_liked(matched, limit):
+    # Read the likes-index (every recipe, most liked first) and keep the matches:
+    # for a common term that is about limit * table size / matches reads, far fewer
+    # than fetching every match.
+    recipes = []
+    kwargs = {
+        'TableName': dynamodb.TABLE_NAME,
+        'IndexName': LIKES_INDEX,
+        'KeyConditionExpression': '#kind = :kind',
+        'ExpressionAttributeNames': {'#kind': 'kind'},
+        'ExpressionAttributeValues': {':kind': {'S': 'recipe'}},
+        'ScanIndexForward': False,
+        'Limit': LIKES_PAGE_SIZE,
+    }
+    while len(recipes) < limit:
+        response = dynamodb.client().query(**kwargs)
+        recipes += [item for item in response['Items'] if item['id']['S'] in matched]
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return recipes[:limit]
+
+
+def search(query, mode='and', limit=20):
+    """Recipes matching the terms of query, most liked first; returns (recipes, total matches).
+
+    Each recipe is {'id', 'title', 'likes', 'matched'}, matched being the number
+    of query terms it contains. Up to MAX_FETCHED matches are read by key and
+    sorted; more than that, and the likes-index is read from the top instead.
+    """
+    terms = tokens(query)[:MAX_TERMS]
+    if not terms:
+        return [], 0
+    postings = list(_executor().map(posting_list, terms))
+    matched = match(postings, mode)
+    if len(matched) > MAX_FETCHED:
+        items = _top_liked(matched, limit)
+    else:
+        ids = sorted(matched)
+        chunks = [ids[i:i + BATCH_GET_SIZE] for i in range(0, len(ids), BATCH_GET_SIZE)]
+        items = [item for found in _executor().map(_batch_get, chunks) for item in found]
+        items.sort(key=lambda item: (-int(item.get('likes', {'N': '0'})['N']), item['id']['S']))
+    recipes = [{'id': item['id']['S'], 'title': item['title']['S'],
+                'likes': int(item.get('likes', {'N': '0'})['N']), 'matched': matched[item['id']['S']]}
+               for item in items[:limit]]
+    return recipes, len(matched)
@@ -0,0 +1,44 @@
+# One-off backfill for recipes created before the likes-index GSI existed.
+#
+# The index only contains items that have both `kind` and `likes`, so older
+# recipes are tagged with kind = "recipe" (and likes = 0 when it is missing).
+#
+# Usage:
+#   python scripts/backfill-recipe-kind.py [--table recipes] [--region eu-central-1]
+
+import argparse
+
+import boto3
+from botocore.exceptions import ClientError
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--table", default="recipes")
+parser.add_argument("--region", default=None)
+args = parser.parse_args()
+
+table = boto3.resource("dynamodb", region_name=args.region).Table(args.table)
+
+updated = 0
+scan_kwargs = {
+    "ProjectionExpression": "id",
+    "FilterExpression": "attribute_not_exists(kind) OR attribute_not_exists(likes)",
+}
+while True:
+    response = table.scan(**scan_kwargs)
+    for item in response["Items"]:
+        try:
+            table.update_item(
+                Key={"id": item["id"]},
+                UpdateExpression="SET kind = :kind, likes = if_not_exists(likes, :zero)",
+                ConditionExpression="attribute_exists(id)",   # skip recipes deleted meanwhile
+                ExpressionAttributeValues={":kind": "recipe", ":zero": 0},
+            )
+            updated += 1
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+    if "LastEvaluatedKey" not in response:
+        break
+    scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+print(f"Backfilled {updated} recipes")
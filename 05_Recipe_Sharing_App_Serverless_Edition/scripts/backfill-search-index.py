@@ -0,0 +1,46 @@
+# One-off backfill of the recipe-search index for recipes created before it existed.
+#
+# index-recipes only sees changes made after the stream was enabled, so this scans
+# the recipes table once (title and ingredients only) and writes the index items
+# of every recipe. Index writes are idempotent, so running it twice does no harm.
+#
+# Usage:
+#   python scripts/backfill-search-index.py [--table recipes] [--search-table recipe-search]
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--table", default="recipes")
+parser.add_argument("--search-table", default="recipe-search")
+parser.add_argument("--region", default=None)
+args = parser.parse_args()
+
+# the layer reads its table names and region from the environment, as in Lambda
+os.environ["RECIPES_TABLE"] = args.table
+os.environ["SEARCH_TABLE"] = args.search_table
+if args.region:
+    os.environ["AWS_DEFAULT_REGION"] = args.region
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "layers" / "recipes-common" / "python"))
+from recipes_common import dynamodb, search
+
+indexed = 0
+scan_kwargs = {
+    "TableName": args.table,
+    "ProjectionExpression": "id, title, ingredients",
+}
+while True:
+    response = dynamodb.client().scan(**scan_kwargs)
+    changes = {}
+    for item in response["Items"]:
+        recipe = dynamodb.from_item(item)
+        changes.update(((token, recipe["id"]), True) for token in search.recipe_tokens(recipe))
+    search.write(changes)
+    indexed += len(response["Items"])
+    if "LastEvaluatedKey" not in response:
+        break
+    scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+print(f"Indexed {indexed} recipes")
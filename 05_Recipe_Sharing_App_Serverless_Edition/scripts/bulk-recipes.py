@@ -0,0 +1,197 @@
+# Bulk import / export for the recipes table.
+#
+#   import: reads NDJSON (one recipe per line), validates each line as it is read and
+#           writes with BatchWriteItem in 25-item batches on a pool of worker threads.
+#           Unprocessed items are retried with exponential backoff.
+#   export: runs a parallel scan (Segment / TotalSegments) and streams NDJSON out.
+#           If the scan of a segment fails, the export fails too (the file is incomplete).
+#
+# Usage:
+#   python scripts/bulk-recipes.py import recipes.ndjson [--workers 16]
+#   python scripts/bulk-recipes.py export recipes.ndjson [--segments 16]
+#   (use "-" for stdin / stdout)
+
+import argparse
+import json
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
+
+BATCH_WRITE_SIZE = 25
+MAX_BATCH_RETRIES = 8
+MAX_REPORTED_ERRORS = 100
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+def validate(line):
+    """Return a recipe item for one NDJSON line, or raise ValueError."""
+    recipe = json.loads(line, parse_float=Decimal)
+    if not isinstance(recipe, dict):
+        raise ValueError("line must be a JSON object")
+    # bool is a subclass of int: true/false are not ids or like counts
+    if isinstance(recipe.get("id"), bool):
+        raise ValueError("id: must not be true or false")
+    if not isinstance(recipe.get("title"), str):
+        raise ValueError("title: must be a string")
+    for field in ("ingredients", "steps"):
+        entries = recipe.get(field)
+        if not isinstance(entries, list):
+            raise ValueError(f"{field}: must be a list")
+        for n, entry in enumerate(entries):
+            if not (isinstance(entry, dict) and isinstance(entry.get("id"), int)
+                    and not isinstance(entry["id"], bool) and isinstance(entry.get("description"), str)):
+                raise ValueError(f"{field}.{n}: must be {{\"id\": int, \"description\": str}}")
+    likes = recipe.get("likes", 0)
+    if not isinstance(likes, int) or isinstance(likes, bool) or likes < 0:
+        raise ValueError("likes: must be a non-negative integer")
+    return {
+        "id": str(recipe.get("id") or uuid.uuid4()),
+        "kind": "recipe",
+        "title": recipe["title"],
+        "ingredients": [{"id": e["id"], "description": e["description"]} for e in recipe["ingredients"]],
+        "steps": [{"id": e["id"], "description": e["description"]} for e in recipe["steps"]],
+        "likes": likes,
+    }
+
+
+def batch_write(client, table, items):
+    """Write one batch, retrying unprocessed items; return how many were never written."""
+    pending = {table: [{"PutRequest": {"Item": {k: serializer.serialize(v) for k, v in item.items()}}}
+                       for item in items]}
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        pending = client.batch_write_item(RequestItems=pending).get("UnprocessedItems")
+        if not pending:
+            return 0
+        if attempt < MAX_BATCH_RETRIES:
+            time.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+    return len(pending[table])
+
+
+def import_recipes(client, table, source, workers):
+    imported = failed = rejected = 0
+    batch = {}            # keyed by id: BatchWriteItem rejects duplicate keys in one call
+    in_flight = {}        # future -> number of items
+    start = time.perf_counter()
+
+    def collect(futures):
+        nonlocal imported, failed
+        for future in futures:
+            size = in_flight.pop(future)
+            try:
+                unprocessed = future.result()
+            except Exception as e:
+                print(f"Error importing batch: {e}", file=sys.stderr)
+                unprocessed = size
+            imported += size - unprocessed
+            failed += unprocessed
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                item = validate(line)
+            except ValueError as e:
+                rejected += 1
+                if rejected <= MAX_REPORTED_ERRORS:
+                    print(f"line {line_number}: {e}", file=sys.stderr)
+                continue
+            batch[item["id"]] = item
+            if len(batch) == BATCH_WRITE_SIZE:
+                in_flight[executor.submit(batch_write, client, table, list(batch.values()))] = len(batch)
+                batch = {}
+                # keep a bounded number of batches queued so memory stays flat
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+        if batch:
+            in_flight[executor.submit(batch_write, client, table, list(batch.values()))] = len(batch)
+        collect(list(in_flight))
+
+    elapsed = time.perf_counter() - start
+    print(f"imported {imported}, failed {failed}, rejected {rejected} "
+          f"in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):.0f} recipes/s)", file=sys.stderr)
+
+
+def _json_default(o):
+    if isinstance(o, Decimal):
+        return int(o) if o == o.to_integral_value() else float(o)
+    raise TypeError
+
+
+def export_recipes(client, table, target, segments):
+    pages = queue.Queue(maxsize=segments * 2)     # back pressure if the writer is slow
+
+    def scan_segment(segment):
+        kwargs = {"TableName": table, "Segment": segment, "TotalSegments": segments}
+        try:
+            while True:
+                response = client.scan(**kwargs)
+                pages.put(response["Items"])
+                if "LastEvaluatedKey" not in response:
+                    break
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            pages.put(None)
+        except Exception as e:
+            # a segment that failed did not finish: the export is incomplete
+            pages.put(e)
+
+    exported = 0
+    start = time.perf_counter()
+    threads = [threading.Thread(target=scan_segment, args=(segment,), daemon=True)
+               for segment in range(segments)]
+    for thread in threads:
+        thread.start()
+    remaining = segments
+    while remaining:
+        items = pages.get()
+        if items is None:
+            remaining -= 1
+            continue
+        if isinstance(items, Exception):
+            raise items
+        target.write("".join(
+            json.dumps({k: deserializer.deserialize(v) for k, v in item.items()}, default=_json_default) + "\n"
+            for item in items))
+        exported += len(items)
+    elapsed = time.perf_counter() - start
+    print(f"exported {exported} recipes in {elapsed:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file", help='NDJSON file, or "-" for stdin/stdout')
+    parser.add_argument("--table", default="recipes")
+    parser.add_argument("--region", default=None)
+    parser.add_argument("--endpoint-url", default=None)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--segments", type=int, default=16)
+    args = parser.parse_args()
+
+    client = boto3.client("dynamodb", region_name=args.region, endpoint_url=args.endpoint_url,
+                          config=Config(max_pool_connections=max(args.workers, args.segments),
+                                        retries={"max_attempts": 10, "mode": "adaptive"}))
+    if args.command == "import":
+        source = sys.stdin if args.file == "-" else open(args.file)
+        with source:
+            import_recipes(client, args.table, source, args.workers)
+    else:
+        target = sys.stdout if args.file == "-" else open(args.file, "w")
+        with target:
+            export_recipes(client, args.table, target, args.segments)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,84 @@
-import json, os, boto3
-from boto3.dynamodb.conditions import Key
+import json, os, time, boto3
 from decimal import Decimal
 
 dynamodb = boto3.resource("dynamodb")
 table    = dynamodb.Table(os.getenv("DYNAMODB_TABLE_NAME", "profile_results"))
 
+MAX_WAIT_SECONDS = 20     # API Gateway gives up on the integration after 30 s
+MAX_IMAGE_IDS    = 100    # keys per BatchGetItem
+FIRST_DELAY      = 0.25   # seconds between reads while waiting, growing …
+MAX_DELAY        = 1.0    # … up to this
+HEADERS          = {"Access-Control-Allow-Origin": "*"}
+RAW_FIELDS       = ("face_details", "moderation_labels")   # for rescore.py, not for the browser
+
 def _conv(o):
     # DynamoDB numbers → JS numbers
     if isinstance(o, Decimal):
         return float(o)
     raise TypeError
 
-def lambda_handler(event, _):
-    qs = event.get("queryStringParameters") or {}
-    image_id = qs.get("image_id")
-    if not image_id:
-        return {"statusCode": 400,
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": "query param image_id is required"}
-
-    resp = table.get_item(Key={"image_id": image_id})
-
-    if "Item" not in resp:                 # not ready yet
-        return {"statusCode": 202,         # 202 Accepted
-                "headers": {"Access-Control-Allow-Origin": "*"},
-                "body": json.dumps({"ready": False})}
-
-    return {"statusCode": 200,
-            "headers": {"Access-Control-Allow-Origin": "*"},
-            "body": json.dumps({"ready": True, "data": resp["Item"]},
-                               default=_conv)}
+def _public(item):
+    return {k: v for k, v in item.items() if k not in RAW_FIELDS}
+
+def _error(message):
+    return {"statusCode": 400, "headers": HEADERS, "body": message}
+
+def read_results(image_ids):
+    """The stored results of image_ids, in one BatchGetItem.
+
+    Keys DynamoDB leaves unprocessed are simply missing; callers read them again.
+    """
+    resp = dynamodb.meta.client.batch_get_item(
+        RequestItems={table.name: {"Keys": [{"image_id": i} for i in image_ids]}})
+    return {item["image_id"]: _public(item) for item in resp["Responses"].get(table.name, [])}
+
+# ───────────────────────── handler ───────────────────────────
+#   GET /result?image_id=<id>                     → {"ready": bool, "data": {...}}
+#   GET /result?image_ids=<id>,<id>,…             → {"ready": bool, "results": {id: {...}}, "pending": [id, …]}
+# With &wait_seconds=N (at most 20) the request is held until a result is there
+# or N seconds have passed, reading again after 0.25 s, 0.5 s, then every 1 s.
+# For image_ids, the ones still missing are in "pending"; ask again for those.
+# 200 when everything is ready, 202 when something is still being analyzed.
+# The frontend gets its results pushed by result_push.py; this is the fallback.
+def lambda_handler(event, context):
+    qs    = event.get("queryStringParameters") or {}
+    batch = "image_ids" in qs
+    if batch:
+        image_ids = list(dict.fromkeys(i for i in qs["image_ids"].split(",") if i))
+    else:
+        image_ids = [qs["image_id"]] if qs.get("image_id") else []
+    if not image_ids:
+        return _error("query param image_id or image_ids is required")
+    if len(image_ids) > MAX_IMAGE_IDS:
+        return _error(f"at most {MAX_IMAGE_IDS} image_ids per request")
+    try:
+        wait = float(qs.get("wait_seconds") or 0)
+    except ValueError:
+        return _error("wait_seconds must be a number")
+    wait = min(wait, MAX_WAIT_SECONDS) if wait > 0 else 0     # NaN too
+    if context:                            # leave time to answer before the Lambda timeout
+        wait = min(wait, context.get_remaining_time_in_millis() / 1000 - 1)
+
+    deadline = time.monotonic() + wait
+    delay    = FIRST_DELAY
+    while True:
+        if len(image_ids) == 1:
+            item    = table.get_item(Key={"image_id": image_ids[0]}).get("Item")
+            results = {image_ids[0]: _public(item)} if item else {}
+        else:
+            results = read_results(image_ids)
+        if results or time.monotonic() + delay > deadline:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_DELAY)
+
+    ready = len(results) == len(image_ids)
+    if batch:
+        body = {"ready": ready, "results": results, "pending": [i for i in image_ids if i not in results]}
+    elif ready:
+        body = {"ready": True, "data": results[image_ids[0]]}
+    else:
+        body = {"ready": False}            # not ready yet
+    return {"statusCode": 200 if ready else 202,   # 202 Accepted
+            "headers": HEADERS,
+            "body": json.dumps(body, default=_conv)}
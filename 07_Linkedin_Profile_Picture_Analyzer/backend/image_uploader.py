@@ -1,4 +1,4 @@
-import base64, binascii, json, logging, mimetypes, os, uuid
+import json, logging, os, uuid
 
 import boto3
 
@@ -6,69 +6,70 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 s3   = boto3.client("s3")
-sqs  = boto3.client("sqs")
 
-BUCKET_NAME          = os.environ["IMAGE_BUCKET_NAME"]
-REKOGNITION_QUEUE_URL = os.environ["REKOGNITION_QUEUE_URL"]
+BUCKET_NAME      = os.environ["IMAGE_BUCKET_NAME"]
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))  # Rekognition's S3 image limit
+URL_EXPIRES_IN   = 300                                                           # seconds
+# Rekognition reads JPEG and PNG only
+EXTENSIONS       = {"image/jpeg": ".jpg", "image/png": ".png"}
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST,OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
 
 # ───────────────────────── helper ────────────────────────────
-def _decode_image_b64(b64_string: str) -> bytes:
-    """Return raw bytes from a base-64 string (no data-URL prefix)."""
-    try:
-        return base64.b64decode(b64_string, validate=True)
-    except binascii.Error as e:
-        raise ValueError("file_content must be valid base-64") from e
+def _response(status, body):
+    return {"statusCode": status, "headers": CORS_HEADERS, "body": json.dumps(body)}
 
 # ───────────────────────── handler ───────────────────────────
+# The image does not pass through this function. It returns a presigned POST,
+# and the browser sends the file straight to S3:
+#   request : {"content_type": "image/jpeg", "size": 123456, "force_reanalysis": false}
+#   response: {"image_id": "<uuid>.jpg", "upload": {"url": ..., "fields": {...}}, "expires_in": 300}
+# The form has to include every field, then the file as the last one. S3 rejects
+# files of another content type or larger than MAX_UPLOAD_BYTES. The new object
+# notifies the Rekognition queue, which starts the analysis.
 def lambda_handler(event, _):
     logger.info("Raw event: %s", json.dumps(event)[:1000])
 
     # CORS pre-flight
     if (event.get("httpMethod") or
         event.get("requestContext", {}).get("http", {}).get("method")) == "OPTIONS":
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "POST,OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type",
-            },
-            "body": "",
-        }
+        return {"statusCode": 200, "headers": CORS_HEADERS, "body": ""}
 
-    # API Gateway can mark the body as base-64
-    if event.get("isBase64Encoded"):
-        raw_bytes = base64.b64decode(event["body"])
-        file_name = event["headers"].get("x-file-name") or f"{uuid.uuid4()}.jpg"
-        content_type = event["headers"].get("content-type") or "image/jpeg"
-    else:
-        body = json.loads(event["body"] or "{}")
-        file_name     = body.get("file_name") or f"{uuid.uuid4()}.jpg"
-        raw_bytes     = _decode_image_b64(body["file_content"])
-        content_type, _ = mimetypes.guess_type(file_name)
-        content_type = content_type or "application/octet-stream"
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except ValueError:
+        return _response(400, {"error": "body must be JSON"})
+    content_type = body.get("content_type")
+    size         = body.get("size")
+    if content_type not in EXTENSIONS:
+        return _response(400, {"error": f"content_type must be one of {', '.join(EXTENSIONS)}"})
+    if size is not None and not (isinstance(size, int) and 0 < size <= MAX_UPLOAD_BYTES):
+        return _response(413, {"error": f"images can be at most {MAX_UPLOAD_BYTES} bytes"})
 
-    # ── upload to S3 ─────────────────────────────────────────
-    logger.info("Uploading %s (%s bytes) to bucket %s", file_name, len(raw_bytes), BUCKET_NAME)
-    s3.put_object(
+    # a fresh key per upload, so nobody can overwrite someone else's image
+    image_id = f"{uuid.uuid4()}{EXTENSIONS[content_type]}"
+    force    = "true" if body.get("force_reanalysis") is True else "false"
+    upload   = s3.generate_presigned_post(
         Bucket=BUCKET_NAME,
-        Key=file_name,
-        Body=raw_bytes,
-        ContentType=content_type,
+        Key=image_id,
+        Fields={"Content-Type": content_type, "x-amz-meta-force-reanalysis": force},
+        Conditions=[
+            {"Content-Type": content_type},
+            {"x-amz-meta-force-reanalysis": force},
+            ["content-length-range", 1, MAX_UPLOAD_BYTES],
+        ],
+        ExpiresIn=URL_EXPIRES_IN,
     )
+    logger.info("Presigned upload of %s (%s) to bucket %s", image_id, content_type, BUCKET_NAME)
 
-    s3_uri = f"s3://{BUCKET_NAME}/{file_name}"
-
-    # ── send SQS message ─────────────────────────────────────
-    sqs.send_message(QueueUrl=REKOGNITION_QUEUE_URL,
-                     MessageBody=json.dumps({"s3_path": s3_uri}))
-
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST,OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type",
-        },
-        "body": json.dumps({"message": "upload ok", "s3_path": s3_uri}),
-    }
\ No newline at end of file
+    return _response(200, {
+        "message":    "upload url ok",
+        "image_id":   image_id,
+        "s3_path":    f"s3://{BUCKET_NAME}/{image_id}",
+        "upload":     upload,
+        "expires_in": URL_EXPIRES_IN,
+    })
@@ -1,36 +1,112 @@
 # analyze_image.py  ── Lambda handler for SQS → Rekognition → DynamoDB
 #
-#  • Reads an SQS message that contains {"s3_path": "s3://bucket/key"}.
+#  • Reads the S3 "object created" notifications of the upload bucket from SQS
+#    (older messages that contain {"s3_path": "s3://bucket/key"} work too).
 #  • Runs Rekognition quality + moderation checks.
 #  • Stores one row per message in DynamoDB table   profile_results
 #      - partition key: record_id   (String – the SQS messageId)
-#      - attributes :  s3_path, status, issues (StringSet), scores (Map<Number>)
+#      - attributes :  s3_path, status, issues (StringSet), scores (Map<Number>),
+#                      face_details, moderation_labels (the raw Rekognition responses),
+#                      rules_version, analyzed_at (epoch seconds)
+#
+#  status and issues come from the scoring rules (scoring.py), a versioned JSON
+#  rule set read from the SSM parameter SCORING_RULES_PARAMETER and used for up to
+#  a minute. Changing a threshold is a parameter update, and rescore.py applies
+#  new rules to stored results from their face_details, without Rekognition.
+#
+#  Analyses are cached by content in the table   analysis_cache
+#      - partition key: sha256, expires_at (epoch seconds, DynamoDB TTL)
+#  The SHA-256 of each image is computed while streaming it from S3. An image
+#  whose hash has an unexpired entry gets that analysis under its own image_id,
+#  without calling Rekognition; so does a second copy of an image in the same
+#  batch. Its stored responses are scored with the current rules. Objects
+#  uploaded with x-amz-meta-force-reanalysis: true skip the lookup and refresh
+#  the entry.
+#  Hits and misses are logged as CloudWatch metrics (embedded metric format):
+#  ProfileAnalyzer / CacheHits, CacheMisses, ForcedAnalyses, PreScreened.
+#
+#  Before any Rekognition call, each image is pre-screened while it is read:
+#  the JPEG/PNG header gives format and size, so files that are no image, are
+#  corrupt or smaller than 80 × 80 pixels get a "Bad" result right away. With
+#  NumPy and Pillow (IMAGE_TOOLS_LAYER_ARN), a downsampled copy also rejects
+#  images that are almost black, white or blank (issues well_lit, sharp_image):
+#  JPEGs up to 320 KB are decoded at reduced scale, larger ones use their EXIF
+#  thumbnail, PNGs are decoded up to 0.1 megapixels. Objects over Rekognition's
+#  15 MB limit are "Bad" (image_too_large). Rekognition still decides every image
+#  that passes.
+#
+#  The Rekognition calls of all records in the batch (two per record) run at the
+#  same time on a thread pool of REKOGNITION_WORKERS threads. The rows are then
+#  written with BatchWriteItem, 25 per request. Messages that failed anywhere are
+#  returned as batchItemFailures, so SQS redelivers only those (the event source
+#  mapping needs function_response_types = ["ReportBatchItemFailures"]).
 #
 #  Required IAM:
 #      rekognition:DetectFaces, rekognition:DetectModerationLabels
 #      s3:GetObject   on the bucket
-#      dynamodb:PutItem  on the table
+#      dynamodb:BatchWriteItem  on the table
+#      dynamodb:BatchGetItem, dynamodb:BatchWriteItem  on the cache table
+#      ssm:GetParameter  on the rules parameter
 #
 #  Required environment variables:
 #      DYNAMODB_TABLE_NAME   (defaults to "profile_results")
+#      REKOGNITION_WORKERS   (defaults to 10, concurrent Rekognition calls)
+#      CACHE_TABLE_NAME      (defaults to "analysis_cache")
+#      CACHE_TTL_SECONDS     (defaults to 604800 = 7 days, 0 turns the cache off)
+#      SCORING_RULES_PARAMETER  (SSM parameter name; unset: scoring_rules.json next to scoring.py)
 # ---------------------------------------------------------------------------
 
-import json, logging, os
-from urllib.parse import urlparse
+import hashlib, io, json, logging, os, struct, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_plus, urlparse
 from decimal import Decimal
 from pathlib import PurePosixPath
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+try:                                          # optional, from the image tools layer
+    import numpy as np
+    from PIL import ExifTags, Image
+except ImportError:
+    np = ExifTags = Image = None
+
+import scoring
+
 # ─────────────── setup ───────────────
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rekognition = boto3.client("rekognition")
+REKOGNITION_WORKERS = int(os.environ.get("REKOGNITION_WORKERS", "10"))
+BATCH_WRITE_SIZE    = 25                      # BatchWriteItem limit
+BATCH_WRITE_RETRIES = 5                       # attempts for unprocessed items
+BATCH_GET_SIZE      = 100                     # BatchGetItem limit
+CACHE_TTL_SECONDS   = int(os.environ.get("CACHE_TTL_SECONDS", "604800"))
+HASH_CHUNK_SIZE     = 1024 * 1024             # bytes read from S3 at a time
+METRICS_NAMESPACE   = "ProfileAnalyzer"
+MIN_DIMENSION       = 80                      # Rekognition's smallest image width and height
+MAX_IMAGE_BYTES     = 15 * 1024 * 1024        # Rekognition's limit for S3 objects
+STATS_MAX_BYTES     = 320 * 1024              # JPEG decoding costs ~20 ms per MB, larger ones use the EXIF thumbnail
+STATS_MAX_PIXELS    = 100_000                 # PNG decoding costs ~50 ms per megapixel of a photo
+THUMBNAIL_SIZE      = 256                     # pixels the pre-screen looks at, per side
+MIN_BRIGHTNESS      = 5                       # mean of the thumbnail, 0-100
+MAX_BRIGHTNESS      = 97
+MIN_SHARPNESS       = 5                       # variance of its Laplacian; 0 for a blank image
+MIN_MODERATION      = 50                      # labels stored; the rules decide which ones count
+
+# one pooled connection per worker thread; throttled calls are retried with backoff
+rekognition = boto3.client("rekognition", config=Config(
+    max_pool_connections=REKOGNITION_WORKERS,
+    retries={"max_attempts": 5, "mode": "standard"},
+))
+s3          = boto3.client("s3", config=Config(max_pool_connections=REKOGNITION_WORKERS))
 dynamodb    = boto3.resource("dynamodb")
 TABLE_NAME  = os.environ.get("DYNAMODB_TABLE_NAME", "profile_results")
 table       = dynamodb.Table(TABLE_NAME)
+CACHE_TABLE = os.environ.get("CACHE_TABLE_NAME", "analysis_cache")
+executor    = ThreadPoolExecutor(max_workers=REKOGNITION_WORKERS)   # reused across warm invocations
+rule_source = scoring.RuleSource(os.environ.get("SCORING_RULES_PARAMETER"))
 
 # ─────────────── helpers ─────────────
 def split_s3(uri: str):
@@ -39,6 +115,118 @@ def split_s3(uri: str):
         raise ValueError(f"Not s3:// URI: {uri}")
     return p.netloc, p.path.lstrip("/")
 
+def s3_objects(body):
+    """(bucket, key) of every object in an SQS message body."""
+    if "s3_path" in body:
+        return [split_s3(body["s3_path"])]
+    if body.get("Event") == "s3:TestEvent":   # sent once when the notification is set up
+        return []
+    # S3 URL-encodes the keys in notifications
+    return [(r["s3"]["bucket"]["name"], unquote_plus(r["s3"]["object"]["key"]))
+            for r in body["Records"] if r["eventName"].startswith("ObjectCreated:")]
+
+def read_object(bucket, key):
+    """
+    SHA-256 (hex) of an object, whether it asks for a new analysis, and its
+    pre-screen issues.
+    """
+    obj    = s3.get_object(Bucket=bucket, Key=key)
+    size   = obj["ContentLength"]
+    keep   = Image and size <= STATS_MAX_BYTES   # the whole file is decoded
+    digest = hashlib.sha256()
+    chunks = []
+    for chunk in obj["Body"].iter_chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+        if keep or not chunks:
+            chunks.append(chunk)
+    head = chunks[0] if chunks else b""
+    return (digest.hexdigest(), obj.get("Metadata", {}).get("force-reanalysis") == "true",
+            prescreen(head, b"".join(chunks) if keep else None, size))
+
+def image_size(head):
+    """(format, width, height) from the first bytes of a file; ValueError(issue) if it is no usable image."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        if len(head) < 24 or head[12:16] != b"IHDR":
+            raise ValueError("corrupt_image")
+        width, height = struct.unpack(">II", head[16:24])
+        return "png", width, height
+    if not head.startswith(b"\xff\xd8"):
+        raise ValueError("unsupported_format")
+    pos = 2                                   # JPEG: walk the segments up to the frame header
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            break
+        marker = head[pos + 1]
+        if marker == 0xFF:                    # fill byte
+            pos += 1
+        elif marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2                          # markers without a length
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if pos + 9 > len(head):
+                break
+            height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+            return "jpeg", width, height
+        elif marker in (0xD9, 0xDA):          # end of image or scan data before any frame header
+            break
+        else:
+            pos += 2 + int.from_bytes(head[pos + 2:pos + 4], "big")
+    raise ValueError("corrupt_image")
+
+def exif_thumbnail(head):
+    """The small JPEG that cameras and phones store in the EXIF data, or None."""
+    img  = Image.open(io.BytesIO(head))      # reads the header only
+    ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+    if not {0x0201, 0x0202} <= ifd1.keys():
+        return None
+    start = 6 + ifd1[0x0201]                  # offsets count from the TIFF header, after "Exif\0\0"
+    return img.info["exif"][start:start + ifd1[0x0202]] or None
+
+def pixel_issues(image):
+    """well_lit / sharp_image if a downsampled copy is almost uniformly dark, bright or blank."""
+    img = Image.open(io.BytesIO(image))
+    img.draft("L", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))   # JPEGs decode at 1/2 … 1/8 scale directly
+    img = img.convert("L")
+    img = img.reduce(max(1, max(img.size) // THUMBNAIL_SIZE))
+    pixels    = np.asarray(img, dtype=np.float32)
+    laplacian = (4 * pixels[1:-1, 1:-1] - pixels[:-2, 1:-1] - pixels[2:, 1:-1]
+                 - pixels[1:-1, :-2] - pixels[1:-1, 2:])
+    issues = []
+    if not MIN_BRIGHTNESS <= pixels.mean() / 2.55 <= MAX_BRIGHTNESS:
+        issues.append("well_lit")
+    if laplacian.var() < MIN_SHARPNESS:
+        issues.append("sharp_image")
+    return issues
+
+def prescreen(head, data, size):
+    """
+    Issues that rule an image out without Rekognition. head is the start of the
+    file; data all of it, or None where it is not needed (or there is no Pillow).
+    """
+    try:
+        fmt, width, height = image_size(head)
+    except ValueError as err:
+        return [str(err)]
+    if min(width, height) < MIN_DIMENSION:
+        return ["image_too_small"]
+    if size > MAX_IMAGE_BYTES:
+        return ["image_too_large"]
+    if Image is None:
+        return []
+
+    if size <= STATS_MAX_BYTES and (fmt == "jpeg" or width * height <= STATS_MAX_PIXELS):
+        try:
+            return pixel_issues(data)
+        except Exception as err:
+            logger.info("Pre-screen could not decode the image: %s", err)
+            return ["corrupt_image"]
+    if fmt == "jpeg":
+        try:
+            thumbnail = exif_thumbnail(head)
+            return pixel_issues(thumbnail) if thumbnail else []
+        except Exception as err:                 # a broken thumbnail says nothing about the image
+            logger.info("Pre-screen skipped the EXIF thumbnail: %s", err)
+    return []                                    # decoding would cost too much; header checks only
+
 def to_decimal(obj):
     if isinstance(obj, float):
         return Decimal(str(obj))
@@ -48,87 +236,209 @@ def to_decimal(obj):
         return {k: to_decimal(v) for k, v in obj.items()}
     return obj
 
+def analyze(faces, mods, rules):
+    """Status, issues and scores of an image from its two Rekognition responses, and the responses."""
+    faces  = faces.result()["FaceDetails"]
+    labels = mods.result()["ModerationLabels"]
+    status, issues = scoring.evaluate(rules, faces, labels)
+    analysis = {"status": status, "issues": issues, "scores": {}, "rules_version": rules["version"],
+                "face_details": faces, "moderation_labels": labels}
+    if len(faces) != 1:
+        return to_decimal(analysis)
+    face = faces[0]
+
+    return to_decimal({
+        **analysis,
+        "scores": {
+            "face_confidence": round(face["Confidence"], 2),
+            "sharpness":       round(face["Quality"]["Sharpness"], 2),
+            "brightness":      round(face["Quality"]["Brightness"], 2),
+            "smile":           round(face["Smile"]["Confidence"], 2),
+            "eyes_open":       round(face["EyesOpen"]["Confidence"], 2)
+        }
+    })
+
+def from_cache(entry, rules):
+    """A cached analysis; status and issues from the current rules where it has the responses."""
+    analysis = {k: entry[k] for k in ("status", "issues", "scores", "rules_version") + scoring.RAW_FIELDS
+                if k in entry}
+    if "face_details" in entry:
+        status, issues = scoring.evaluate(rules, entry["face_details"], entry.get("moderation_labels", []))
+        analysis.update(status=status, issues=issues, rules_version=rules["version"])
+    return analysis
+
+def read_cache(hashes):
+    """Unexpired cached analyses by sha256. Lookup errors count as misses."""
+    hashes, found, now = list(hashes), {}, int(time.time())
+    for start in range(0, len(hashes), BATCH_GET_SIZE):
+        keys = [{"sha256": h} for h in hashes[start:start + BATCH_GET_SIZE]]
+        try:
+            resp = table.meta.client.batch_get_item(RequestItems={CACHE_TABLE: {"Keys": keys}})
+        except ClientError as aws_err:
+            logger.error("Cache lookup failed: %s", aws_err)
+            continue
+        # TTL deletes expired items some time later, not right away
+        for entry in resp.get("Responses", {}).get(CACHE_TABLE, []):
+            if entry.get("expires_at", 0) > now:
+                found[entry["sha256"]] = entry
+    return found
+
+def put_each(requests, table_name, key):
+    """PutItem one request at a time. Returns the keys of the items that could not be written."""
+    failed = set()
+    for r in requests:
+        try:
+            table.meta.client.put_item(TableName=table_name, Item=r["PutRequest"]["Item"])
+        except ClientError as aws_err:
+            logger.error("PutItem of %s on %s failed: %s", r["PutRequest"]["Item"][key], table_name, aws_err)
+            failed.add(r["PutRequest"]["Item"][key])
+    return failed
+
+def write_items(items, table_name=TABLE_NAME, key="image_id"):
+    """
+    BatchWriteItem in chunks of 25, retrying unprocessed items with backoff.
+    Returns the keys of the items that could not be written.
+    """
+    failed = set()
+    for start in range(0, len(items), BATCH_WRITE_SIZE):
+        requests = [{"PutRequest": {"Item": item}} for item in items[start:start + BATCH_WRITE_SIZE]]
+        for attempt in range(BATCH_WRITE_RETRIES):
+            if attempt:
+                time.sleep(0.05 * 2 ** attempt)
+            try:
+                resp = table.meta.client.batch_write_item(RequestItems={table_name: requests})
+            except ClientError as aws_err:
+                logger.error("BatchWriteItem on %s failed: %s", table_name, aws_err)
+                if aws_err.response["Error"]["Code"] == "ValidationException":
+                    # one invalid item (e.g. over 400 KB) rejects the whole chunk: only it should fail
+                    failed |= put_each(requests, table_name, key)
+                    requests = []
+                break
+            requests = resp.get("UnprocessedItems", {}).get(table_name, [])
+            if not requests:
+                break
+        failed.update(r["PutRequest"]["Item"][key] for r in requests)
+    return failed
+
+def put_metrics(**counts):
+    """Log counts in CloudWatch embedded metric format; CloudWatch turns them into metrics."""
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{"Namespace": METRICS_NAMESPACE, "Dimensions": [[]],
+                                   "Metrics": [{"Name": name, "Unit": "Count"} for name in counts]}],
+        },
+        **counts,
+    }))
+
 # ─────────────── handler ─────────────
 def lambda_handler(event, _):
     logger.info("Event: %s", json.dumps(event)[:1000])
-    results = []
+    records  = event.get("Records", [])
+    failures = []                              # messageIds SQS should redeliver
+    rules    = rule_source.get()               # one rule set for the whole batch
+
+    # ── messages, then hash and pre-screen all images at once ---------------
+    uploads = []
+    for rec in records:
+        try:
+            objects = s3_objects(json.loads(rec["body"]))
+        except Exception as err:
+            logger.error("Record %s is invalid: %s", rec.get("messageId"), err)
+            failures.append(rec.get("messageId"))
+            continue
+        for bucket, key in objects:
+            uploads.append({
+                "rec":      rec,
+                "row":      {"image_id": PurePosixPath(key).name,  # the table's primary key
+                             "record_id": rec["messageId"],        # extra traceability
+                             "s3_path": f"s3://{bucket}/{key}"},
+                "image":    {"S3Object": {"Bucket": bucket, "Name": key}},
+                "read":     executor.submit(read_object, bucket, key),
+            })
 
-    for rec in event.get("Records", []):
+    hashed, screened = [], []
+    for u in uploads:
         try:
-            body        = json.loads(rec["body"])
-            s3_path     = body["s3_path"]                     # "s3://bucket/key.jpg"
-            bucket, key = split_s3(s3_path)
-            image_ref   = {"S3Object": {"Bucket": bucket, "Name": key}}
-
-            # derive the table's primary-key value
-            image_id = PurePosixPath(key).name               # "key.jpg"
-
-            # ── Rekognition ------------------------------------------------
-            faces = rekognition.detect_faces(Image=image_ref, Attributes=["ALL"])["FaceDetails"]
-            if len(faces) != 1:
-                issue = "no_face" if len(faces) == 0 else "multiple_faces"
-                item = {
-                    "image_id" : image_id,
-                    "record_id": rec["messageId"],
-                    "s3_path"  : s3_path,
-                    "status"   : "Bad",
-                    "issues"   : [issue],
-                    "scores"   : {}, 
-                }
-                table.put_item(Item=item)
-                logger.info("Wrote %s with issue %s", image_id, issue)
-                results.append({"id": rec["messageId"], "write": "OK"})
-                continue                              # go to next SQS record
-
-                # raise ValueError("Image must contain exactly one face")
-            face = faces[0]
-
-            checks = {
-                "face_confidence": face["Confidence"] > 95,
-                "sharp_image":     face["Quality"]["Sharpness"] > 70,
-                "well_lit":        face["Quality"]["Brightness"] > 50,
-                "smiling":         face["Smile"]["Value"],
-                "eyes_open":       face["EyesOpen"]["Value"],
-                "no_sunglasses":   not face.get("Sunglasses", {}).get("Value", False),
-                "frontal_face":    max(abs(face["Pose"][a]) for a in ("Yaw","Pitch","Roll")) < 20,
-                "emotion_ok":      max(face["Emotions"],
-                                       key=lambda e: e["Confidence"])["Type"] in ("HAPPY", "CALM"),
-            }
-
-            mods = rekognition.detect_moderation_labels(Image=image_ref,
-                                                        MinConfidence=80)["ModerationLabels"]
-            mod_names = [m["Name"] for m in mods]
-
-            status = "Good" if all(checks.values()) and not mod_names else "Bad"
-            issues = [k for k,v in checks.items() if not v] + [f"moderation:{m}" for m in mod_names]
-
-            item = {
-                "image_id":  image_id,                 # ← table’s key
-                "record_id": rec["messageId"],         # extra traceability
-                "s3_path":   s3_path,
-                "status":    status,
-                "issues":    issues,
-                "scores": {
-                    "face_confidence": round(face["Confidence"], 2),
-                    "sharpness":       round(face["Quality"]["Sharpness"], 2),
-                    "brightness":      round(face["Quality"]["Brightness"], 2),
-                    "smile":           round(face["Smile"]["Confidence"], 2),
-                    "eyes_open":       round(face["EyesOpen"]["Confidence"], 2)
-                }
-            }
-
-            table.put_item(Item=to_decimal(item))
-            logger.info("Wrote %s to %s", image_id, TABLE_NAME)
-            results.append({"id": rec["messageId"], "write": "OK"})
+            sha256, u["force"], u["issues"] = u.pop("read").result()
+        except Exception as err:
+            logger.error("Reading %s failed: %s", u["row"]["s3_path"], err)
+            failures.append(u["rec"]["messageId"])
+            continue
+        u["sha256"] = sha256 if CACHE_TTL_SECONDS > 0 else None
+        (screened if u["issues"] else hashed).append(u)
+    uploads = hashed
+
+    # ── cache ---------------------------------------------------------------
+    cached = read_cache({u["sha256"] for u in uploads if u["sha256"] and not u["force"]})
+
+    # ── Rekognition, every call of the batch at once -------------------------
+    analyses = {}                              # sha256 (or messageId) -> [uploads]
+    calls    = {}                              # same key -> (faces, mods) futures
+    hits = forced = 0
+    for u in uploads:
+        if u["sha256"] in cached and not u["force"]:
+            hits += 1
+            continue
+        analysis_key = u["sha256"] or u["rec"]["messageId"]
+        if analysis_key in calls:              # same image earlier in this batch
+            hits += 1
+        else:
+            forced += u["force"]
+            calls[analysis_key] = (
+                executor.submit(rekognition.detect_faces, Image=u["image"], Attributes=["ALL"]),
+                executor.submit(rekognition.detect_moderation_labels, Image=u["image"],
+                                MinConfidence=MIN_MODERATION),
+            )
+        analyses.setdefault(analysis_key, []).append(u)
+
+    # ── results; the last message for an image wins -------------------------
+    items = {}                                 # image_id -> row
+    written_by = {}                            # image_id -> messageIds it stands for
+    new_entries = []                           # for the cache
+    now = int(time.time())
 
+    def add(u, analysis):
+        row = {**u["row"], **analysis, "analyzed_at": now}
+        if u["sha256"]:
+            row["sha256"] = u["sha256"]
+        items[row["image_id"]] = row
+        written_by.setdefault(row["image_id"], []).append(u["rec"]["messageId"])
+
+    for u in screened:
+        add(u, {"status": "Bad", "issues": u["issues"], "scores": {}})
+
+    for u in uploads:
+        if u["sha256"] in cached and not u["force"]:
+            entry = cached[u["sha256"]]
+            add(u, from_cache(entry, rules))
+
+    for analysis_key, (faces, mods) in calls.items():
+        group = analyses[analysis_key]
+        try:
+            analysis = analyze(faces, mods, rules)
         except ClientError as aws_err:
-            logger.error("AWS error for %s: %s", rec.get("messageId"), aws_err)
-            results.append({"id": rec.get("messageId"), "write": "ERROR"})
+            logger.error("AWS error for %s: %s", group[0]["rec"]["messageId"], aws_err)
+            failures.extend(u["rec"]["messageId"] for u in group)
+            continue
         except Exception as err:
-            logger.error("Record %s failed: %s", rec.get("messageId"), err)
-            results.append({"id": rec.get("messageId"), "write": "ERROR"})
+            logger.error("Record %s failed: %s", group[0]["rec"]["messageId"], err)
+            failures.extend(u["rec"]["messageId"] for u in group)
+            continue
+        for u in group:
+            add(u, analysis)
+        if group[0]["sha256"]:
+            new_entries.append({"sha256": group[0]["sha256"], **analysis,
+                                "analyzed_at": now, "expires_at": now + CACHE_TTL_SECONDS})
+
+    # ── DynamoDB ------------------------------------------------------------
+    for image_id in write_items(list(items.values())):
+        failures.extend(written_by.pop(image_id))
+    logger.info("Wrote %d of %d images to %s", len(written_by), len(items), TABLE_NAME)
+    if write_items(new_entries, CACHE_TABLE, "sha256"):
+        logger.warning("Some analyses were not cached")   # only costs a later Rekognition run
 
-    return {
-        "statusCode": 200,
-        "body": json.dumps({"processed": len(results), "results": results})
-    }
\ No newline at end of file
+    put_metrics(CacheHits=hits, CacheMisses=len(calls) - forced, ForcedAnalyses=forced,
+                PreScreened=len(screened))
+    # a message with several images fails once
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in dict.fromkeys(failures)]}
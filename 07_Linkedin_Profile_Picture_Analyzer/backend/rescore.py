@@ -0,0 +1,191 @@
+# rescore.py  ── applies a scoring rule set to the stored results, without Rekognition
+#
+#  • Reads profile_results once (parallel Scan) and turns the stored face_details
+#    into columns: one NumPy array per feature of scoring.FEATURES, one entry per
+#    row with exactly one face. Rows without face_details (pre-screened, or from
+#    before they were stored) and rows with no or several faces are left alone.
+#  • Evaluates all rules on all rows at once (scoring.evaluate_columns) and
+#    reports how status and issues would change, per check.
+#  • With --apply, updates the rows that change: status, issues, rules_version and
+#    rescored_at, with UpdateItem on --workers threads. A row analyzed again since
+#    it was read (analyzed_at differs) is skipped; its new analysis used the
+#    rules in SSM already.
+#
+#  The columns can be saved (--save) and loaded again (--data), so trying other
+#  thresholds takes seconds, not another scan of the table.
+#
+#  Usage (NumPy and boto3 installed, AWS credentials set):
+#      python backend/rescore.py --save results.npz
+#      python backend/rescore.py --data results.npz --rules my_rules.json
+#      python backend/rescore.py --data results.npz --parameter profile-scoring-rules --apply
+#  Put the rules in SSM before --apply, so new analyses use them as well.
+#
+#  Required IAM:
+#      dynamodb:Scan, dynamodb:UpdateItem  on the table
+#      ssm:GetParameter  with --parameter
+# ---------------------------------------------------------------------------
+
+import argparse, logging, os, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import numpy as np
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+import scoring
+
+# ─────────────── setup ───────────────
+logger = logging.getLogger("rescore")
+
+TABLE_NAME = os.environ.get("DYNAMODB_TABLE_NAME", "profile_results")
+SEPARATOR  = "\n"                             # between the issues (and labels) of a row in one string
+ROW_FIELDS = ("image_id", "status", "issues", "analyzed_at", "moderation")
+
+# ─────────────── reading ─────────────
+def scan_segment(table, segment, segments):
+    """(row fields, features) of the rescorable rows in one Scan segment."""
+    rows, features = [], []
+    kwargs = {"Segment": segment, "TotalSegments": segments,
+              "ProjectionExpression": "image_id, #s, issues, analyzed_at, face_details, moderation_labels",
+              "FilterExpression": "attribute_exists(face_details) AND attribute_exists(analyzed_at)",
+              "ExpressionAttributeNames": {"#s": "status"}}
+    while True:
+        page = table.scan(**kwargs)
+        for item in page["Items"]:
+            if len(item["face_details"]) != 1:
+                continue                      # no_face / multiple_faces, whatever the rules
+            labels = item.get("moderation_labels", [])
+            rows.append((item["image_id"], item["status"], SEPARATOR.join(item["issues"]),
+                         int(item["analyzed_at"]),
+                         SEPARATOR.join(f"{m['Name']}\t{m['Confidence']}" for m in labels)))
+            features.append(scoring.face_features(item["face_details"][0]))
+        if "LastEvaluatedKey" not in page:
+            return rows, features
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+def columns(rows, features):
+    """The data rescore() works on: {field: array} for the rows and for the features."""
+    data = {name: np.array([r[i] for r in rows], dtype=np.int64 if name == "analyzed_at" else str)
+            for i, name in enumerate(ROW_FIELDS)}
+    for name in scoring.FEATURES:
+        dtype = str if name in scoring.TEXT_FEATURES else np.float64
+        data[f"feature:{name}"] = np.array([f[name] for f in features], dtype=dtype)
+    return data
+
+def scan(table, segments):
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        parts = list(pool.map(lambda s: scan_segment(table, s, segments), range(segments)))
+    return columns([r for rows, _ in parts for r in rows], [f for _, features in parts for f in features])
+
+def features_of(data):
+    return {k.split(":", 1)[1]: v for k, v in data.items() if k.startswith("feature:")}
+
+# ─────────────── scoring ─────────────
+def rescore(rules, data):
+    """New status and issues of every row, as arrays like data["status"] and data["issues"]."""
+    failed = scoring.evaluate_columns(rules, features_of(data))
+    checks = [rule["check"] for rule in rules["rules"]]
+    # rows fail only a few combinations of checks: one bit per check, and each combination named once
+    codes  = (failed.astype(np.int64) << np.arange(len(checks), dtype=np.int64)[:, None]).sum(axis=0)
+    combos, which = np.unique(codes, return_inverse=True)
+    names  = np.array([SEPARATOR.join(c for bit, c in enumerate(checks) if code >> bit & 1) for code in combos])
+    issues = names[which]
+    moderated = {}
+    for i in np.flatnonzero(data["moderation"] != ""):   # few rows have labels
+        labels = [{"Name": name, "Confidence": float(confidence)}
+                  for name, confidence in (line.split("\t") for line in data["moderation"][i].split(SEPARATOR))]
+        moderated[i] = SEPARATOR.join(filter(None, [issues[i], *scoring.moderation_issues(rules, labels)]))
+    if moderated:
+        issues = issues.astype(f"<U{max(issues.itemsize // 4, *map(len, moderated.values()))}")
+        issues[list(moderated)] = list(moderated.values())
+    status = np.where(issues == "", "Good", "Bad")
+    return status, issues
+
+def issue_counts(issues):
+    values, counts = np.unique(issues, return_counts=True)
+    total = Counter()
+    for value, count in zip(values, counts):
+        for issue in filter(None, value.split(SEPARATOR)):
+            total[issue.split(":")[0] if issue.startswith("moderation:") else issue] += int(count)
+    return total
+
+def report(rules, data, status, issues, seconds):
+    changed = issues != data["issues"]
+    print(f"Rules version {rules['version']}: {len(status)} rows evaluated in {seconds * 1000:.0f} ms, "
+          f"{changed.sum()} change")
+    print(f"  Good -> Bad: {((data['status'] == 'Good') & (status == 'Bad')).sum()}")
+    print(f"  Bad -> Good: {((data['status'] == 'Bad') & (status == 'Good')).sum()}")
+    print(f"  Good: {(data['status'] == 'Good').sum()} -> {(status == 'Good').sum()}")
+    before, after = issue_counts(data["issues"]), issue_counts(issues)
+    for issue in sorted(before.keys() | after.keys()):
+        print(f"  {issue:<20}{before[issue]:>10} -> {after[issue]}")
+
+# ─────────────── writing ─────────────
+def update(table, image_id, analyzed_at, status, issues, version, now):
+    """'updated', 'skipped' (analyzed again since the scan) or 'failed'."""
+    try:
+        table.update_item(
+            Key={"image_id": image_id},
+            UpdateExpression="SET #s = :s, issues = :i, rules_version = :v, rescored_at = :t",
+            ConditionExpression="analyzed_at = :a",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":s": status, ":i": issues.split(SEPARATOR) if issues else [],
+                                       ":v": version, ":t": now, ":a": analyzed_at},
+        )
+        return "updated"
+    except ClientError as aws_err:
+        if aws_err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return "skipped"
+        logger.error("Updating %s failed: %s", image_id, aws_err)
+        return "failed"
+
+def apply(table, rules, data, status, issues, workers):
+    rows, now = np.flatnonzero(issues != data["issues"]), int(time.time())
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = Counter(pool.map(
+            lambda i: update(table, str(data["image_id"][i]), int(data["analyzed_at"][i]),
+                             str(status[i]), str(issues[i]), rules["version"], now), rows))
+    print(f"Updated {outcomes['updated']}, skipped {outcomes['skipped']} (analyzed again), "
+          f"failed {outcomes['failed']}")
+    return outcomes
+
+# ─────────────── main ────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a scoring rule set to the stored results.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--rules", default=str(scoring.RULES_FILE), help="rule set JSON file")
+    source.add_argument("--parameter", help="read the rule set from this SSM parameter instead")
+    parser.add_argument("--data", help="columns saved with --save, instead of scanning the table")
+    parser.add_argument("--save", help="save the scanned columns to this .npz file")
+    parser.add_argument("--table", default=TABLE_NAME)
+    parser.add_argument("--segments", type=int, default=8, help="parallel Scan segments")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent UpdateItem calls")
+    parser.add_argument("--apply", action="store_true", help="update the rows that change")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    rules = scoring.RuleSource(args.parameter).get() if args.parameter else scoring.load_rules(args.rules)
+    table = boto3.resource("dynamodb", config=Config(max_pool_connections=max(args.segments, args.workers),
+                                                     retries={"max_attempts": 10, "mode": "standard"})
+                           ).Table(args.table)
+    if args.data:
+        with np.load(args.data) as saved:
+            data = dict(saved)
+    else:
+        start = time.perf_counter()
+        data  = scan(table, args.segments)
+        logger.info("Scanned %d rescorable rows in %.1f s", len(data["image_id"]), time.perf_counter() - start)
+    if args.save:
+        np.savez_compressed(args.save, **data)
+
+    start = time.perf_counter()
+    status, issues = rescore(rules, data)
+    report(rules, data, status, issues, time.perf_counter() - start)
+    if args.apply:
+        apply(table, rules, data, status, issues, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# result_push.py  ── pushes finished analyses to the browser over a WebSocket
+#
+#  Two Lambda handlers in one file:
+#  • connect_handler  ($connect route of the WebSocket API)
+#      The frontend connects with ?image_id=<id> before it uploads the image.
+#      The connection is stored in DynamoDB table   result_subscriptions
+#        - partition key: image_id, connection_id, expires_at (epoch seconds, DynamoDB TTL)
+#  • stream_handler   (DynamoDB stream of profile_results, NEW_IMAGE)
+#      For every stored result, looks up its subscription (BatchGetItem, 100 per
+#      request) and sends {"ready": true, "data": {...}} – the body GET /result
+#      answers with – to the connection. The frontend then closes it.
+#
+#  No Lambda runs while the browser waits, and nothing reads the table in a loop.
+#  A connection that is already gone is skipped; the TTL removes its entry.
+#  Rows that rescore.py updates (rescored_at is set) are filtered out by the
+#  event source mapping, so a re-scoring run does not invoke this function.
+#
+#  Required IAM:
+#      dynamodb:PutItem, dynamodb:BatchGetItem   on result_subscriptions
+#      dynamodb:GetRecords, GetShardIterator, DescribeStream, ListStreams  on the stream
+#      execute-api:ManageConnections             on the WebSocket API
+#
+#  Required environment variables:
+#      SUBSCRIPTIONS_TABLE_NAME  (defaults to "result_subscriptions")
+#      WEBSOCKET_ENDPOINT        https://<api-id>.execute-api.<region>.amazonaws.com/<stage>
+# ---------------------------------------------------------------------------
+
+import json, logging, os, time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+
+# ─────────────── setup ───────────────
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SUBSCRIPTION_TTL = 2 * 60 * 60                # API Gateway closes WebSockets after 2 hours
+BATCH_GET_SIZE   = 100                        # BatchGetItem limit
+PUSH_WORKERS     = 10
+RAW_FIELDS       = ("face_details", "moderation_labels")   # for rescore.py, not for the browser
+
+dynamodb      = boto3.resource("dynamodb")
+SUBSCRIPTIONS = os.environ.get("SUBSCRIPTIONS_TABLE_NAME", "result_subscriptions")
+subscriptions = dynamodb.Table(SUBSCRIPTIONS)
+connections   = boto3.client("apigatewaymanagementapi",
+                             endpoint_url=os.environ.get("WEBSOCKET_ENDPOINT"),
+                             config=Config(max_pool_connections=PUSH_WORKERS))
+executor      = ThreadPoolExecutor(max_workers=PUSH_WORKERS)   # reused across warm invocations
+deserializer  = TypeDeserializer()
+
+# ─────────────── helpers ─────────────
+def _conv(o):
+    # DynamoDB numbers → JS numbers
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError
+
+def read_subscriptions(image_ids):
+    """connection_id by image_id, for the image_ids somebody waits for."""
+    found, keys = {}, [{"image_id": i} for i in image_ids]
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {SUBSCRIPTIONS: {"Keys": keys[start:start + BATCH_GET_SIZE]}}
+        while request:
+            resp = dynamodb.meta.client.batch_get_item(RequestItems=request)
+            for item in resp["Responses"].get(SUBSCRIPTIONS, []):
+                found[item["image_id"]] = item["connection_id"]
+            request = resp.get("UnprocessedKeys")
+    return found
+
+def push(connection_id, item):
+    try:
+        connections.post_to_connection(ConnectionId=connection_id,
+                                       Data=json.dumps({"ready": True, "data": item}, default=_conv))
+    except connections.exceptions.GoneException:
+        logger.info("Connection %s is closed, %s not pushed", connection_id, item["image_id"])
+
+# ─────────────── handlers ────────────
+def connect_handler(event, _):
+    image_id = (event.get("queryStringParameters") or {}).get("image_id")
+    if not image_id:
+        return {"statusCode": 400, "body": "query param image_id is required"}
+    subscriptions.put_item(Item={
+        "image_id":      image_id,
+        "connection_id": event["requestContext"]["connectionId"],
+        "expires_at":    int(time.time()) + SUBSCRIPTION_TTL,
+    })
+    return {"statusCode": 200}
+
+def stream_handler(event, _):
+    results = {}                               # image_id -> newest stored row
+    for rec in event.get("Records", []):
+        if rec["eventName"] in ("INSERT", "MODIFY"):
+            item = {k: deserializer.deserialize(v) for k, v in rec["dynamodb"]["NewImage"].items()
+                    if k not in RAW_FIELDS}
+            results[item["image_id"]] = item
+    if not results:
+        return
+
+    waiting = read_subscriptions(results)
+    pushes  = [executor.submit(push, connection_id, results[image_id])
+               for image_id, connection_id in waiting.items()]
+    for future in pushes:
+        try:
+            future.result()
+        except Exception as err:               # the browser falls back to GET /result
+            logger.error("Push failed: %s", err)
+    logger.info("Pushed %d of %d results", len(pushes), len(results))
@@ -0,0 +1,151 @@
+# scoring.py  ── profile-quality rules over Rekognition's FaceDetails
+#
+#  The thresholds are data, not code: a versioned JSON rule set (scoring_rules.json
+#  is the one Terraform puts in SSM Parameter Store) such as
+#      {"version": 2,
+#       "rules": [{"check": "sharp_image", "feature": "sharpness", "op": ">", "value": 70}, …],
+#       "moderation": {"min_confidence": 80}}
+#  Every rule is a check that passes when   feature <op> value   holds; the checks
+#  that fail are the image's issues, in rule order, followed by "moderation:<label>"
+#  for every moderation label at or above min_confidence. An image is "Good" when
+#  it has no issues.
+#
+#  The same rules are evaluated two ways that must agree:
+#    evaluate()          one face, plain Python (the Rekognition Lambda)
+#    evaluate_columns()  NumPy arrays of the features of many faces (rescore.py)
+#
+#  Features are taken from one FaceDetails entry by face_features().
+# ---------------------------------------------------------------------------
+
+import json, operator, threading, time
+from pathlib import Path
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+RULES_FILE = Path(__file__).with_name("scoring_rules.json")
+RULES_TTL  = 60                               # seconds a fetched rule set is used
+RAW_FIELDS = ("face_details", "moderation_labels")   # the stored Rekognition responses
+MAX_RULES  = 63                               # rescore.py keeps the failed checks of a row in an int64
+
+# name -> value taken from one FaceDetails entry
+FEATURES = {
+    "confidence":           lambda f: f["Confidence"],
+    "sharpness":            lambda f: f["Quality"]["Sharpness"],
+    "brightness":           lambda f: f["Quality"]["Brightness"],
+    "smile":                lambda f: f["Smile"]["Value"],
+    "smile_confidence":     lambda f: f["Smile"]["Confidence"],
+    "eyes_open":            lambda f: f["EyesOpen"]["Value"],
+    "eyes_open_confidence": lambda f: f["EyesOpen"]["Confidence"],
+    "sunglasses":           lambda f: f.get("Sunglasses", {}).get("Value", False),
+    "eyeglasses":           lambda f: f.get("Eyeglasses", {}).get("Value", False),
+    "yaw":                  lambda f: f["Pose"]["Yaw"],
+    "pitch":                lambda f: f["Pose"]["Pitch"],
+    "roll":                 lambda f: f["Pose"]["Roll"],
+    "pose":                 lambda f: max(abs(f["Pose"][a]) for a in ("Yaw", "Pitch", "Roll")),
+    "emotion":              lambda f: max(f["Emotions"], key=lambda e: e["Confidence"])["Type"],
+}
+TEXT_FEATURES = {"emotion"}                    # compared with == / in; the rest are numbers or booleans
+
+OPS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+    "in": lambda a, b: a in b, "not in": lambda a, b: a not in b,
+}
+
+# ─────────────── rule sets ───────────
+def check_rules(rules):
+    """Return rules if they are a valid rule set, else raise ValueError."""
+    if not isinstance(rules, dict) or not isinstance(rules.get("version"), int):
+        raise ValueError("rule set needs an integer version")
+    if len(rules.get("rules", [])) > MAX_RULES:
+        raise ValueError(f"a rule set has at most {MAX_RULES} rules")
+    checks = set()
+    for rule in rules.get("rules", []):
+        # the check name comes first: the other messages use it
+        if not rule.get("check") or rule["check"] in checks:
+            raise ValueError(f"check names must be unique and non-empty: {rule.get('check')!r}")
+        checks.add(rule["check"])
+        if rule.get("feature") not in FEATURES:
+            raise ValueError(f"unknown feature {rule.get('feature')!r}")
+        if rule.get("op") not in OPS:
+            raise ValueError(f"unknown op {rule.get('op')!r}")
+        if (rule["op"] in ("in", "not in")) != isinstance(rule.get("value"), list):
+            raise ValueError(f"{rule['check']}: in / not in take a list, the other ops one value")
+    if not isinstance(rules.get("moderation", {}).get("min_confidence", 0), (int, float)):
+        raise ValueError("moderation.min_confidence must be a number")
+    return rules
+
+def load_rules(path=RULES_FILE):
+    with open(path, encoding="utf-8") as f:
+        return check_rules(json.load(f))
+
+class RuleSource:
+    """The rule set from an SSM parameter, cached for ttl seconds.
+
+    Without a parameter name the bundled scoring_rules.json is used. If SSM
+    cannot be reached, the last rule set is used until it can.
+    """
+
+    def __init__(self, parameter=None, ttl=RULES_TTL):
+        self.parameter = parameter
+        self.ttl = ttl
+        self._client = None
+        self._rules = None
+        self._expires = 0.0
+        self._lock = threading.Lock()           # analyzer threads share the source
+
+    def get(self):
+        with self._lock:
+            if self._rules is None or time.monotonic() >= self._expires:
+                try:
+                    self._rules = self._fetch()
+                except (BotoCoreError, ClientError, ValueError) as e:
+                    if self._rules is None:
+                        raise
+                    print(f"Error loading the scoring rules, using version {self._rules['version']}: {e}")
+                self._expires = time.monotonic() + self.ttl
+            return self._rules
+
+    def _fetch(self):
+        if not self.parameter:
+            return load_rules()
+        if self._client is None:
+            self._client = boto3.client("ssm")
+        value = self._client.get_parameter(Name=self.parameter)["Parameter"]["Value"]
+        return check_rules(json.loads(value))
+
+# ─────────────── one face ────────────
+def face_features(face):
+    return {name: get(face) for name, get in FEATURES.items()}
+
+def moderation_issues(rules, labels):
+    min_confidence = rules.get("moderation", {}).get("min_confidence", 80)
+    return [f"moderation:{m['Name']}" for m in labels if m["Confidence"] >= min_confidence]
+
+def evaluate(rules, faces, labels):
+    """(status, issues) of an image from its FaceDetails and ModerationLabels."""
+    if len(faces) != 1:
+        return "Bad", ["no_face" if not faces else "multiple_faces"]
+    features = face_features(faces[0])
+    issues = [r["check"] for r in rules["rules"] if not OPS[r["op"]](features[r["feature"]], r["value"])]
+    issues += moderation_issues(rules, labels)
+    return ("Bad" if issues else "Good"), issues
+
+# ─────────────── many faces ──────────
+def evaluate_columns(rules, columns):
+    """
+    Failed checks of many faces at once: a bool array (rules × faces) in rule
+    order. columns maps feature names to NumPy arrays of equal length (text
+    features as str arrays). Moderation is not included; see moderation_issues().
+    """
+    import numpy as np
+
+    ops = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal,
+           "==": np.equal, "!=": np.not_equal,
+           "in": np.isin, "not in": lambda a, b: np.isin(a, b, invert=True)}
+    size = len(next(iter(columns.values()))) if columns else 0
+    failed = np.zeros((len(rules["rules"]), size), dtype=bool)
+    for i, rule in enumerate(rules["rules"]):
+        np.logical_not(ops[rule["op"]](columns[rule["feature"]], rule["value"]), out=failed[i])
+    return failed
@@ -0,0 +1,220 @@
+# Benchmark: wall time of one SQS batch in the Rekognition Lambda.
+#
+# The Rekognition and DynamoDB clients are replaced by stubs that sleep for a fixed
+# latency, so only the handler's own scheduling is measured:
+#   --rekognition  seconds per DetectFaces / DetectModerationLabels call
+#   --dynamodb     seconds per PutItem / BatchWriteItem call
+# S3 is a stub as well, so reading the image to hash it costs only the hashing.
+# The pre-screen has its own benchmark (prescreen-bench.py) and is turned off here.
+# With --baseline, the rekognition.py of another commit (one record after the
+# other, a PutItem each) is measured too.
+#
+# Every batch is sent twice: "first" uploads, then the same images again under new
+# names ("repeat"), which the content-hash cache answers without Rekognition. The
+# hit rate comes from the handler's CloudWatch metrics line.
+#
+# Also checks the partial batch response: with --fail-every N, DetectFaces fails
+# for every Nth image, and exactly those messages must come back as
+# batchItemFailures ("retried"). The old handler returned 200 for them, so SQS
+# deleted them.
+# With --too-large-every N, DynamoDB rejects the result of every Nth image as over
+# 400 KB, which makes BatchWriteItem reject its whole chunk of 25. Only the
+# messages of those images may come back; the rest of the chunk is written.
+#
+# Usage:
+#   pip install boto3
+#   python benchmarks/analyze-bench.py --batch-sizes 1 10 100 --baseline <commit>
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+sys.path.insert(0, str(PROJECT_DIR / "backend"))   # scoring.py
+
+FACE = {
+    "Confidence": 99.9, "Quality": {"Sharpness": 90.0, "Brightness": 70.0},
+    "Smile": {"Value": True, "Confidence": 95.0}, "EyesOpen": {"Value": True, "Confidence": 97.0},
+    "Sunglasses": {"Value": False}, "Pose": {"Yaw": 2.0, "Pitch": 1.0, "Roll": 0.5},
+    "Emotions": [{"Type": "HAPPY", "Confidence": 90.0}, {"Type": "CALM", "Confidence": 5.0}],
+}
+
+
+class StubRekognition:
+    def __init__(self, latency, fail_every):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def detect_faces(self, Image, Attributes):
+        time.sleep(self.latency)
+        self.calls += 1
+        number = int(Path(Image["S3Object"]["Name"]).stem.split("-")[0])
+        if self.fail_every and number % self.fail_every == 0:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "DetectFaces")
+        return {"FaceDetails": [FACE]}
+
+    def detect_moderation_labels(self, Image, MinConfidence):
+        time.sleep(self.latency)
+        self.calls += 1
+        return {"ModerationLabels": []}
+
+
+class StubS3:
+    """Image n contains "image {n}" under every name it is uploaded as."""
+
+    def get_object(self, Bucket, Key):
+        data = f"image {Key.split('-')[0]}".encode()
+        return {"Body": StubBody(data), "ContentLength": len(data), "Metadata": {}}
+
+
+class StubBody:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        yield from (self.data[i:i + chunk_size] for i in range(0, len(self.data), chunk_size))
+
+
+class StubTable:
+    """The results table, and through meta.client every other table too."""
+    KEYS = {"profile_results": "image_id", "analysis_cache": "sha256"}
+
+    def __init__(self, latency, too_large_every=0):
+        self.latency = latency
+        self.too_large_every = too_large_every
+        self.tables = {name: {} for name in self.KEYS}
+        self.items = self.tables["profile_results"]
+        self.meta = self              # table.meta.client.batch_write_item(...)
+        self.client = self
+
+    def check_size(self, item, operation):
+        if not self.too_large_every or "image_id" not in item:
+            return
+        if int(Path(item["image_id"]).stem.split("-")[0]) % self.too_large_every == 0:
+            raise ClientError({"Error": {"Code": "ValidationException",
+                                         "Message": "Item size has exceeded the maximum allowed size"}}, operation)
+
+    def put_item(self, Item, TableName="profile_results"):
+        time.sleep(self.latency)
+        self.check_size(Item, "PutItem")
+        self.tables[TableName][Item[self.KEYS[TableName]]] = Item
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self.latency)
+        for name, requests in RequestItems.items():
+            assert len(requests) <= 25
+            for request in requests:
+                self.check_size(request["PutRequest"]["Item"], "BatchWriteItem")
+            for request in requests:
+                item = request["PutRequest"]["Item"]
+                self.tables[name][item[self.KEYS[name]]] = item
+        return {"UnprocessedItems": {}}
+
+    def batch_get_item(self, RequestItems):
+        time.sleep(self.latency)
+        responses = {}
+        for name, request in RequestItems.items():
+            assert len(request["Keys"]) <= 100
+            found = (self.tables[name].get(key[self.KEYS[name]]) for key in request["Keys"])
+            responses[name] = [item for item in found if item]
+        return {"Responses": responses}
+
+
+def load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.logger.setLevel("CRITICAL")
+    return module
+
+
+def baseline_module(ref, tmp):
+    root, prefix = subprocess.run(["git", "rev-parse", "--show-toplevel", "--show-prefix"], cwd=PROJECT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.split()
+    source = subprocess.run(["git", "show", f"{ref}:{prefix}backend/rekognition.py"], cwd=root,
+                            capture_output=True, text=True, check=True).stdout
+    path = Path(tmp) / "rekognition_baseline.py"
+    path.write_text(source)
+    return load(path, "rekognition_baseline")
+
+
+def event(size, upload):
+    """Image n has the same content (hash) in every upload, but a new name and message.
+
+    The message sha256 is only read by older handlers; the current one hashes the object.
+    """
+    return {"Records": [{"messageId": f"msg-{n}-{upload}", "body": json.dumps({
+        "s3_path": f"s3://uploads/{n}-{upload}.jpg",
+        "sha256": hashlib.sha256(f"image {n}".encode()).hexdigest(),
+    })} for n in range(1, size + 1)]}
+
+
+def run(module, size, upload, args):
+    module.rekognition = StubRekognition(args.rekognition, args.fail_every)
+    module.s3 = StubS3()
+    if hasattr(module, "prescreen"):
+        # handlers that resized large images also returned the resized bytes
+        passed = ([], None) if hasattr(module, "resize") else []
+        module.prescreen = lambda head, data, size: passed
+    module.table = table = getattr(module, "table", None) if upload else StubTable(args.dynamodb, args.too_large_every)
+    before = len(table.items)
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        response = module.lambda_handler(event(size, upload), None)
+    elapsed = time.perf_counter() - start
+    metrics = [json.loads(line) for line in out.getvalue().splitlines() if line.startswith('{"_aws"')]
+    hits = f"{metrics[0]['CacheHits'] / size:.0%}" if metrics else "-"
+
+    expected = {f"msg-{n}-{upload}" for n in range(1, size + 1)
+                if any(every and n % every == 0 for every in (args.fail_every, args.too_large_every))}
+    assert len(table.items) - before == size - len(expected)
+    if "batchItemFailures" not in response:
+        # the old handler reported errors in the body, and SQS deleted those messages anyway
+        return elapsed, module.rekognition.calls, hits, len(expected), 0
+    retried = {f["itemIdentifier"] for f in response["batchItemFailures"]}
+    assert retried == expected, (retried, expected)
+    return elapsed, module.rekognition.calls, hits, len(expected), len(retried)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--rekognition", type=float, default=0.2, help="seconds per Rekognition call")
+    parser.add_argument("--dynamodb", type=float, default=0.01, help="seconds per DynamoDB call")
+    parser.add_argument("--fail-every", type=int, default=7, help="make every Nth image fail (0 = never)")
+    parser.add_argument("--too-large-every", type=int, default=11,
+                        help="make DynamoDB reject every Nth result as too large (0 = never)")
+    parser.add_argument("--baseline", help="git ref of rekognition.py to compare with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modules = [("current", load(PROJECT_DIR / "backend" / "rekognition.py", "rekognition"))]
+        if args.baseline:
+            modules.insert(0, ("baseline", baseline_module(args.baseline, tmp)))
+        print(f"{args.rekognition * 1000:.0f} ms per Rekognition call, {args.dynamodb * 1000:.0f} ms per DynamoDB call, "
+              f"{modules[-1][1].REKOGNITION_WORKERS} workers")
+        print(f"{'handler':<10}{'batch':>7}{'upload':>8}{'wall s':>9}{'Rekognition':>13}{'hits':>6}{'failed':>8}{'retried':>9}")
+        for name, module in modules:
+            for size in args.batch_sizes:
+                for upload in (0, 1):
+                    elapsed, calls, hits, failed, retried = run(module, size, upload, args)
+                    print(f"{name:<10}{size:>7}{('first', 'repeat')[upload]:>8}{elapsed:>9.2f}{calls:>13}{hits:>6}"
+                          f"{failed:>8}{retried:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Benchmark: CPU time of the pre-screen in rekognition.py, per image.
+#
+# Generates photo-like JPEGs and PNGs of several sizes plus files the pre-screen
+# must reject, checks the issues it reports for each, and measures the CPU time
+# (time.process_time) of rekognition.prescreen, median of --repeat runs. It gets
+# what read_object passes: the first 1 MB, and the whole file only up to 320 KB.
+# The larger JPEGs carry an EXIF thumbnail, like camera photos; "no EXIF" ones do
+# not, and like PNGs over 0.1 megapixels only get the header checks. The 20 MB PNG
+# is over Rekognition's limit.
+#
+# Usage:
+#   pip install boto3 numpy pillow
+#   python benchmarks/prescreen-bench.py --repeat 20
+
+import argparse
+import io
+import os
+import statistics
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+sys.path.insert(0, str(PROJECT_DIR / "backend"))
+import rekognition
+
+rng = np.random.default_rng(1)
+
+
+def photo(width, height, grain=6):
+    """Smooth shapes with fine grain, roughly what a camera JPEG compresses like."""
+    coarse = Image.fromarray(rng.integers(40, 220, (48, 48, 3), dtype=np.uint8)).resize((width, height),
+                                                                                       Image.BICUBIC)
+    noise = rng.normal(0, grain, (height, width, 1))
+    return Image.fromarray(np.clip(np.asarray(coarse) + noise, 0, 255).astype(np.uint8))
+
+
+def encode(img, fmt, **options):
+    out = io.BytesIO()
+    img.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def exif_with_thumbnail(img):
+    """EXIF data holding a 160 px JPEG thumbnail of img (IFD1), as cameras write it."""
+    small = img.copy()
+    small.thumbnail((160, 160))
+    thumb = encode(small, "JPEG", quality=75)
+    entries = (struct.pack("<HHII", 0x0103, 3, 1, 6)                 # compression: JPEG
+               + struct.pack("<HHII", 0x0201, 4, 1, 56)              # thumbnail offset
+               + struct.pack("<HHII", 0x0202, 4, 1, len(thumb)))     # thumbnail length
+    tiff = b"II*\0" + struct.pack("<I", 8) + struct.pack("<HI", 0, 14) + struct.pack("<H", 3) + entries
+    return b"Exif\0\0" + tiff + struct.pack("<I", 0) + thumb
+
+
+def camera(img):
+    return encode(img, "JPEG", quality=90, exif=exif_with_thumbnail(img))
+
+
+def cases():
+    """(name, file, expected issues)"""
+    jpeg = encode(photo(800, 800), "JPEG", quality=90)
+    yield "JPEG 400x400", encode(photo(400, 400), "JPEG", quality=90), []
+    yield "JPEG 800x800", jpeg, []
+    yield "JPEG 900x900", encode(photo(900, 900), "JPEG", quality=90), []
+    yield "JPEG 1600x1600", camera(photo(1600, 1600)), []
+    yield "JPEG 4000x3000", camera(photo(4000, 3000)), []
+    yield "  no EXIF", encode(photo(4000, 3000), "JPEG", quality=90), []
+    yield "PNG 300x300", encode(photo(300, 300), "PNG"), []
+    yield "PNG 800x800", encode(photo(800, 800), "PNG"), []
+    yield "PNG 2000x2000", encode(photo(2000, 2000), "PNG"), []
+    yield "PNG 2600x2600", encode(photo(2600, 2600, grain=60), "PNG"), ["image_too_large"]
+    yield "black JPEG", camera(Image.new("RGB", (1600, 1600))), ["well_lit", "sharp_image"]
+    yield "white PNG", encode(Image.new("RGB", (300, 300), "white"), "PNG"), ["well_lit", "sharp_image"]
+    yield "blank JPEG", encode(Image.new("RGB", (800, 800), (128, 128, 128)), "JPEG"), ["sharp_image"]
+    yield "tiny JPEG", encode(photo(60, 60), "JPEG"), ["image_too_small"]
+    yield "truncated JPEG", jpeg[:len(jpeg) // 3], ["corrupt_image"]
+    yield "GIF", encode(photo(400, 400), "GIF"), ["unsupported_format"]
+    yield "text", b"not an image at all\n" * 100, ["unsupported_format"]
+    yield "empty", b"", ["unsupported_format"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    rekognition.logger.setLevel("WARNING")
+
+    print(f"{'image':<16}{'size KB':>9}{'CPU ms':>8}  issues")
+    for name, data, expected in cases():
+        head = data[:rekognition.HASH_CHUNK_SIZE]
+        size = len(data)
+        if size > rekognition.STATS_MAX_BYTES:
+            data = None                       # read_object does not keep these
+        issues = rekognition.prescreen(head, data, size)
+        assert issues == expected, (name, issues)
+        times = []
+        for _ in range(args.repeat):
+            start = time.process_time()
+            rekognition.prescreen(head, data, size)
+            times.append(time.process_time() - start)
+        label = ", ".join(issues) or "ok"
+        print(f"{name:<16}{size / 1024:>9.0f}{statistics.median(times) * 1000:>8.2f}  {label}")
+
+
+if __name__ == "__main__":
+    main()
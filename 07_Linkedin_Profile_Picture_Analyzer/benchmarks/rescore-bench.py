@@ -0,0 +1,176 @@
+# Benchmark: re-scoring stored results with new rules (backend/rescore.py).
+#
+# Builds --rows synthetic results, one face each, with features drawn roughly like
+# Rekognition reports them, and 2% of them with a moderation label. It scores them
+# with the rules in scoring_rules.json, then measures how long rescore() takes to
+# apply a second rule set to all of them, against scoring.evaluate() – what the
+# Lambda does per image – on --scalar-rows of them (the time is extrapolated).
+#
+# Checks:
+#   - rescore() and scoring.evaluate() agree on every one of --scalar-rows random
+#     FaceDetails, taken through face_features() and columns() as rescore.py does
+#   - against moto: scan, --apply, and a row analyzed again after the scan is skipped
+#
+# Usage:
+#   pip install boto3 moto numpy
+#   python benchmarks/rescore-bench.py --rows 1000000
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+sys.path.insert(0, str(PROJECT_DIR / "backend"))
+import rescore
+import scoring
+
+EMOTIONS = ["HAPPY", "CALM", "SURPRISED", "CONFUSED", "SAD", "ANGRY", "DISGUSTED", "FEAR"]
+LABELS = ["Suggestive", "Violence", "Drugs & Tobacco", "Rude Gestures"]
+rng = np.random.default_rng(1)
+
+
+def candidate(rules):
+    """The rule set being tried: softer sharpness and pose, glasses count too."""
+    rules = copy.deepcopy(rules)
+    rules["version"] += 1
+    for rule in rules["rules"]:
+        if rule["check"] == "sharp_image":
+            rule["value"] = 60
+        if rule["check"] == "frontal_face":
+            rule["value"] = 25
+    rules["rules"].append({"check": "no_glasses", "feature": "eyeglasses", "op": "==", "value": False})
+    rules["moderation"]["min_confidence"] = 90
+    return rules
+
+
+def face(r):
+    """One FaceDetails entry with the fields the features read."""
+    emotions = [{"Type": t, "Confidence": r.uniform(0, 100)} for t in EMOTIONS]
+    return {
+        "Confidence": r.choice([r.uniform(80, 100), 99.99, 95.0]),
+        "Quality": {"Sharpness": r.uniform(0, 100), "Brightness": r.choice([r.uniform(0, 100), 50.0])},
+        "Smile": {"Value": r.random() < 0.7, "Confidence": r.uniform(50, 100)},
+        "EyesOpen": {"Value": r.random() < 0.9, "Confidence": r.uniform(50, 100)},
+        "Sunglasses": {"Value": r.random() < 0.05, "Confidence": r.uniform(50, 100)},
+        "Eyeglasses": {"Value": r.random() < 0.2, "Confidence": r.uniform(50, 100)},
+        "Pose": {a: r.gauss(0, 15) for a in ("Yaw", "Pitch", "Roll")},
+        "Emotions": emotions,
+    }
+
+
+def labels(r):
+    return [{"Name": r.choice(LABELS), "Confidence": r.uniform(50, 100)} for _ in range(r.random() < 0.02)]
+
+
+def synthetic(n, rules):
+    """Columns of n rows as rescore.columns() builds them, scored with rules."""
+    data = {
+        "feature:confidence": rng.uniform(80, 100, n),
+        "feature:sharpness": rng.uniform(0, 100, n),
+        "feature:brightness": rng.uniform(0, 100, n),
+        "feature:smile": (rng.random(n) < 0.7).astype(float),
+        "feature:eyes_open": (rng.random(n) < 0.9).astype(float),
+        "feature:sunglasses": (rng.random(n) < 0.05).astype(float),
+        "feature:eyeglasses": (rng.random(n) < 0.2).astype(float),
+        "feature:pose": np.abs(rng.normal(0, 15, (3, n))).max(axis=0),
+        "feature:emotion": rng.choice(EMOTIONS, n),
+        "image_id": np.char.add("image-", np.arange(n).astype(str)),
+        "analyzed_at": np.full(n, 1_700_000_000),
+        "moderation": np.where(rng.random(n) < 0.02, "Suggestive\t85.5", ""),
+    }
+    data["status"], data["issues"] = rescore.rescore(rules, data)
+    return data
+
+
+def check_agreement(rules, n):
+    r = random.Random(2)
+    faces = [(face(r), labels(r)) for _ in range(n)]
+    rows = [(f"image-{i}", "Good", "", 0, rescore.SEPARATOR.join(f"{m['Name']}\t{m['Confidence']}" for m in mods))
+            for i, (_, mods) in enumerate(faces)]
+    data = rescore.columns(rows, [scoring.face_features(f) for f, _ in faces])
+    for ruleset in (rules, candidate(rules)):
+        status, issues = rescore.rescore(ruleset, data)
+        for i, (f, mods) in enumerate(faces):
+            expected = scoring.evaluate(ruleset, [f], mods)
+            assert (status[i], issues[i]) == (expected[0], rescore.SEPARATOR.join(expected[1])), (i, expected)
+    return faces
+
+
+def check_moto(rules):
+    import boto3
+    from moto import mock_aws
+    from rekognition import to_decimal
+
+    with mock_aws():
+        ddb = boto3.resource("dynamodb")
+        table = ddb.create_table(TableName="profile_results", BillingMode="PAY_PER_REQUEST",
+                                 KeySchema=[{"AttributeName": "image_id", "KeyType": "HASH"}],
+                                 AttributeDefinitions=[{"AttributeName": "image_id", "AttributeType": "S"}])
+        r = random.Random(3)
+        stored = {}
+        with table.batch_writer() as batch:
+            for i in range(300):
+                faces, mods = [face(r)], labels(r)
+                status, issues = scoring.evaluate(rules, faces, mods)
+                stored[f"image-{i}"] = (faces, mods)
+                batch.put_item(Item=to_decimal({"image_id": f"image-{i}", "status": status, "issues": issues,
+                                                "scores": {}, "analyzed_at": 1_700_000_000,
+                                                "face_details": faces, "moderation_labels": mods}))
+            batch.put_item(Item={"image_id": "screened", "status": "Bad", "issues": ["image_too_small"]})
+            batch.put_item(Item=to_decimal({"image_id": "group", "status": "Bad", "issues": ["multiple_faces"],
+                                            "analyzed_at": 1, "face_details": [face(r), face(r)]}))
+
+        data = rescore.scan(table, 4)
+        assert len(data["image_id"]) == 300
+        new = candidate(rules)
+        status, issues = rescore.rescore(new, data)
+        changed = [str(i) for i in data["image_id"][issues != data["issues"]]]
+        table.update_item(Key={"image_id": changed[0]}, UpdateExpression="SET analyzed_at = :a",
+                          ExpressionAttributeValues={":a": 1_800_000_000})   # a new analysis meanwhile
+        outcomes = rescore.apply(table, new, data, status, issues, 8)
+        assert outcomes["skipped"] == 1 and outcomes["updated"] == len(changed) - 1, outcomes
+        for image_id in changed[1:]:
+            item = table.get_item(Key={"image_id": image_id})["Item"]
+            expected = scoring.evaluate(new, *stored[image_id])
+            assert (item["status"], item["issues"], item["rules_version"]) == (*expected, new["version"])
+            assert "rescored_at" in item
+        assert "rules_version" not in table.get_item(Key={"image_id": changed[0]})["Item"]
+        return len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--scalar-rows", type=int, default=50_000)
+    args = parser.parse_args()
+    rules = scoring.load_rules()
+    new = candidate(rules)
+
+    faces = check_agreement(rules, args.scalar_rows)
+    print(f"rescore() agrees with scoring.evaluate() on {args.scalar_rows} faces")
+    print(f"moto: {check_moto(rules)} of 300 rows changed, applied, one skipped after a new analysis")
+
+    data = synthetic(args.rows, rules)
+    start = time.perf_counter()
+    status, issues = rescore.rescore(new, data)
+    vectorized = time.perf_counter() - start
+    start = time.perf_counter()
+    for f, mods in faces:
+        scoring.evaluate(new, [f], mods)
+    scalar = (time.perf_counter() - start) / len(faces) * args.rows
+    changed = (issues != data["issues"]).sum()
+    print(f"{args.rows} rows, {changed} change (Good {(data['status'] == 'Good').sum()} -> {(status == 'Good').sum()})")
+    print(f"{'evaluation':<28}{'seconds':>9}")
+    print(f"{'scoring.evaluate, per row':<28}{scalar:>9.2f}  (extrapolated from {len(faces)} rows)")
+    print(f"{'rescore, vectorized':<28}{vectorized:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# Simulation: what it takes the frontend to get an analysis result.
+#
+#   poll       - the old frontend: GET /result?image_id=…, and on 202 again after 2 s
+#   long-poll  - GET /result?image_id=…&wait_seconds=20, again at once on 202
+#                (the frontend's fallback when the WebSocket is not available)
+#   batch      - one long-poll for --batch-size images: GET /result?image_ids=a,b,…&wait_seconds=20
+#   push       - the frontend now: connects to the results WebSocket before the upload,
+#                and result_push.py sends the result when the DynamoDB stream reports it
+#
+# The handlers of get_result.py and result_push.py run for real, on a simulated
+# clock: their sleeps only move the clock, and the DynamoDB stub returns an item
+# once the clock has passed the moment the analysis of that image finished.
+# Analysis times are drawn from a log-normal distribution (--median seconds after
+# the upload). Every request adds --rtt of network time, every DynamoDB call 5 ms,
+# every PostToConnection 10 ms, and the stream --stream-latency.
+#
+# Reported per completed analysis: Lambda invocations, DynamoDB requests, billed
+# Lambda seconds, how long after the analysis finished the frontend had it, and
+# the cost per million analyses at the us-east-1 prices in PRICES (128 MB Lambdas,
+# DynamoDB on demand). push counts one publisher invocation per result, which is
+# the worst case: under load the stream delivers up to 100 results per invocation.
+#
+# Usage:
+#   pip install boto3
+#   python benchmarks/result-bench.py --images 1000 --median 4
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+sys.path.insert(0, str(PROJECT_DIR / "backend"))
+import get_result
+import result_push
+
+DYNAMODB_LATENCY = 0.005
+POST_LATENCY = 0.010
+PRICES = {                                     # USD per unit, us-east-1
+    "lambda_request": 0.20 / 1e6,
+    "lambda_gb_second": 0.0000166667,
+    "http_api_request": 1.00 / 1e6,
+    "websocket_message": 1.00 / 1e6,
+    "websocket_minute": 0.25 / 1e6,
+    "read_unit": 0.125 / 1e6,                  # an eventually consistent read is half a unit
+    "write_unit": 0.625 / 1e6,
+}
+LAMBDA_GB = 128 / 1024
+
+
+class Clock:
+    """Stands in for the time module inside get_result."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class StubDynamoDB:
+    """The results and subscriptions tables; a result exists from its ready time on."""
+
+    name = "profile_results"
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.ready_at = {}
+        self.subscriptions = {}
+        self.requests = self.reads = self.writes = 0
+        self.meta = self              # dynamodb.meta.client.batch_get_item(...)
+        self.client = self
+
+    def _item(self, table, image_id):
+        self.reads += 0.5
+        if table == "result_subscriptions":
+            return self.subscriptions.get(image_id)
+        if self.clock.now >= self.ready_at[image_id]:
+            return {"image_id": image_id, "status": "Good"}
+
+    def get_item(self, Key):
+        self.requests += 1
+        self.clock.sleep(DYNAMODB_LATENCY)
+        item = self._item(self.name, Key["image_id"])
+        return {"Item": item} if item else {}
+
+    def put_item(self, Item):
+        self.requests += 1
+        self.writes += 1
+        self.clock.sleep(DYNAMODB_LATENCY)
+        self.subscriptions[Item["image_id"]] = Item
+
+    def batch_get_item(self, RequestItems):
+        self.requests += 1
+        self.clock.sleep(DYNAMODB_LATENCY)
+        (table, request), = RequestItems.items()
+        assert len(request["Keys"]) <= 100
+        found = (self._item(table, key["image_id"]) for key in request["Keys"])
+        return {"Responses": {table: [item for item in found if item]}}
+
+
+class StubConnections:
+    """apigatewaymanagementapi; remembers when each result reached the browser."""
+
+    exceptions = type("Exceptions", (), {"GoneException": type("GoneException", (Exception,), {})})
+
+    def __init__(self, clock, rtt):
+        self.clock = clock
+        self.rtt = rtt
+        self.received = {}
+
+    def post_to_connection(self, ConnectionId, Data):
+        self.clock.sleep(POST_LATENCY)
+        self.received[ConnectionId] = (self.clock.now + self.rtt / 2, json.loads(Data))
+
+
+def invoke(handler, event, clock, stats):
+    start = clock.now
+    response = handler(event, None)
+    stats["invocations"] += 1
+    stats["billed"] += math.ceil((clock.now - start) * 1000) / 1000   # billed per ms
+    return response
+
+
+def request(clock, rtt, stats, **params):
+    """One GET /result through the HTTP API; returns the parsed body."""
+    clock.sleep(rtt / 2)
+    response = invoke(get_result.lambda_handler, {"queryStringParameters": params}, clock, stats)
+    stats["api_requests"] += 1
+    clock.sleep(rtt / 2)
+    assert response["statusCode"] in (200, 202), response
+    return json.loads(response["body"])
+
+
+def deliver(image_ids, mode, clock, stub, stats, args):
+    """Run the frontend until it has every result; returns the delays."""
+    delays, rtt = [], args.rtt
+    if mode == "batch":
+        clock.now = 0.0
+        pending = list(image_ids)
+        while pending:
+            body = request(clock, rtt, stats, image_ids=",".join(pending), wait_seconds="20")
+            delays += [clock.now - stub.ready_at[i] for i in body["results"]]
+            pending = body["pending"]
+        return delays
+    for image_id in image_ids:                       # one browser tab each
+        clock.now = 0.0
+        if mode == "push":
+            connection_id = f"conn-{image_id}"
+            invoke(result_push.connect_handler, {"queryStringParameters": {"image_id": image_id},
+                                                 "requestContext": {"connectionId": connection_id}}, clock, stats)
+            connected = clock.now
+            clock.now = stub.ready_at[image_id] + args.stream_latency
+            record = {"eventName": "INSERT", "dynamodb": {"NewImage": {
+                "image_id": {"S": image_id}, "status": {"S": "Good"}, "scores": {"M": {"sharp": {"N": "90.5"}}}}}}
+            invoke(result_push.stream_handler, {"Records": [record]}, clock, stats)
+            received, body = result_push.connections.received.pop(connection_id)
+            assert body["ready"] and body["data"]["image_id"] == image_id, body
+            stats["messages"] += 1
+            stats["minutes"] += math.ceil((received - connected) / 60)
+            delays.append(received - stub.ready_at[image_id])
+            continue
+        while True:
+            if mode == "poll":
+                body = request(clock, rtt, stats, image_id=image_id)
+            else:
+                body = request(clock, rtt, stats, image_id=image_id, wait_seconds="20")
+            if body["ready"]:
+                delays.append(clock.now - stub.ready_at[image_id])
+                break
+            if mode == "poll":
+                clock.sleep(2)
+    return delays
+
+
+def cost(stats, stub):
+    return (stats["invocations"] * PRICES["lambda_request"]
+            + stats["billed"] * LAMBDA_GB * PRICES["lambda_gb_second"]
+            + stats["api_requests"] * PRICES["http_api_request"]
+            + stats["messages"] * PRICES["websocket_message"]
+            + stats["minutes"] * PRICES["websocket_minute"]
+            + stub.reads * PRICES["read_unit"] + stub.writes * PRICES["write_unit"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=1000)
+    parser.add_argument("--median", type=float, default=4.0, help="median analysis seconds after the upload")
+    parser.add_argument("--rtt", type=float, default=0.08, help="network round trip of a request, seconds")
+    parser.add_argument("--stream-latency", type=float, default=0.3, help="seconds from the write to the publisher")
+    parser.add_argument("--batch-size", type=int, default=10, help="images per request in batch mode")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    clock = Clock()
+    stub = StubDynamoDB(clock)
+    get_result.time = clock
+    get_result.table = get_result.dynamodb = stub
+    result_push.subscriptions = result_push.dynamodb = stub
+    result_push.connections = StubConnections(clock, args.rtt)
+    result_push.SUBSCRIPTIONS = "result_subscriptions"
+    result_push.logger.setLevel("WARNING")
+    image_ids = [f"image-{n}.jpg" for n in range(args.images)]
+    stub.ready_at = {i: rng.lognormvariate(math.log(args.median), 0.6) for i in image_ids}
+
+    print(f"{args.images} images, analysis done after {args.median:.0f} s (median), "
+          f"{args.rtt * 1000:.0f} ms round trip; per completed analysis:")
+    print(f"{'mode':<11}{'invocations':>12}{'DynamoDB':>10}{'Lambda s':>10}{'delay p50 s':>13}{'delay p95 s':>13}"
+          f"{'$ per 1M':>10}")
+    for mode in ("poll", "long-poll", "batch", "push"):
+        stub.requests = stub.reads = stub.writes = 0
+        stub.subscriptions.clear()
+        stats = {"invocations": 0, "billed": 0.0, "api_requests": 0, "messages": 0, "minutes": 0}
+        delays = []
+        groups = ([image_ids[n:n + args.batch_size] for n in range(0, len(image_ids), args.batch_size)]
+                  if mode == "batch" else [image_ids])
+        for group in groups:
+            delays += deliver(group, mode, clock, stub, stats, args)
+        assert len(delays) == args.images
+        print(f"{mode:<11}{stats['invocations'] / args.images:>12.2f}{stub.requests / args.images:>10.2f}"
+              f"{stats['billed'] / args.images:>10.2f}{statistics.median(delays):>13.2f}"
+              f"{statistics.quantiles(delays, n=20)[-1]:>13.2f}{cost(stats, stub) / args.images * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# Benchmark and end-to-end check of the image upload against moto.
+#
+#   base64  - the previous image_uploader (from --baseline): the image comes base64
+#             encoded in the API Gateway body, is decoded and sent on with PutObject
+#   presign - image_uploader now: returns a presigned POST; the browser (here
+#             `requests`) sends the image straight to S3
+#
+# For each it reports the API Gateway payload, the Lambda duration and its peak
+# Python memory (tracemalloc) per image. moto runs in-process, so the time S3 takes
+# to receive 5 MB from the Lambda is not part of the numbers; in AWS it is billed to
+# the base64 uploader and not to the presigned one.
+#
+# Then the new flow is checked end to end: the presigned POST policy holds the
+# content type and size conditions (moto does not enforce them, so they are read
+# from the policy), the upload notifies the SQS queue, and rekognition.py (with a
+# stubbed Rekognition) stores the result under the returned image_id, with the
+# SHA-256 of the uploaded bytes.
+#
+# Usage:
+#   pip install boto3 moto requests
+#   python benchmarks/upload-bench.py --size-mb 5 --baseline <commit>
+
+import argparse
+import base64
+import hashlib
+import importlib
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import boto3
+import requests
+from moto import mock_aws
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+BUCKET = "profile-store-bench"
+# start of image and an 800x800 baseline frame header, in front of random bytes: all the
+# analyzer's pre-screen reads of an image this large
+JPEG_HEADER = (b"\xff\xd8\xff\xc0\x00\x11\x08" + struct.pack(">HH", 800, 800)
+               + bytes.fromhex("03 01 22 00 02 11 01 03 11 01"))
+os.environ.update(AWS_DEFAULT_REGION="eu-central-1", AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing",
+                  IMAGE_BUCKET_NAME=BUCKET)
+
+
+def setup():
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-central-1"})
+    sqs = boto3.client("sqs")
+    queue_url = sqs.create_queue(QueueName="rekognition-queue")["QueueUrl"]
+    queue_arn = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+    s3.put_bucket_notification_configuration(Bucket=BUCKET, NotificationConfiguration={
+        "QueueConfigurations": [{"QueueArn": queue_arn, "Events": ["s3:ObjectCreated:*"]}]})
+    dynamodb = boto3.client("dynamodb")
+    for name, key in (("profile_results", "image_id"), ("analysis_cache", "sha256")):
+        dynamodb.create_table(TableName=name, BillingMode="PAY_PER_REQUEST",
+                              KeySchema=[{"AttributeName": key, "KeyType": "HASH"}],
+                              AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"}])
+    os.environ["REKOGNITION_QUEUE_URL"] = queue_url
+    return queue_url
+
+
+def measure(run, repeat):
+    """Median seconds and peak traced bytes of run()."""
+    times, peaks = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return sorted(times)[len(times) // 2], max(peaks), result
+
+
+def load_baseline(ref, tmp):
+    root, prefix = subprocess.run(["git", "rev-parse", "--show-toplevel", "--show-prefix"], cwd=PROJECT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.split()
+    source = subprocess.run(["git", "show", f"{ref}:{prefix}backend/image_uploader.py"], cwd=root,
+                            capture_output=True, text=True, check=True).stdout
+    (Path(tmp) / "image_uploader_baseline.py").write_text(source)
+    sys.path.insert(0, tmp)
+    return importlib.import_module("image_uploader_baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="git ref of image_uploader.py to compare with")
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    image = JPEG_HEADER + os.urandom(size - len(JPEG_HEADER))
+    print(f"{len(image) / 1e6:.1f} MB image, median of {args.repeat}")
+    print(f"{'uploader':<10}{'API payload MB':>16}{'Lambda ms':>11}{'Lambda peak MB':>16}{'S3 POST ms':>12}")
+
+    with mock_aws(), tempfile.TemporaryDirectory() as tmp:
+        queue_url = setup()
+        sys.path.insert(0, str(PROJECT_DIR / "backend"))
+
+        if args.baseline:
+            old = load_baseline(args.baseline, tmp)
+            old.logger.setLevel("WARNING")
+            event = {"body": json.dumps({"file_name": "me.jpg", "file_content": base64.b64encode(image).decode()})}
+            seconds, peak, _ = measure(lambda: old.lambda_handler(event, None), args.repeat)
+            print(f"{'base64':<10}{len(event['body']) / 1e6:>16.1f}{seconds * 1000:>11.0f}{peak / 1e6:>16.1f}{'-':>12}")
+            boto3.client("sqs").purge_queue(QueueUrl=queue_url)
+
+        import image_uploader
+        image_uploader.logger.setLevel("WARNING")
+        event = {"body": json.dumps({"content_type": "image/jpeg", "size": len(image)})}
+        seconds, peak, response = measure(lambda: image_uploader.lambda_handler(event, None), args.repeat)
+        data = json.loads(response["body"])
+        post_seconds, _, status = measure(lambda: requests.post(
+            data["upload"]["url"], data=data["upload"]["fields"], files={"file": ("me.jpg", image)}).status_code, 1)
+        assert status == 204, status
+        print(f"{'presign':<10}{len(event['body']) / 1e6:>16.4f}{seconds * 1000:>11.1f}{peak / 1e6:>16.3f}"
+              f"{post_seconds * 1000:>12.0f}")
+
+        # ── the policy S3 checks the upload against ─────────────────────────
+        policy = json.loads(base64.b64decode(data["upload"]["fields"]["policy"]))
+        assert {"Content-Type": "image/jpeg"} in policy["conditions"]
+        assert ["content-length-range", 1, image_uploader.MAX_UPLOAD_BYTES] in policy["conditions"]
+        assert {"key": data["image_id"]} in policy["conditions"]
+        rejected = image_uploader.lambda_handler({"body": json.dumps({"content_type": "image/gif"})}, None)
+        too_big = image_uploader.lambda_handler({"body": json.dumps(
+            {"content_type": "image/png", "size": image_uploader.MAX_UPLOAD_BYTES + 1})}, None)
+        assert (rejected["statusCode"], too_big["statusCode"]) == (400, 413)
+
+        # ── S3 notification → SQS → analyzer ────────────────────────────────
+        import rekognition
+        rekognition.logger.setLevel("WARNING")
+        face = {"Confidence": 99.0, "Quality": {"Sharpness": 90.0, "Brightness": 70.0},
+                "Smile": {"Value": True, "Confidence": 95.0}, "EyesOpen": {"Value": True, "Confidence": 97.0},
+                "Pose": {"Yaw": 1.0, "Pitch": 1.0, "Roll": 1.0}, "Emotions": [{"Type": "HAPPY", "Confidence": 90.0}]}
+        rekognition.rekognition = type("StubRekognition", (), {
+            "detect_faces": lambda self, **kw: {"FaceDetails": [face]},
+            "detect_moderation_labels": lambda self, **kw: {"ModerationLabels": []},
+        })()
+        messages = boto3.client("sqs").receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)["Messages"]
+        records = [{"messageId": m["MessageId"], "body": m["Body"]} for m in messages]
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull      # the metrics line
+            try:
+                response = rekognition.lambda_handler({"Records": records}, None)
+            finally:
+                sys.stdout = stdout
+        assert response == {"batchItemFailures": []}, response
+        row = rekognition.table.get_item(Key={"image_id": data["image_id"]})["Item"]
+        assert row["status"] == "Good" and row["sha256"] == hashlib.sha256(image).hexdigest()
+        print(f"end to end ok: {data['image_id']} analyzed from the S3 notification ({len(records)} messages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -46,7 +46,8 @@
   /* =========================================================
      3.  Load API endpoints from config.json
      ========================================================= */
-  let BASE_URL, UPLOAD_ENDPOINT, RESULT_ENDPOINT;
+  let BASE_URL, UPLOAD_ENDPOINT, RESULT_ENDPOINT, RESULTS_SOCKET_URL;
+  const RESULT_WAIT_SECONDS = 20;             // long-poll time of /result
   
   fetch('config.json')
     .then(r => r.ok ? r.json() : Promise.reject('config load error'))
@@ -54,6 +55,7 @@
       BASE_URL        = cfg.base_url;
       UPLOAD_ENDPOINT = `${BASE_URL}/upload`;
       RESULT_ENDPOINT = `${BASE_URL}/result`;
+      RESULTS_SOCKET_URL = cfg.results_websocket_url;   // optional
     })
     .catch(err => console.error('Configuration error:', err));
   
@@ -90,49 +92,86 @@
     if (!imgInp.files.length) return alert('Please select an image file.');
   
     const file     = imgInp.files[0];
-    const reader   = new FileReader();
     const resultEl = document.getElementById('result');
-  
-    reader.onload = async () => {
-      const base64 = reader.result.split(',')[1];
-  
-      /* 1 ─ upload ---------------------------------------------------- */
-      const jwt  = await Clerk.session.getToken({
-        template: 'linkedin-photo-api'
-      });               // bearer token
-      const resp = await fetch(UPLOAD_ENDPOINT, {
-        method : 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          Authorization : `Bearer ${jwt}`
-        },
-        body   : JSON.stringify({ file_name: file.name, file_content: base64 })
-      });
-  
-      const data = await resp.json();
-      if (!resp.ok) {
-        resultEl.innerHTML = `<p class="error">Upload failed: ${data.error}</p>`;
-        return;
-      }
-  
-      const imageId = data.s3_path.split('/').pop();
-      resultEl.textContent = '🕑 Analyzing your photo…';
-  
-      /* 2 ─ poll until analysis ready ------------------------------- */
-      const poll = async () => {
-        const r = await fetch(
-          `${RESULT_ENDPOINT}?image_id=${encodeURIComponent(imageId)}`,
-          { headers: { Authorization: `Bearer ${jwt}` } }
-        );
-        const j = await r.json();
-  
-        if (!r.ok)        return resultEl.textContent = `Error ${r.status}`;
-        if (!j.ready)     return setTimeout(poll, 2000);
-        renderResult(j.data);
-      };
-      poll();
+
+    /* 1 ─ ask for an upload URL -------------------------------------- */
+    const jwt  = await Clerk.session.getToken({
+      template: 'linkedin-photo-api'
+    });               // bearer token
+    const resp = await fetch(UPLOAD_ENDPOINT, {
+      method : 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Authorization : `Bearer ${jwt}`
+      },
+      body   : JSON.stringify({ content_type: file.type, size: file.size })
+    });
+
+    const data = await resp.json();
+    if (!resp.ok) {
+      resultEl.innerHTML = `<p class="error">Upload failed: ${data.error}</p>`;
+      return;
+    }
+
+    /* 2 ─ subscribe to the result before the upload can finish ------- */
+    const socket = await subscribe(data.image_id).catch(err => {
+      console.warn('Falling back to long-polling:', err.message);
+      return null;
+    });
+
+    /* 3 ─ send the file straight to S3 (the file must be the last field) */
+    const form = new FormData();
+    Object.entries(data.upload.fields).forEach(([k, v]) => form.append(k, v));
+    form.append('file', file);
+    const s3resp = await fetch(data.upload.url, { method: 'POST', body: form });
+    if (!s3resp.ok) {
+      if (socket) socket.close();
+      resultEl.innerHTML = `<p class="error">Upload failed: S3 returned ${s3resp.status}</p>`;
+      return;
+    }
+
+    const imageId = data.image_id;
+    resultEl.textContent = '🕑 Analyzing your photo…';
+
+    /* 4 ─ wait for the analysis ------------------------------------- */
+    // The result is pushed over the WebSocket. Without one, /result holds each
+    // request for up to RESULT_WAIT_SECONDS and answers as soon as the result
+    // is stored, so ask again right away on 202.
+    let done = false;
+    const show = result => {
+      if (done) return;
+      done = true;
+      renderResult(result);
+    };
+    const poll = async () => {
+      const r = await fetch(
+        `${RESULT_ENDPOINT}?image_id=${encodeURIComponent(imageId)}&wait_seconds=${RESULT_WAIT_SECONDS}`,
+        { headers: { Authorization: `Bearer ${jwt}` } }
+      );
+      const j = await r.json();
+
+      if (!r.ok)        return resultEl.textContent = `Error ${r.status}`;
+      if (!j.ready)     return done || poll();
+      show(j.data);
     };
-    reader.readAsDataURL(file);
+
+    if (socket) {
+      socket.onmessage = e => { show(JSON.parse(e.data).data); socket.close(); };
+      socket.onclose   = () => { if (!done) poll(); };   // dropped before the result came
+    } else {
+      poll();
+    }
+  }
+
+  // Resolves with an open WebSocket that receives the result of imageId
+  function subscribe(imageId) {
+    return new Promise((resolve, reject) => {
+      if (!RESULTS_SOCKET_URL) return reject(new Error('no results WebSocket configured'));
+      const socket = new WebSocket(`${RESULTS_SOCKET_URL}?image_id=${encodeURIComponent(imageId)}`);
+      const timer  = setTimeout(() => { socket.close(); reject(new Error('WebSocket timeout')); }, 5000);
+      socket.onopen  = () => { clearTimeout(timer); resolve(socket); };
+      socket.onerror = () => { clearTimeout(timer); reject(new Error('WebSocket error')); };
+    });
   }
   
   /* expose for button’s onclick */
@@ -0,0 +1,45 @@
+###################################################################################
+############################# WebSocket API for results ###########################
+###################################################################################
+// The frontend connects with ?image_id=<id> and receives the result when it is stored.
+// WebSocket APIs do not support JWT authorizers; the image_id is a random UUID that
+// only the uploader gets, and the connection only ever receives that image's result.
+resource "aws_apigatewayv2_api" "results_websocket" {
+  name                       = "LinkedIn-Photo-Analyzer-Results"
+  protocol_type              = "WEBSOCKET"
+  route_selection_expression = "$request.body.action"
+}
+
+// Set up the deployment stage & autodeploy for the WebSocket API
+resource "aws_apigatewayv2_stage" "results_stage" {
+  api_id      = aws_apigatewayv2_api.results_websocket.id
+  name        = "dev"
+  auto_deploy = true
+}
+
+##################################################################################
+################################# $connect route #################################
+##################################################################################
+// The only route: the browser never sends messages, it only receives the result
+resource "aws_apigatewayv2_route" "results_connect_route" {
+  api_id    = aws_apigatewayv2_api.results_websocket.id
+  route_key = "$connect"
+  target    = "integrations/${aws_apigatewayv2_integration.results_connect_integration.id}"
+}
+
+// Configure the integration between the WebSocket API and the Result Connect function
+resource "aws_apigatewayv2_integration" "results_connect_integration" {
+  api_id             = aws_apigatewayv2_api.results_websocket.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = aws_lambda_function.result_connect_func.invoke_arn
+  integration_method = "POST"
+}
+
+// Grant the WebSocket API permission to invoke the Result Connect function
+resource "aws_lambda_permission" "allow_websocket_connect" {
+  statement_id  = "AllowWebSocketInvokeConnect"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.result_connect_func.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.results_websocket.execution_arn}/*/*"
+}
@@ -5,9 +5,52 @@ resource "aws_dynamodb_table" "profile_results" {
   name         = "profile_results"
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "image_id"
+  # new results are pushed to the waiting browsers (result_push.py)
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
 
   attribute {
     name = "image_id"
     type = "S"
   }
 }
+
+####################################################################################
+###################### DynamoDB Table for cached analyses ##########################
+####################################################################################
+# Rekognition results by image content (SHA-256), reused for re-uploads
+resource "aws_dynamodb_table" "analysis_cache" {
+  name         = "analysis_cache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "sha256"
+
+  attribute {
+    name = "sha256"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
+
+####################################################################################
+################### DynamoDB Table for result subscriptions ########################
+####################################################################################
+# WebSocket connections waiting for the result of an image
+resource "aws_dynamodb_table" "result_subscriptions" {
+  name         = "result_subscriptions"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "image_id"
+
+  attribute {
+    name = "image_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
@@ -4,8 +4,15 @@
 # Archive file for Rekognition Lambda function
 data "archive_file" "zip_rekognition_func" {
   type        = "zip"
-  source_file = "../backend/rekognition.py"
   output_path = "../backend/rekognition.zip"
+  source {
+    content  = file("../backend/rekognition.py")
+    filename = "rekognition.py"
+  }
+  source {
+    content  = file("../backend/scoring.py")
+    filename = "scoring.py"
+  }
 }
 
 # Rekognition Lambda function configuration
@@ -16,10 +23,16 @@ resource "aws_lambda_function" "terraform_lambda_func" {
   handler       = "rekognition.lambda_handler"
   runtime       = "python3.13"
   depends_on    = [aws_iam_role_policy_attachment.attach_iam_policy_to_iam_role]
+  # NumPy and Pillow for the pre-screen; without them it only checks the image headers
+  layers        = var.IMAGE_TOOLS_LAYER_ARN == "" ? [] : [var.IMAGE_TOOLS_LAYER_ARN]
   environment {
     variables = {
-      REKOGNITION_QUEUE_URL = aws_sqs_queue.rekognition_queue.url
-      DYNAMODB_TABLE_NAME   = aws_dynamodb_table.profile_results.name
+      REKOGNITION_QUEUE_URL   = aws_sqs_queue.rekognition_queue.url
+      DYNAMODB_TABLE_NAME     = aws_dynamodb_table.profile_results.name
+      REKOGNITION_WORKERS     = 10
+      CACHE_TABLE_NAME        = aws_dynamodb_table.analysis_cache.name
+      CACHE_TTL_SECONDS       = var.ANALYSIS_CACHE_TTL_SECONDS
+      SCORING_RULES_PARAMETER = aws_ssm_parameter.scoring_rules.name
     }
   }
 }
@@ -30,6 +43,8 @@ resource "aws_lambda_event_source_mapping" "sqs_trigger" {
   function_name    = aws_lambda_function.terraform_lambda_func.arn
   batch_size       = 10
   enabled          = true
+  # The function returns the failed messages, only those are retried
+  function_response_types = ["ReportBatchItemFailures"]
 }
 
 ####################################################################################
@@ -54,8 +69,7 @@ resource "aws_lambda_function" "image_uploader_func" {
   timeout       = 30
   environment {
     variables = {
-      IMAGE_BUCKET_NAME     = aws_s3_bucket.upload_bucket.bucket
-      REKOGNITION_QUEUE_URL = aws_sqs_queue.rekognition_queue.url
+      IMAGE_BUCKET_NAME = aws_s3_bucket.upload_bucket.bucket
     }
   }
 }
@@ -79,10 +93,71 @@ resource "aws_lambda_function" "get_result_func" {
   runtime       = "python3.13"
   depends_on    = [aws_iam_role_policy_attachment.attach_lambda_dynamodb_access]
   memory_size   = 128
-  timeout       = 30
+  timeout       = 30 # long polls hold a request for up to 20 s
   environment {
     variables = {
       DYNAMODB_TABLE_NAME = aws_dynamodb_table.profile_results.name
     }
   }
 }
+
+####################################################################################
+############################# Result Push functions ################################
+####################################################################################
+# Archive file for the Result Push Lambda functions
+data "archive_file" "result_push_zip" {
+  type        = "zip"
+  source_file = "../backend/result_push.py"
+  output_path = "../backend/result_push.zip"
+}
+
+# $connect route of the WebSocket API: stores which connection waits for which image
+resource "aws_lambda_function" "result_connect_func" {
+  filename      = data.archive_file.result_push_zip.output_path
+  function_name = "ResultConnect_Function"
+  role          = aws_iam_role.lambda_role.arn
+  handler       = "result_push.connect_handler"
+  runtime       = "python3.13"
+  depends_on    = [aws_iam_role_policy_attachment.attach_lambda_dynamodb_access]
+  memory_size   = 128
+  timeout       = 10
+  environment {
+    variables = {
+      SUBSCRIPTIONS_TABLE_NAME = aws_dynamodb_table.result_subscriptions.name
+    }
+  }
+}
+
+# Sends each new result to the connection waiting for it
+resource "aws_lambda_function" "result_publisher_func" {
+  filename      = data.archive_file.result_push_zip.output_path
+  function_name = "ResultPublisher_Function"
+  role          = aws_iam_role.lambda_role.arn
+  handler       = "result_push.stream_handler"
+  runtime       = "python3.13"
+  depends_on    = [aws_iam_role_policy_attachment.attach_lambda_result_push]
+  memory_size   = 128
+  timeout       = 30
+  environment {
+    variables = {
+      SUBSCRIPTIONS_TABLE_NAME = aws_dynamodb_table.result_subscriptions.name
+      WEBSOCKET_ENDPOINT       = replace(aws_apigatewayv2_stage.results_stage.invoke_url, "wss://", "https://")
+    }
+  }
+}
+
+# DynamoDB stream trigger for the publisher
+resource "aws_lambda_event_source_mapping" "results_stream_trigger" {
+  event_source_arn       = aws_dynamodb_table.profile_results.stream_arn
+  function_name          = aws_lambda_function.result_publisher_func.arn
+  starting_position      = "LATEST"
+  batch_size             = 100
+  # a failed batch is not retried for long: the browser falls back to GET /result
+  maximum_retry_attempts = 2
+  # rows updated by backend/rescore.py have rescored_at; nobody is waiting for those
+  filter_criteria {
+    filter {
+      pattern = jsonencode({ dynamodb = { NewImage = { rescored_at = [{ exists = false }] } } })
+    }
+  }
+}
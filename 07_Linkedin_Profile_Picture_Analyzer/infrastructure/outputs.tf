@@ -29,3 +29,9 @@ output "cloudfront_distribution_id" {
   description = "The ID of the CloudFront distribution."
   value       = aws_cloudfront_distribution.frontend_distribution.id
 }
+
+# Output the WebSocket URL the frontend receives results on
+output "results_websocket_url" {
+  value       = aws_apigatewayv2_stage.results_stage.invoke_url
+  description = "The wss:// URL of the results WebSocket API."
+}
@@ -164,8 +164,8 @@ resource "aws_iam_role_policy_attachment" "attach_lambda_s3_access" {
 # IAM Policy Document for DynamoDB access
 data "aws_iam_policy_document" "dynamodb_access_policy" {
   statement {
-    actions   = ["dynamodb:PutItem", "dynamodb:GetItem"]
-    resources = [aws_dynamodb_table.profile_results.arn]
+    actions   = ["dynamodb:PutItem", "dynamodb:BatchWriteItem", "dynamodb:GetItem", "dynamodb:BatchGetItem"]
+    resources = [aws_dynamodb_table.profile_results.arn, aws_dynamodb_table.analysis_cache.arn, aws_dynamodb_table.result_subscriptions.arn]
     effect    = "Allow"
   }
 }
@@ -182,3 +182,56 @@ resource "aws_iam_role_policy_attachment" "attach_lambda_dynamodb_access" {
   policy_arn = aws_iam_policy.dynamodb_access_policy.arn
 }
 ####################################################################################
+
+################################################################################
+########################### Result Push Access Policy ##########################
+################################################################################
+# IAM Policy Document for reading the results stream and pushing to WebSockets
+data "aws_iam_policy_document" "result_push_policy" {
+  statement {
+    actions   = ["dynamodb:GetRecords", "dynamodb:GetShardIterator", "dynamodb:DescribeStream", "dynamodb:ListStreams"]
+    resources = [aws_dynamodb_table.profile_results.stream_arn]
+    effect    = "Allow"
+  }
+  statement {
+    actions   = ["execute-api:ManageConnections"]
+    resources = ["${aws_apigatewayv2_api.results_websocket.execution_arn}/${aws_apigatewayv2_stage.results_stage.name}/POST/@connections/*"]
+    effect    = "Allow"
+  }
+}
+
+# IAM Policy for the result push functions
+resource "aws_iam_policy" "result_push_policy" {
+  name   = "AllowLambdaResultPush"
+  policy = data.aws_iam_policy_document.result_push_policy.json
+}
+
+# Attach the result push policy to Lambda Role
+resource "aws_iam_role_policy_attachment" "attach_lambda_result_push" {
+  role       = aws_iam_role.lambda_role.name
+  policy_arn = aws_iam_policy.result_push_policy.arn
+}
+
+################################################################################
+########################### Scoring Rules Access Policy ########################
+################################################################################
+# IAM Policy Document for reading the scoring rules
+data "aws_iam_policy_document" "scoring_rules_policy" {
+  statement {
+    actions   = ["ssm:GetParameter"]
+    resources = [aws_ssm_parameter.scoring_rules.arn]
+    effect    = "Allow"
+  }
+}
+
+# IAM Policy for reading the scoring rules
+resource "aws_iam_policy" "scoring_rules_policy" {
+  name   = "AllowLambdaScoringRulesRead"
+  policy = data.aws_iam_policy_document.scoring_rules_policy.json
+}
+
+# Attach the scoring rules policy to Lambda Role
+resource "aws_iam_role_policy_attachment" "attach_lambda_scoring_rules" {
+  role       = aws_iam_role.lambda_role.name
+  policy_arn = aws_iam_policy.scoring_rules_policy.arn
+}
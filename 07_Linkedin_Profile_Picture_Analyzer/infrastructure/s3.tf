@@ -30,6 +30,18 @@ resource "aws_s3_bucket_lifecycle_configuration" "upload_bucket_lifecycle" {
   }
 }
 
+# Browsers upload images straight to the bucket with the presigned POST from image_uploader
+resource "aws_s3_bucket_cors_configuration" "upload_bucket_cors" {
+  bucket = aws_s3_bucket.upload_bucket.id
+
+  cors_rule {
+    allowed_methods = ["POST"]
+    allowed_origins = ["https://${var.SUBDOMAIN}.${var.HOSTED_ZONE_NAME}"]
+    allowed_headers = ["*"]
+    max_age_seconds = 3600
+  }
+}
+
 # This gives both Lambdas (image_uploader and rekognition) put and get access to the S3 bucket.
 data "aws_iam_policy_document" "lambda_s3_access" {
   statement {
@@ -17,3 +17,35 @@ resource "aws_sqs_queue" "dlq" {
   name                      = "rekognition-dlq"
   message_retention_seconds = 1209600
 }
+
+# Let the upload bucket send its "object created" notifications to the queue
+resource "aws_sqs_queue_policy" "allow_s3_notifications" {
+  queue_url = aws_sqs_queue.rekognition_queue.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect    = "Allow"
+        Principal = { Service = "s3.amazonaws.com" }
+        Action    = "sqs:SendMessage"
+        Resource  = aws_sqs_queue.rekognition_queue.arn
+        Condition = {
+          ArnEquals = { "aws:SourceArn" = aws_s3_bucket.upload_bucket.arn }
+        }
+      }
+    ]
+  })
+}
+
+# Every new image in the upload bucket starts an analysis
+resource "aws_s3_bucket_notification" "upload_notification" {
+  bucket = aws_s3_bucket.upload_bucket.id
+
+  queue {
+    queue_arn = aws_sqs_queue.rekognition_queue.arn
+    events    = ["s3:ObjectCreated:*"]
+  }
+
+  depends_on = [aws_sqs_queue_policy.allow_s3_notifications]
+}
@@ -0,0 +1,13 @@
+####################################################################################
+############################ SSM Parameter for scoring rules #######################
+####################################################################################
+# The profile-quality rules the Rekognition Lambda applies (backend/scoring.py).
+# Edit backend/scoring_rules.json, raise its version and apply: the function picks
+# the new rules up within a minute, without a new deployment. backend/rescore.py
+# applies them to the stored results.
+resource "aws_ssm_parameter" "scoring_rules" {
+  name        = "profile-scoring-rules"
+  description = "Versioned scoring rules of the LinkedIn profile picture analyzer"
+  type        = "String"
+  value       = file("../backend/scoring_rules.json")
+}
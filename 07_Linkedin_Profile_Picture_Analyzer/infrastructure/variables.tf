@@ -27,3 +27,15 @@ variable "SUBDOMAIN" {
   type        = string
   default     = "linkedin-pp-analyzer"
 }
+
+variable "ANALYSIS_CACHE_TTL_SECONDS" {
+  description = "How long an analysis is reused for identical images (0 turns the cache off)"
+  type        = number
+  default     = 604800
+}
+
+variable "IMAGE_TOOLS_LAYER_ARN" {
+  description = "ARN of a Lambda layer with NumPy and Pillow for the pixel checks of the pre-screen (empty: header checks only)"
+  type        = string
+  default     = ""
+}
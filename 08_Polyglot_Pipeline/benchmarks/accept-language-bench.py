@@ -0,0 +1,196 @@
+# Benchmark: the Lambda@Edge viewer-request handler in lambda/lambda.py, per request.
+#
+# Replays --requests CloudFront viewer requests. Accept-Language values are drawn
+# from HEADERS, which holds what current Chrome, Firefox, Safari and Edge send for
+# common locales, weighted roughly by how often they occur (a Zipf-like mix: a few
+# values make most of the traffic, with a long tail of --tail distinct values
+# such as unusual locale lists). URIs are the site's pages and assets; a third of
+# the requests carry a prefLang cookie.
+#
+# Reported: microseconds per request (median of --repeat runs) for
+#   baseline   the lambda.py of --baseline, if given
+#   uncached   the current handler without the Accept-Language cache (the parser
+#              on every request)
+#   current    the current handler, cache warm as on a busy edge location
+#
+# Also checks the negotiation against RFC 7231 cases, and that the handler
+# answers every corpus request as the baseline does (setting the cookie the same
+# way), except where the two negotiate differently (listed).
+#
+# Usage:
+#   python benchmarks/accept-language-bench.py --requests 200000 --baseline <commit>
+
+import argparse
+import importlib.util
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+HEADERS = [                                   # (value, weight)
+    ("en-US,en;q=0.9", 30),
+    ("en-US,en;q=0.5", 8),
+    ("en-GB,en-US;q=0.9,en;q=0.8", 6),
+    ("en-US", 5),
+    ("es-ES,es;q=0.9", 5),
+    ("es-ES,es;q=0.9,en;q=0.8", 4),
+    ("es-419,es;q=0.9,en;q=0.8", 3),
+    ("zh-CN,zh;q=0.9", 5),
+    ("zh-CN,zh;q=0.9,en;q=0.8", 3),
+    ("zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7", 2),
+    ("fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7", 4),
+    ("fr-FR,fr;q=0.8,en-US;q=0.5,en;q=0.3", 2),
+    ("fr-CA,fr;q=0.9,en-CA;q=0.8,en;q=0.7", 1),
+    ("ar,en-US;q=0.9,en;q=0.8", 2),
+    ("ar-SA,ar;q=0.9", 1),
+    ("hi-IN,hi;q=0.9,en-US;q=0.8,en;q=0.7", 2),
+    ("en-IN,en-GB;q=0.9,en-US;q=0.8,en;q=0.7,hi;q=0.6", 2),
+    ("de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7", 4),
+    ("de,en-US;q=0.7,en;q=0.3", 2),
+    ("pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7", 3),
+    ("ja,en-US;q=0.9,en;q=0.8", 2),
+    ("ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7", 2),
+    ("ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7", 1),
+    ("it-IT,it;q=0.9,en-US;q=0.8,en;q=0.7", 1),
+    ("nl-NL,nl;q=0.9,en-US;q=0.8,en;q=0.7", 1),
+    ("*", 1),
+]
+URIS = [("/", 30), ("/index.html", 10), ("/index.css", 15), ("/script.js", 15),
+        ("/es/index.html", 6), ("/es/index.css", 4), ("/fr/", 3), ("/zh/index.html", 4), ("/ar", 1),
+        ("/hi/script.js", 2), ("/favicon.ico", 5)]
+
+# (Accept-Language, expected language) per RFC 7231 / RFC 4647 lookup
+CASES = [
+    ("en-US,en;q=0.9", "en"),
+    ("es-ES,es;q=0.9,en;q=0.8", "es"),
+    ("pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7", "en"),
+    ("fr-CA", "fr"),                                  # region falls back to the language
+    ("zh-Hant-TW", "zh"),
+    ("fr-CA,fr;q=0", "en"),                           # q=0: generic French is not acceptable
+    ("es;q=0", "en"),
+    ("en;q=0, es;q=0.1", "es"),
+    ("ar;q=0.5, hi;q=0.5", "ar"),                     # equal q: the earlier one
+    ("en-GB;q=0.8, en;q=0.7, fr;q=0.75", "en"),      # the region's q counts for the language
+    ("hi;q=0.4, *;q=0.5", "en"),                      # "*" stands for any other language
+    ("*;q=0, es", "es"),
+    ("  ES ; Q=0.8 ", "es"),
+    ("es;q=1.5", "en"),                               # invalid qvalue: element skipped
+    ("es;q=0.5.1, fr;q=0.4", "fr"),                   # the old parser raised ValueError here
+    ("arn", "en"),                                    # Mapudungun is not Arabic
+    ("fil,fr;q=0.5", "fr"),
+    ("", "en"),
+    (",,;q=1,", "en"),
+]
+
+
+def weighted(rng, pairs, n):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights=weights, k=n)
+
+
+def load(source, name, tmp):
+    path = Path(tmp) / f"{name}.py"
+    path.write_text(source)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def baseline_source(ref):
+    root, prefix = subprocess.run(["git", "rev-parse", "--show-toplevel", "--show-prefix"], cwd=PROJECT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.split()
+    return subprocess.run(["git", "show", f"{ref}:{prefix}lambda/lambda.py"], cwd=root,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def events(args):
+    rng = random.Random(args.seed)
+    corpus = list(HEADERS)
+    for n in range(args.tail):                       # rare values, each seen about once
+        langs = rng.sample(["de", "es", "fr", "it", "pt", "ru", "nl", "sv", "pl", "tr", "zh", "ar", "hi"], 3)
+        corpus.append((f"{langs[0]}-{langs[0].upper()},{langs[0]};q=0.9,{langs[1]};q=0.{8 - n % 3},"
+                       f"{langs[2]};q=0.5,en;q=0.{n % 4 + 1}", 0.02))
+    out = []
+    for value, uri in zip(weighted(rng, corpus, args.requests), weighted(rng, URIS, args.requests)):
+        headers = {"accept-language": [{"key": "Accept-Language", "value": value}]}
+        if rng.random() < 1 / 3:
+            lang = rng.choice(["en", "en", "es", "fr", "zh"])
+            headers["cookie"] = [{"key": "Cookie", "value": f"_ga=GA1.1.123; prefLang={lang}"}]
+        out.append({"Records": [{"cf": {"request": {"uri": uri, "method": "GET", "headers": headers}}}]})
+    return out
+
+
+def measure(handler, evs, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for ev in evs:
+            handler(ev, None)
+        times.append((time.perf_counter() - start) / len(evs))
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--tail", type=int, default=2000, help="rare Accept-Language values in the corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="git ref of lambda/lambda.py to compare with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        current = load((PROJECT_DIR / "lambda" / "lambda.py").read_text(), "edge_current", tmp)
+        baseline = load(baseline_source(args.baseline), "edge_baseline", tmp) if args.baseline else None
+
+    for value, expected in CASES:
+        got = current._pick_from_accept_language({"accept-language": [{"value": value}]})
+        assert got == expected, (value, got, expected)
+    print(f"{len(CASES)} negotiation cases ok")
+
+    evs = events(args)
+    if baseline:
+        differ = {}
+        mode, current.COOKIE_MODE = current.COOKIE_MODE, getattr(baseline, "COOKIE_MODE", "redirect")
+        for ev in evs:
+            headers = ev["Records"][0]["cf"]["request"]["headers"]
+            try:
+                old = baseline.handler(ev, None)
+            except ValueError:
+                old = "ValueError"
+            if old != current.handler(ev, None):
+                value = headers["accept-language"][0]["value"]
+                differ[value] = (baseline._pick_from_accept_language(headers),
+                                 current._pick_from_accept_language(headers))
+        print(f"{len(differ)} Accept-Language values of {len(evs)} requests are answered differently than by the baseline")
+        for value, (old, new) in sorted(differ.items()):
+            print(f"  {value!r}: baseline {old}, current {new}")
+        current.COOKIE_MODE = mode
+    cached = current._negotiate
+    cached.cache_clear()
+    for ev in evs:                                   # one pass, from an empty cache
+        current.handler(ev, None)
+    info = cached.cache_info()
+    distinct = {e["Records"][0]["cf"]["request"]["headers"]["accept-language"][0]["value"] for e in evs}
+    print(f"{args.requests} requests, {len(distinct)} distinct Accept-Language values, "
+          f"cache hit rate {info.hits / (info.hits + info.misses):.1%} from a cold start")
+
+    rows = []
+    if baseline:
+        rows.append(("baseline", measure(baseline.handler, evs, args.repeat)))
+    current._negotiate = cached.__wrapped__
+    rows.append(("uncached", measure(current.handler, evs, args.repeat)))
+    current._negotiate = cached
+    rows.append(("current", measure(current.handler, evs, args.repeat)))
+    print(f"{'handler':<10}{'µs per request':>16}")
+    for name, micros in rows:
+        print(f"{name:<10}{micros:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# Replay: viewer requests through both cookie modes of lambda/lambda.py.
+#
+#   redirect  - the cookie is refreshed with a 301 to the same URI (the old behaviour)
+#   response  - the request goes on and the viewer-response run adds Set-Cookie
+#
+# Two sources of requests:
+#   --events FILE   recorded CloudFront viewer-request events, one JSON event per
+#                   line (as the function receives them, e.g. copied from its logs).
+#                   Each event is run once per mode, without following anything;
+#                   the follow-up requests of redirects are in the recording.
+#   (default)       --visitors simulated browsers. Each one has an Accept-Language
+#                   value, a cookie jar and maybe a prefLang cookie from an earlier
+#                   visit. It opens an entry page, follows redirects, stores the
+#                   cookies it gets (from redirects or, in response mode, from the
+#                   viewer-response run), loads index.css and script.js, browses
+#                   a few more pages, and sometimes switches language with the
+#                   picker. --record FILE writes the viewer-request events of the
+#                   redirect mode, for --events.
+#
+# The simulation checks that both modes serve each visitor the same pages and
+# leave the same prefLang cookie.
+#
+# Reported per 1,000 page and asset requests the visitors made: redirects, of those
+# redirects to the same URI, viewer round trips (simulation only), and Lambda@Edge
+# invocations (the response mode runs the function on the viewer-response trigger too).
+#
+# Usage:
+#   python benchmarks/cookie-replay.py --visitors 20000
+#   python benchmarks/cookie-replay.py --events recorded-events.jsonl
+
+import argparse
+import copy
+import importlib.util
+import json
+import random
+from collections import Counter
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+LANGS = ["en", "es", "zh", "ar", "hi", "fr"]
+ACCEPT_LANGUAGE = [                            # (value, weight)
+    ("en-US,en;q=0.9", 40), ("en-GB,en;q=0.9", 8), ("es-ES,es;q=0.9,en;q=0.8", 10),
+    ("zh-CN,zh;q=0.9", 10), ("ar,en-US;q=0.9,en;q=0.8", 4), ("hi-IN,hi;q=0.9,en;q=0.8", 5),
+    ("fr-FR,fr;q=0.9,en;q=0.8", 8), ("de-DE,de;q=0.9,en;q=0.8", 8), ("pt-BR,pt;q=0.9", 4),
+    ("ja,en-US;q=0.9,en;q=0.8", 3),
+]
+ENTRY_PAGES = [("/", 60), ("/index.html", 15), ("/es/", 5), ("/es/index.html", 5), ("/fr/index.html", 5),
+               ("/zh/index.html", 5), ("/hi", 2), ("/ar/index.html", 3)]
+
+
+def load(mode):
+    spec = importlib.util.spec_from_file_location(f"edge_{mode}", PROJECT_DIR / "lambda" / "lambda.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.COOKIE_MODE = mode
+    return module
+
+
+def viewer_request(uri, accept_language, cookies):
+    headers = {"host": [{"key": "Host", "value": "example.cloudfront.net"}],
+               "accept-language": [{"key": "Accept-Language", "value": accept_language}]}
+    if cookies:
+        headers["cookie"] = [{"key": "Cookie", "value": "; ".join(f"{k}={v}" for k, v in cookies.items())}]
+    return {"Records": [{"cf": {"config": {"eventType": "viewer-request"},
+                                "request": {"uri": uri, "method": "GET", "querystring": "", "headers": headers}}}]}
+
+
+def viewer_response(request):
+    return {"Records": [{"cf": {"config": {"eventType": "viewer-response"}, "request": request,
+                                "response": {"status": "200", "statusDescription": "OK", "headers": {}}}}]}
+
+
+def set_cookies(response, jar):
+    for header in response.get("headers", {}).get("set-cookie", []):
+        name, _, value = header["value"].split(";")[0].partition("=")
+        jar[name] = value
+
+
+class Browser:
+    """One visitor: sends requests through the function like CloudFront would."""
+
+    def __init__(self, edge, accept_language, jar, stats, recorded):
+        self.edge, self.accept_language, self.jar = edge, accept_language, jar
+        self.stats, self.recorded = stats, recorded
+        self.pages = []                                   # the pages the visitor ended up on
+
+    def get(self, uri):
+        """Load uri, following redirects; returns the final URI."""
+        self.stats["requests"] += 1
+        for _ in range(5):
+            event = viewer_request(uri, self.accept_language, self.jar)
+            if self.recorded is not None:
+                self.recorded.append(copy.deepcopy(event))
+            self.stats["round trips"] += 1
+            self.stats["invocations"] += 1
+            result = self.edge.handler(event, None)
+            if "status" in result:                        # the function answered: a redirect
+                self.stats["redirects"] += 1
+                location = result["headers"]["location"][0]["value"]
+                self.stats["same-URI redirects"] += location == uri
+                set_cookies(result, self.jar)
+                uri = location
+                continue
+            if self.edge.COOKIE_MODE == "response":       # origin or cache answered; viewer-response runs
+                self.stats["invocations"] += 1
+                set_cookies(self.edge.handler(viewer_response(result), None), self.jar)
+            return uri
+        raise AssertionError(f"redirect loop at {uri}")
+
+    def page(self, uri):
+        final = self.get(uri)
+        folder = final.rsplit("/", 1)[0]
+        for asset in ("index.css", "script.js"):
+            self.get(f"{folder}/{asset}")
+        self.pages.append(final)
+        return final
+
+    def pick(self, lang, current):
+        """The language picker: sets the cookie in the browser, then opens the page in that language."""
+        self.jar["prefLang"] = lang
+        rest = current
+        for code in LANGS:
+            if current.startswith(f"/{code}/"):
+                rest = current[len(code) + 1:]
+        return self.page(rest if lang == "en" else f"/{lang}{rest}")
+
+
+def simulate(edge, args, recorded=None):
+    rng = random.Random(args.seed)
+    stats, outcomes = Counter(), []
+    values, weights = zip(*ACCEPT_LANGUAGE)
+    entries, entry_weights = zip(*ENTRY_PAGES)
+    for _ in range(args.visitors):
+        jar = {"_ga": "GA1.1.1234567890"}
+        if rng.random() < args.returning:
+            jar["prefLang"] = rng.choice(LANGS)
+        browser = Browser(edge, rng.choices(values, weights)[0], jar, stats, recorded)
+        current = browser.page(rng.choices(entries, entry_weights)[0])
+        for _ in range(rng.randint(0, 3)):
+            if rng.random() < 0.15:
+                current = browser.pick(rng.choice(LANGS), current)
+            else:
+                current = browser.page(current)
+        outcomes.append((browser.pages, jar.get("prefLang")))
+    return stats, outcomes
+
+
+def replay(edge, events):
+    stats = Counter()
+    for event in events:
+        event = copy.deepcopy(event)
+        event["Records"][0]["cf"].setdefault("config", {})["eventType"] = "viewer-request"
+        stats["requests"] += 1
+        stats["invocations"] += 1
+        result = edge.handler(event, None)
+        if "status" in result:
+            stats["redirects"] += 1
+            stats["same-URI redirects"] += (result["headers"]["location"][0]["value"]
+                                            == event["Records"][0]["cf"]["request"]["uri"])
+        elif edge.COOKIE_MODE == "response":
+            stats["invocations"] += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", help="recorded viewer-request events, one JSON object per line")
+    parser.add_argument("--visitors", type=int, default=20_000)
+    parser.add_argument("--returning", type=float, default=0.3, help="share of visitors with a prefLang cookie")
+    parser.add_argument("--record", help="write the simulated viewer-request events of the redirect mode here")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    events = None
+    if args.events:
+        with open(args.events, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        print(f"{len(events)} recorded viewer requests")
+    else:
+        print(f"{args.visitors} simulated visitors, {args.returning:.0%} with a prefLang cookie")
+
+    print(f"{'mode':<10}{'requests':>10}{'redirects':>11}{'same URI':>10}{'round trips':>13}{'invocations':>13}"
+          "   (per 1,000 requests)")
+    outcomes = {}
+    for mode in ("redirect", "response"):
+        edge = load(mode)
+        if events is not None:
+            stats = replay(edge, events)
+        else:
+            recorded = [] if args.record and mode == "redirect" else None
+            stats, outcomes[mode] = simulate(edge, args, recorded)
+            if recorded is not None:
+                with open(args.record, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(e) + "\n" for e in recorded)
+        per = 1000 / stats["requests"]
+        print(f"{mode:<10}{stats['requests']:>10}{stats['redirects'] * per:>11.1f}"
+              f"{stats['same-URI redirects'] * per:>10.1f}"
+              f"{format(stats['round trips'] * per, '.1f') if 'round trips' in stats else '-':>13}"
+              f"{stats['invocations'] * per:>13.1f}")
+        if mode == "response":
+            assert stats["same-URI redirects"] == 0
+    if outcomes:
+        assert outcomes["redirect"] == outcomes["response"], "the modes served different pages or cookies"
+        print("Both modes served every visitor the same pages and left the same prefLang cookie")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# Benchmark: manifest-aware routing (lambda/build_routes.py, lambda/lambda.py) on a
+# synthetic site.
+#
+# Writes a site of --pages English pages to a temporary directory, laid out like
+# the website bucket, with each other language translated only in part (COVERAGE;
+# Hindi has no home page yet). It builds the route manifest from it, as the deploy
+# step does, and sends --requests viewer requests through the function with and
+# without the manifest, following redirects:
+#   30%  the home page
+#   50%  a page in the visitor's language (a link on a page they read)
+#   20%  a page in another language (the language picker)
+# Visitors have an Accept-Language value and, 30% of them, a prefLang cookie.
+#
+# Reported: requests that end on a page missing from the site (a 404 after the
+# redirects), redirects, µs per request, the manifest size zipped with lambda.py
+# (Lambda@Edge viewer triggers allow 1 MB), and how long loading it takes.
+#
+# Checks, with the manifest: no request ends on a missing page; each visitor gets
+# the requested language if the page exists in it, otherwise the first language of
+# cookie, Accept-Language and English that has the page; and the cookie is not
+# set to English while the visitor reads English only because their language has
+# no version of the page.
+#
+# Usage:
+#   python benchmarks/routes-bench.py --pages 10000 --requests 200000
+
+import argparse
+import copy
+import importlib.util
+import io
+import random
+import statistics
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+LANGS = ["en", "es", "zh", "ar", "hi", "fr"]
+COVERAGE = {"es": 0.9, "fr": 0.8, "zh": 0.6, "ar": 0.3, "hi": 0.15}
+ACCEPT_LANGUAGE = [                            # (value, weight)
+    ("en-US,en;q=0.9", 40), ("en-GB,en;q=0.9", 8), ("es-ES,es;q=0.9,en;q=0.8", 10),
+    ("zh-CN,zh;q=0.9", 10), ("ar,en-US;q=0.9,en;q=0.8", 4), ("hi-IN,hi;q=0.9,en;q=0.8", 5),
+    ("hi-IN,hi;q=0.9,ar;q=0.8,en;q=0.5", 2), ("fr-FR,fr;q=0.9,en;q=0.8", 8),
+    ("de-DE,de;q=0.9,fr;q=0.8", 4), ("pt-BR,pt;q=0.9", 4),
+]
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_site(root, pages, rng):
+    """English pages and their translations; returns {object key below a language root: set of languages}."""
+    keys = ["index.html"]
+    for n in range(pages - 1):
+        section = n % 4
+        if section == 0:
+            keys.append(f"talks/{n}-{rng.choice(['keynote', 'panel', 'workshop'])}.html")
+        elif section == 1:
+            keys.append(f"speakers/speaker-{n}.html")
+        elif section == 2:
+            keys.append(f"sessions/day-{n % 3 + 1}/{n}.html")
+        else:
+            keys.append(f"tracks/track-{n}/index.html")
+    site = {}
+    for key in keys:
+        site[key] = {"en"} | {code for code, share in COVERAGE.items() if rng.random() < share}
+        if key == "index.html":
+            site[key] = set(LANGS) - {"hi"}
+        for code in site[key]:
+            path = root / (key if code == "en" else f"{code}/{key}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+    for code in LANGS:                                              # assets of every language
+        for asset in ("index.css", "script.js"):
+            path = root / (asset if code == "en" else f"{code}/{asset}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+    return site
+
+
+def split(uri):
+    """(language, object key below the language root) of a URI."""
+    code, sep, rest = uri[1:].partition("/")
+    if not (sep and code in LANGS):
+        code, rest = "en", uri[1:]
+    return code, rest + "index.html" if rest == "" or rest.endswith("/") else rest
+
+
+def viewer_request(uri, accept_language, cookie):
+    headers = {"accept-language": [{"key": "Accept-Language", "value": accept_language}]}
+    if cookie:
+        headers["cookie"] = [{"key": "Cookie", "value": f"prefLang={cookie}"}]
+    return {"Records": [{"cf": {"config": {"eventType": "viewer-request"},
+                                "request": {"uri": uri, "method": "GET", "headers": headers}}}]}
+
+
+def requests(site, n, rng):
+    """(uri, Accept-Language, cookie) of n viewer requests."""
+    keys = list(site)
+    values, weights = zip(*ACCEPT_LANGUAGE)
+    out = []
+    for _ in range(n):
+        accept_language = rng.choices(values, weights)[0]
+        cookie = rng.choice(LANGS) if rng.random() < 0.3 else None
+        kind = rng.random()
+        if kind < 0.3:
+            out.append(("/", accept_language, cookie))
+            continue
+        own = cookie or accept_language[:2]
+        lang = own if kind < 0.8 and own in LANGS else rng.choice(LANGS)
+        key = rng.choice(keys)
+        if key.endswith("/index.html") and rng.random() < 0.5:
+            key = key[:-len("index.html")]                          # the folder URI of the page
+        out.append((f"/{key}" if lang == "en" else f"/{lang}/{key}", accept_language, cookie))
+    return out
+
+
+def follow(edge, uri, accept_language, cookie):
+    """(final URI, redirects, request as the function passed it on)."""
+    for redirects in range(5):
+        result = edge.handler(viewer_request(uri, accept_language, cookie), None)
+        if "status" not in result:
+            return uri, redirects, result
+        uri = result["headers"]["location"][0]["value"]
+    raise AssertionError(f"redirect loop at {uri}")
+
+
+def expected(edge, site, uri, accept_language, cookie):
+    """The language the visitor should get, worked out without the manifest."""
+    lang, key = split(uri)
+    if uri == "/":
+        lang = cookie or edge._negotiate(accept_language)[0]
+    elif lang not in LANGS[1:]:
+        return "en"                                                 # English URIs are not rerouted
+    if lang in site[key]:
+        return lang
+    prefs = ([cookie] if cookie else []) + list(edge._negotiate(accept_language))
+    return next(code for code in prefs if code in site[key])
+
+
+def measure(edge, evs, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for ev in evs:
+            edge.handler(ev, None)
+        times.append((time.perf_counter() - start) / len(evs))
+    return statistics.median(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root, manifest_file = Path(tmp) / "site", Path(tmp) / "routes.json"
+        site = write_site(root, args.pages, rng)
+        build = load("build_routes", PROJECT_DIR / "lambda" / "build_routes.py")
+        build.main(["--site", str(root), "--output", str(manifest_file)])
+
+        plain = load("edge_plain", PROJECT_DIR / "lambda" / "lambda.py")
+        plain.ROUTES, plain.LANG_BIT = {}, {}                       # even if lambda/routes.json exists
+        routed = load("edge_routed", PROJECT_DIR / "lambda" / "lambda.py")
+        loads = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            routed.ROUTES, routed.LANG_BIT = routed._load_routes(manifest_file)
+            loads.append(time.perf_counter() - start)
+        package = io.BytesIO()
+        with zipfile.ZipFile(package, "w", zipfile.ZIP_DEFLATED) as z:
+            z.write(PROJECT_DIR / "lambda" / "lambda.py", "lambda.py")
+            z.write(manifest_file, "routes.json")
+    print(f"Package zipped {len(package.getvalue()) / 1024:.0f} KiB of the 1024 KiB Lambda@Edge allows; "
+          f"manifest loaded in {statistics.median(loads) * 1000:.1f} ms per cold start")
+
+    reqs = requests(site, args.requests, rng)
+    print(f"{args.requests} requests over {len(site)} pages")
+    print(f"{'routing':<16}{'missing pages':>15}{'redirects':>11}{'µs per request':>16}   (missing and redirects per 1,000)")
+    for name, edge in (("no manifest", plain), ("manifest", routed)):
+        missing = redirects = 0
+        for uri, accept_language, cookie in reqs:
+            final, hops, passed = follow(edge, uri, accept_language, cookie)
+            lang, key = split(final)
+            redirects += hops
+            exists = lang in site.get(key, ())
+            missing += not exists
+            if edge is routed:
+                assert exists, (uri, final)
+                assert lang == expected(edge, site, uri, accept_language, cookie), (uri, accept_language, cookie, final)
+                if cookie and cookie != lang and cookie not in site[key]:
+                    assert edge.COOKIE_HANDOFF not in passed["headers"], (uri, cookie, final)
+        evs = [viewer_request(*r) for r in reqs]
+        micros = measure(edge, [copy.deepcopy(e) for e in evs], args.repeat)
+        per = 1000 / len(reqs)
+        print(f"{name:<16}{missing * per:>15.1f}{redirects * per:>11.1f}{micros:>16.2f}")
+    print("With the manifest every request ends on a page that exists, in the best language that has it")
+
+
+if __name__ == "__main__":
+    main()
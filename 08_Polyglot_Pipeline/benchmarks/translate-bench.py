@@ -0,0 +1,125 @@
+# Benchmark: translating the site with conference-site/translate_site.py.
+#
+# Amazon Translate is replaced by a stub: each translate_document call takes
+# --latency seconds (±50%), and calls beyond --limit in flight at once fail with
+# ThrottlingException, as the real service does when a quota is exceeded. The site
+# is conference-site plus --pages generated pages; each is translated into the five
+# languages of the build.
+#
+# Reported: wall-clock seconds to translate the site with 1 worker (one document
+# at a time, as the per-file translate.py runs did) and with --workers threads,
+# the speedup, and the calls and throttled calls. Runs over the limit show the
+# retries at work.
+#
+# Checks:
+#   - every (page, language) is translated exactly once, with nothing failed
+#   - a re-run with the same manifest calls Translate for no page
+#   - after one page changes, only that page is translated again, once per language
+#
+# Usage:
+#   python benchmarks/translate-bench.py --pages 30 --latency 0.1
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "conference-site"))
+import translate_site
+
+LANGUAGES = translate_site.LANGUAGES.split(",")
+
+
+class StubTranslate:
+    """translate_document with latency and a limit on calls in flight."""
+
+    def __init__(self, latency, limit, seed):
+        self.latency, self.limit = latency, limit
+        self.rng, self.lock = random.Random(seed), threading.Lock()
+        self.in_flight = self.calls = self.throttled = 0
+        self.done = []                                   # (document, language) of each translation
+
+    def translate_document(self, Document, SourceLanguageCode, TargetLanguageCode):
+        with self.lock:
+            self.calls += 1
+            if self.in_flight >= self.limit:
+                self.throttled += 1
+                raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                                  "TranslateDocument")
+            self.in_flight += 1
+            delay = self.latency * self.rng.uniform(0.5, 1.5)
+        try:
+            time.sleep(delay)
+            content = f"<!-- {SourceLanguageCode}->{TargetLanguageCode} -->".encode() + Document["Content"]
+            with self.lock:
+                self.done.append((Document["Content"], TargetLanguageCode))
+            return {"TranslatedDocument": {"Content": content}, "TargetLanguageCode": TargetLanguageCode}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def make_site(root, pages):
+    shutil.copytree(PROJECT_DIR / "conference-site", root, ignore=shutil.ignore_patterns("__pycache__", "*.py"))
+    page = (root / "index.html").read_text(encoding="utf-8")
+    for n in range(pages):
+        path = root / "talks" / f"talk-{n}.html"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(page.replace("Tech Conferences", f"Talk {n}"), encoding="utf-8")
+
+
+def run(site, out, manifest, workers, args, force=True):
+    client = StubTranslate(args.latency, args.limit, args.seed)
+    start = time.perf_counter()
+    outcomes = translate_site.translate_site(client, site, out, LANGUAGES, workers=workers,
+                                             manifest_path=manifest, force=force)
+    return time.perf_counter() - start, client, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=30, help="generated pages besides index.html")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per translate_document call")
+    parser.add_argument("--limit", type=int, default=10, help="calls in flight before throttling")
+    parser.add_argument("--workers", default="4,8,16", help="pool sizes to compare with 1 worker")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        site, out, manifest = Path(tmp) / "site", Path(tmp) / "build", Path(tmp) / "translate-manifest.json"
+        make_site(site, args.pages)
+        pairs = (args.pages + 1) * len(LANGUAGES)
+        print(f"{args.pages + 1} pages x {len(LANGUAGES)} languages = {pairs} translations, "
+              f"{args.latency * 1000:.0f} ms each, throttled above {args.limit} in flight")
+
+        print(f"{'workers':>8}{'seconds':>10}{'speedup':>9}{'calls':>7}{'throttled':>11}")
+        sequential = None
+        for workers in [1, *map(int, args.workers.split(","))]:
+            seconds, client, outcomes = run(site, out, manifest, workers, args)
+            assert not outcomes["failed"] and len(outcomes["translated"]) == pairs, outcomes["failed"]
+            assert len(client.done) == len(set(client.done)) == pairs
+            for rel, lang in outcomes["translated"]:
+                assert (out / lang / rel).read_bytes().startswith(f"<!-- en->{lang} -->".encode())
+            sequential = sequential or seconds
+            print(f"{workers:>8}{seconds:>10.2f}{sequential / seconds:>8.1f}x{client.calls:>7}{client.throttled:>11}")
+
+        seconds, client, outcomes = run(site, out, manifest, 8, args, force=False)
+        assert client.calls == 0 and len(outcomes["unchanged"]) == pairs
+        print(f"Re-run without changes: {client.calls} calls, {seconds:.2f} s")
+        changed = site / "talks" / "talk-0.html"
+        changed.write_text(changed.read_text(encoding="utf-8") + "<!-- edited -->", encoding="utf-8")
+        seconds, client, outcomes = run(site, out, manifest, 8, args, force=False)
+        assert sorted(lang for _, lang in outcomes["translated"]) == sorted(LANGUAGES)
+        assert {rel.as_posix() for rel, _ in outcomes["translated"]} == {"talks/talk-0.html"}
+        print(f"Re-run after editing one page: {client.calls} calls, {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
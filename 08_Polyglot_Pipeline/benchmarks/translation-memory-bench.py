@@ -0,0 +1,195 @@
+# Benchmark: segment-level translation memory (conference-site/translation_memory.py).
+#
+# Amazon Translate is replaced by a stub that "translates" the text of an HTML
+# document (each run of text becomes "[es]" + its upper-case form) and keeps the
+# markup, scripts, styles and translate="no" elements as they are. It bills the
+# characters of text it translates, and rejects documents over 100 KB like the
+# service. The stub parses with html.parser, independently of the segmenter.
+#
+# The site is conference-site plus a programme page of --sessions sessions, large
+# enough to be over the document limit. It is translated into the five languages
+# of the build with translate_site.py, four times:
+#   cold       empty translation memory
+#   typo       one sentence of index.html changed
+#   rewrite    every 10th session description changed
+#   unchanged  nothing changed, with --force so that no page is skipped
+#
+# Reported per run: segment hit ratio, Translate calls and characters billed,
+# against what whole-document translation bills for the same pages.
+#
+# Checks:
+#   - each page translated segment by segment equals the stub's whole-document
+#     translation of it, markup included (for the programme page, which is too
+#     large for one document, the stub is called without its limit)
+#   - whole-document translation of the programme page fails on the size limit
+#
+# Usage:
+#   python benchmarks/translation-memory-bench.py --sessions 600
+
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+from html.parser import HTMLParser
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR / "conference-site"))
+import translate_site
+import translation_memory
+
+LANGUAGES = translate_site.LANGUAGES.split(",")
+DOCUMENT_LIMIT = 100 * 1024
+
+
+class StubTranslator(HTMLParser):
+    """Rewrites the text of one document, leaving everything else byte for byte."""
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=False)
+        self.target, self.out, self.skip, self.chars = target, [], [], 0
+
+    def handle_starttag(self, tag, attrs):
+        self.out.append(self.get_starttag_text())
+        if tag in ("script", "style") or ("translate", "no") in attrs:
+            if tag not in translation_memory.VOID:
+                self.skip.append(tag)
+        elif self.skip and tag == self.skip[-1]:
+            self.skip.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.out.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        self.out.append(f"</{tag}>")
+        if self.skip and tag == self.skip[-1]:
+            self.skip.pop()
+
+    def handle_data(self, data):
+        if self.skip or not data.strip():
+            self.out.append(data)
+            return
+        stripped = data.strip()
+        self.chars += len(stripped)
+        lead = data[:len(data) - len(data.lstrip())]
+        self.out.append(f"{lead}[{self.target}]{stripped.upper()}{data[len(data.rstrip()):]}")
+
+    def handle_entityref(self, name):
+        self.out.append(f"&{name};")
+
+    def handle_charref(self, name):
+        self.out.append(f"&#{name};")
+
+    def handle_comment(self, data):
+        self.out.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.out.append(f"<!{decl}>")
+
+
+def stub_translate(content, target):
+    parser = StubTranslator(target)
+    parser.feed(content.decode("utf-8"))
+    parser.close()
+    return "".join(parser.out).encode("utf-8"), parser.chars
+
+
+class StubTranslate:
+    def __init__(self, limit=DOCUMENT_LIMIT):
+        self.limit, self.lock = limit, threading.Lock()
+        self.calls = self.chars = 0
+
+    def translate_document(self, Document, SourceLanguageCode, TargetLanguageCode):
+        if self.limit and len(Document["Content"]) > self.limit:
+            raise ClientError({"Error": {"Code": "ValidationException",
+                                         "Message": "Document size exceeds the limit"}}, "TranslateDocument")
+        content, chars = stub_translate(Document["Content"], TargetLanguageCode)
+        with self.lock:
+            self.calls += 1
+            self.chars += chars
+        return {"TranslatedDocument": {"Content": content}, "TargetLanguageCode": TargetLanguageCode}
+
+
+def make_site(root, sessions):
+    shutil.copytree(PROJECT_DIR / "conference-site", root, ignore=shutil.ignore_patterns("__pycache__", "*.py"))
+    rows = "\n".join(
+        f'\t<section class="session">\n\t\t<h2>Session {n}: scaling <em>edge</em> functions, part {n}</h2>\n'
+        f'\t\t<p>Speaker {n} shows how a team of {n % 7 + 2} engineers moved {n * 3} services to the edge, '
+        f'what broke on the way &amp; what they would do again. Bring questions about caching, '
+        f'cold starts and <a href="/talks/{n}.html">the slides</a>.</p>\n'
+        f'\t\t<p class="room" translate="no">Room {n % 12}</p>\n\t</section>'
+        for n in range(sessions))
+    (root / "programme.html").write_text(
+        f'<!DOCTYPE html>\n<html lang="en">\n<head>\n\t<title>Programme</title>\n'
+        f'\t<link rel="stylesheet" href="index.css">\n</head>\n<body>\n<h1>Programme</h1>\n'
+        # a ">" inside a quoted attribute value does not end the tag
+        f'<p title="a > b">Text</p>\n{rows}\n'
+        f'<script src="script.js"></script>\n</body>\n</html>\n', encoding="utf-8")
+
+
+def run(name, site, out, tmp, whole_chars):
+    client = StubTranslate()
+    memory = translation_memory.TranslationMemory(tmp / "memory.sqlite3")
+    try:
+        outcomes = translate_site.translate_site(client, site, out, LANGUAGES, manifest_path=tmp / "manifest.json",
+                                                 force=name == "unchanged", memory=memory)
+    finally:
+        memory.close()
+    assert not outcomes["failed"], outcomes["failed"]
+    seg = outcomes["segments"]
+    pages = len(outcomes["translated"])
+    print(f"{name:<11}{pages:>6}{seg['hits'] / seg['segments'] if seg['segments'] else 1:>11.1%}"
+          f"{client.calls:>7}{client.chars:>16}{sum(whole_chars[rel.as_posix()] for rel, _ in outcomes['translated']):>16}")
+    return outcomes
+
+
+def check(site, out):
+    """Segment-by-segment output equals whole-document translation."""
+    for rel in ("index.html", "programme.html"):
+        for lang in LANGUAGES:
+            whole, _ = stub_translate((site / rel).read_bytes(), lang)
+            assert (out / lang / rel).read_bytes() == whole, (rel, lang)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=600, help="sessions on the generated programme page")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        site, out = tmp / "site", tmp / "build"
+        make_site(site, args.sessions)
+        size = (site / "programme.html").stat().st_size
+        try:
+            StubTranslate().translate_document({"Content": (site / "programme.html").read_bytes()}, "en", "es")
+            raise AssertionError("the programme page fits in one document; use more --sessions")
+        except ClientError:
+            print(f"programme.html is {size / 1024:.0f} KB: as one document it fails on the 100 KB limit")
+
+        print(f"{'run':<11}{'pages':>6}{'hit ratio':>11}{'calls':>7}{'chars billed':>16}{'whole pages':>16}"
+              "   (chars: segment by segment / pages as whole documents)")
+        billed = {}
+        for name in ("cold", "typo", "rewrite", "unchanged"):
+            if name == "typo":
+                index = site / "index.html"
+                index.write_text(index.read_text(encoding="utf-8").replace(
+                    "game-changer", "game changer"), encoding="utf-8")
+            if name == "rewrite":
+                programme = site / "programme.html"
+                text = programme.read_text(encoding="utf-8")
+                for n in range(0, args.sessions, 10):
+                    text = text.replace(f"Speaker {n} shows", f"Speaker {n} explains", 1)
+                programme.write_text(text, encoding="utf-8")
+            whole = {rel: stub_translate((site / rel).read_bytes(), "es")[1] for rel in ("index.html", "programme.html")}
+            billed[name] = run(name, site, out, tmp, whole)
+            check(site, out)
+        assert billed["unchanged"]["segments"]["chars_billed"] == 0
+        print("Segment-by-segment output equals whole-document translation on every page and language")
+
+
+if __name__ == "__main__":
+    main()
@@ -140,6 +140,10 @@ resource "aws_codebuild_project" "translate" {
       name  = "WEBSITE_BUCKET_NAME"
       value = aws_s3_bucket.website-bucket.bucket
     }
+    environment_variable {
+      name  = "PIPELINE_BUCKET_NAME"
+      value = aws_s3_bucket.codepipeline_bucket.bucket
+    }
   }
 
   source {
@@ -62,6 +62,12 @@ resource "aws_cloudfront_distribution" "s3_distribution" {
       lambda_arn   = aws_lambda_function.terraform_lambda_func.qualified_arn
       include_body = false
     }
+
+    # Same function: adds the prefLang cookie to the response (COOKIE_MODE = "response")
+    lambda_function_association {
+      event_type = "viewer-response" # runs after the cache, so the cookie is never cached
+      lambda_arn = aws_lambda_function.terraform_lambda_func.qualified_arn
+    }
   }
 
   # No geo restrictions for content delivery
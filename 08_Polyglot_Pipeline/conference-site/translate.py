@@ -1,35 +1,69 @@
 import boto3
 import argparse
+import random
+import time
 
-parser = argparse.ArgumentParser()
-parser.add_argument("SourceLanguageCode")
-parser.add_argument("TargetLanguageCode")
-parser.add_argument("SourceFile")
-args = parser.parse_args()
+from botocore.exceptions import ClientError
 
+# Errors worth trying again: Translate is busy, not the document is wrong
+RETRYABLE = {"ThrottlingException", "TooManyRequestsException", "LimitExceededException",
+             "ServiceUnavailableException", "InternalServerException"}
 
-translate = boto3.client('translate')
 
-localFile = args.SourceFile
-file = open(localFile, "rb")
-data = file.read()
-file.close()
+def translate_document(client, data, source, target, attempts=8, base=0.5, cap=20.0):
+    """Translate one HTML document (bytes) and return the translated bytes.
 
+    Throttling and other transient errors are retried with exponential backoff
+    and full jitter, up to attempts calls in all; other errors are raised at once.
+    """
+    for attempt in range(attempts):
+        try:
+            result = client.translate_document(
+                Document={
+                        "Content": data,
+                        "ContentType": "text/html"
+                    },
+                SourceLanguageCode=source,
+                TargetLanguageCode=target
+            )
+            return result["TranslatedDocument"]["Content"]
+        except ClientError as err:
+            if err.response["Error"]["Code"] not in RETRYABLE or attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))
 
-result = translate.translate_document(
-    Document={
-            "Content": data,
-            "ContentType": "text/html"
-        },
-    SourceLanguageCode=args.SourceLanguageCode,
-    TargetLanguageCode=args.TargetLanguageCode
-)
 
-if "TranslatedDocument" in result:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("SourceLanguageCode")
+    parser.add_argument("TargetLanguageCode")
+    parser.add_argument("SourceFile")
+    parser.add_argument("--memory", help="translate segment by segment through this SQLite translation memory")
+    args = parser.parse_args()
+
+
+    translate = boto3.client('translate')
+
+    localFile = args.SourceFile
+    file = open(localFile, "rb")
+    data = file.read()
+    file.close()
+
+
+    if args.memory:
+        from translation_memory import TranslationMemory, translate_html
+        memory = TranslationMemory(args.memory)
+        content, stats = translate_html(translate, memory, data, args.SourceLanguageCode, args.TargetLanguageCode)
+        memory.close()
+        print(f"{stats['hits']} of {stats['segments']} segments from the translation memory, "
+              f"{stats['chars_billed']} of {stats['chars_page']} characters billed")
+    else:
+        content = translate_document(translate, data, args.SourceLanguageCode, args.TargetLanguageCode)
+
     fileName = localFile.split("/")[-1]
     tmpfile = f"{args.TargetLanguageCode}-{fileName}"
     with open(tmpfile,  'w') as f:
-        f.write(result["TranslatedDocument"]["Content"].decode('utf-8'))
-        
+        f.write(content.decode('utf-8'))
+
 
-    print("Translated document ", tmpfile)
\ No newline at end of file
+    print("Translated document ", tmpfile)
@@ -0,0 +1,172 @@
+# Translates the whole site in one run, laid out the way the website bucket is:
+# the source language at the root of --out, each target language in its own
+# folder (es/index.html, ...).
+#
+#  • Pages (.html, .htm) are translated with translate.translate_document, one
+#    job per (page, language), on a pool of --workers threads. Throttling is
+#    retried with exponential backoff and jitter.
+#  • A page is translated again only if it changed. --manifest records, per
+#    language, the SHA-256 of the source page each translation was made from;
+#    it is saved at the end, also when the run fails. Unchanged pages are not
+#    written to --out: their translation from an earlier run is in the bucket
+#    already. --force translates everything.
+#  • Assets (CSS, JavaScript, images, fonts) are copied next to the source pages
+#    and into every language folder.
+#  • With --memory, changed pages are translated segment by segment through a
+#    translation memory (translation_memory.py): only the text segments not
+#    translated before are sent, and the hit ratio and characters billed are
+#    reported.
+#
+# Exits with 1 if any translation failed, after saving the manifest, so a
+# re-run retries only the failures.
+#
+# Usage:
+#   python translate_site.py --site . --out build --languages es,zh,ar,hi,fr
+#   aws s3 sync build s3://<website bucket>
+
+import argparse
+import hashlib
+import json
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import boto3
+from botocore.config import Config
+
+from translate import translate_document
+from translation_memory import TranslationMemory, translate_html
+
+PAGE_SUFFIXES  = {".html", ".htm"}
+ASSET_SUFFIXES = {".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".woff", ".woff2"}
+LANGUAGES      = "es,zh,ar,hi,fr"
+
+
+def site_files(site, out):
+    """(pages, assets) of the site, as paths relative to it; out is excluded."""
+    pages, assets = [], []
+    for path in sorted(site.rglob("*")):
+        rel = path.relative_to(site)
+        if not path.is_file() or any(p.startswith(".") for p in rel.parts) \
+                or path.resolve().is_relative_to(out):
+            continue
+        suffix = path.suffix.lower()
+        if suffix in PAGE_SUFFIXES:
+            pages.append(rel)
+        elif suffix in ASSET_SUFFIXES:
+            assets.append(rel)
+    return pages, assets
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, manifest):
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def translate_site(client, site, out, languages, source="en", workers=8, manifest_path=None, force=False,
+                   memory=None):
+    """Translate the changed pages of site into out; returns {outcome: [(page, language), ...]}.
+
+    With a TranslationMemory, outcomes["segments"] counts the segment work (see translate_html).
+    """
+    site, out = Path(site), Path(out)
+    pages, assets = site_files(site, out.resolve())
+    manifest = {} if force or not manifest_path else load_manifest(manifest_path)
+
+    for rel in assets + pages:                       # the source language lives at the root
+        (out / rel).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(site / rel, out / rel)
+    for lang in languages:
+        for rel in assets:
+            (out / lang / rel).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(site / rel, out / lang / rel)
+
+    # One job per page and language whose source changed since it was last translated
+    data = {rel: (site / rel).read_bytes() for rel in pages}
+    digest = {rel: hashlib.sha256(content).hexdigest() for rel, content in data.items()}
+    outcomes = {"translated": [], "unchanged": [], "failed": [], "segments": Counter()}
+    jobs = []
+    for rel in pages:
+        for lang in languages:
+            if manifest.get(f"{lang}/{rel.as_posix()}") == {"source": source, "sha256": digest[rel]}:
+                outcomes["unchanged"].append((rel, lang))
+            else:
+                jobs.append((rel, lang))
+
+    def job(rel, lang):
+        if memory:
+            content, stats = translate_html(client, memory, data[rel], source, lang)
+        else:
+            content, stats = translate_document(client, data[rel], source, lang), Counter()
+        target = out / lang / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        return stats
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(job, rel, lang): (rel, lang) for rel, lang in jobs}
+            for future in as_completed(futures):
+                rel, lang = futures[future]
+                try:
+                    outcomes["segments"] += future.result()
+                except Exception as err:
+                    print(f"Translating {rel} to {lang} failed: {err}")
+                    outcomes["failed"].append((rel, lang))
+                    continue
+                manifest[f"{lang}/{rel.as_posix()}"] = {"source": source, "sha256": digest[rel]}
+                outcomes["translated"].append((rel, lang))
+    finally:
+        if manifest_path:
+            save_manifest(manifest_path, manifest)
+    return outcomes
+
+
+def main(argv=None, client=None):
+    parser = argparse.ArgumentParser(description="Translate the changed pages of a site into several languages.")
+    parser.add_argument("--site", default=".", help="the site in the source language")
+    parser.add_argument("--out", default="build", help="where the translated site is written")
+    parser.add_argument("--languages", default=LANGUAGES, help="comma-separated target language codes")
+    parser.add_argument("--source", default="en", help="the language of the site")
+    parser.add_argument("--workers", type=int, default=8, help="translations in flight at once")
+    parser.add_argument("--manifest", default="translate-manifest.json", help="hashes of the translated pages")
+    parser.add_argument("--force", action="store_true", help="translate every page, changed or not")
+    parser.add_argument("--memory", help="translate segment by segment through this SQLite translation memory")
+    args = parser.parse_args(argv)
+
+    # translate_document retries throttling itself; botocore's retries on top would multiply them
+    client = client or boto3.client("translate", config=Config(max_pool_connections=args.workers,
+                                                               retries={"total_max_attempts": 1}))
+    memory = TranslationMemory(args.memory) if args.memory else None
+    start = time.perf_counter()
+    try:
+        outcomes = translate_site(client, args.site, args.out, args.languages.split(","), args.source,
+                                  args.workers, args.manifest, args.force, memory)
+    finally:
+        if memory:
+            memory.close()
+    print(f"Translated {len(outcomes['translated'])}, unchanged {len(outcomes['unchanged'])}, "
+          f"failed {len(outcomes['failed'])} (page, language) pairs in {time.perf_counter() - start:.1f} s")
+    seg = outcomes["segments"]
+    if seg["segments"]:
+        print(f"Translation memory: {seg['hits']} of {seg['segments']} segments found "
+              f"({seg['hits'] / seg['segments']:.1%}), {seg['chars_billed']} characters billed "
+              f"of {seg['chars_page']} in the translated pages, {seg['calls']} Translate calls")
+    if outcomes["failed"]:
+        raise SystemExit(1)
+    return outcomes
+
+
+if __name__ == "__main__":
+    main()
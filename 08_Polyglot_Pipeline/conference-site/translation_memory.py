@@ -0,0 +1,176 @@
+# Segment-level translation memory for HTML pages.
+#
+#  • A page is split into segments: the runs of text and inline markup (<a>,
+#    <b>, <span>, ...) between block-level tags. Scripts, styles, comments and
+#    elements marked translate="no" are left out. Leading and trailing
+#    whitespace stays with the markup.
+#  • Each segment is looked up in a SQLite database, keyed by source language,
+#    target language and the SHA-256 of the segment. Only the misses go to
+#    Amazon Translate: batched into small HTML documents of at most
+#    MAX_BATCH_BYTES each, one <div id="tm-N"> per segment, with
+#    translate.translate_document. New translations are stored.
+#  • The page is put back together from its own markup and the translated
+#    segments, so fixing one typo re-translates one segment, not the page, and a
+#    page larger than the service's document limit is sent in batches under it.
+#
+# Attributes (alt, title, ...) are not translated in this mode, and the markup
+# of the page is kept as it is, <html lang> included.
+
+import hashlib
+import html
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from translate import translate_document
+
+MAX_BATCH_BYTES = 90_000                     # TranslateDocument takes up to 100 KB per document
+INLINE = {"a", "abbr", "b", "bdi", "bdo", "br", "cite", "code", "em", "i", "kbd", "mark", "q", "s",
+          "small", "span", "strong", "sub", "sup", "time", "u", "var", "wbr"}
+VOID   = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source",
+          "track", "wbr"}
+
+# Inside a tag, quoted attribute values may contain ">"
+_TAG_BODY = r"""(?:"[^"]*"|'[^']*'|[^'">])*"""
+# Everything that is not text: comments, whole script and style elements, tags, <!DOCTYPE>
+_MARKUP = re.compile(rf"<!--.*?-->|<(script|style)\b.*?</\1\s*>|<[/!?]?[A-Za-z]{_TAG_BODY}>", re.S | re.I)
+_TAG_NAME = re.compile(r"</?([A-Za-z][A-Za-z0-9-]*)")
+_NO_TRANSLATE = re.compile(r"""\btranslate\s*=\s*["']?no\b""", re.I)
+_TAG = re.compile(rf"<{_TAG_BODY}>")
+_LETTER = re.compile(r"[^\W\d_]")
+_BATCH_SEGMENT = re.compile(r"""<div\b[^>]*\bid\s*=\s*["']tm-(\d+)["'][^>]*>(.*?)</div\s*>""", re.S | re.I)
+
+
+def segments(page):
+    """(start, end) of each translatable segment of page (str), in order."""
+    spans, run, skip, pos = [], None, None, 0          # run: [start, end, has letters]; skip: [tag, depth]
+
+    def close():
+        if run and run[2]:
+            text = page[run[0]:run[1]]
+            start = run[0] + len(text) - len(text.lstrip())
+            spans.append((start, run[0] + len(text.rstrip())))
+
+    for m in [*_MARKUP.finditer(page), None]:
+        end = m.start() if m else len(page)
+        if pos < end and not skip:                     # text
+            run = run or [pos, end, False]
+            run[1] = end
+            run[2] = run[2] or bool(_LETTER.search(html.unescape(page[pos:end])))
+        if m is None:
+            break
+        pos = m.end()
+        token = m.group(0)
+        name = _TAG_NAME.match(token)
+        name = name.group(1).lower() if name and not m.group(1) else None
+        closing, self_closing = token.startswith("</"), token.endswith("/>")
+        if skip:                                       # inside translate="no"
+            if name == skip[0] and not self_closing:
+                skip[1] += -1 if closing else 1
+                if skip[1] == 0:
+                    skip = None
+            continue
+        if name in INLINE:
+            run = run or [m.start(), pos, False]
+            run[1] = pos
+            continue
+        close()
+        run = None
+        if name and not closing and not self_closing and name not in VOID and _NO_TRANSLATE.search(token):
+            skip = [name, 1]
+    close()
+    return spans
+
+
+def text_chars(fragment):
+    """The characters of text in an HTML fragment, which is what Translate bills."""
+    return len(html.unescape(_TAG.sub("", fragment)))
+
+
+class TranslationMemory:
+    """Translated segments in a SQLite file, safe to share between threads."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute("""CREATE TABLE IF NOT EXISTS segments (
+                                   source_lang TEXT, target_lang TEXT, source_hash TEXT,
+                                   source TEXT, translation TEXT,
+                                   PRIMARY KEY (source_lang, target_lang, source_hash)) WITHOUT ROWID""")
+
+    def lookup(self, source, target, hashes):
+        """{hash: translation} of the hashes that are in the memory."""
+        found, hashes = {}, list(hashes)
+        with self.lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                found.update(self.db.execute(
+                    "SELECT source_hash, translation FROM segments WHERE source_lang = ? AND target_lang = ? "
+                    f"AND source_hash IN ({','.join('?' * len(chunk))})", [source, target, *chunk]))
+        return found
+
+    def store(self, source, target, rows):
+        """rows: (hash, source segment, translation)."""
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?)",
+                                [(source, target, h, text, translation) for h, text, translation in rows])
+
+    def close(self):
+        self.db.close()
+
+
+def batches(items, limit=MAX_BATCH_BYTES):
+    """HTML documents of (number, segment) items, each at most limit bytes of UTF-8."""
+    head, tail = "<html><body>\n", "</body></html>"
+    doc, size = [], len(head) + len(tail)
+    for n, segment in items:
+        part = f'<div id="tm-{n}">{segment}</div>\n'
+        if len(head) + len(tail) + len(part.encode()) > limit:
+            raise ValueError(f"segment tm-{n} is larger than {limit} bytes")
+        if size + len(part.encode()) > limit:
+            yield head + "".join(doc) + tail
+            doc, size = [], len(head) + len(tail)
+        doc.append(part)
+        size += len(part.encode())
+    if doc:
+        yield head + "".join(doc) + tail
+
+
+def translate_html(client, memory, data, source, target):
+    """Translate an HTML page (bytes) through memory; returns (bytes, Counter of the work done).
+
+    The counter has segments (distinct ones), hits, misses, calls, chars_billed
+    (the text sent to Translate) and chars_page (the text of the whole page, what
+    translating it as one document bills).
+    """
+    page = data.decode("utf-8")
+    spans = segments(page)
+    texts = [page[s:e] for s, e in spans]
+    keys = [hashlib.sha256(t.encode()).hexdigest() for t in texts]
+    unique = dict(zip(keys, texts))
+    found = memory.lookup(source, target, unique)
+    missing = [(h, t) for h, t in unique.items() if h not in found]
+    stats = Counter(segments=len(unique), hits=len(found), misses=len(missing),
+                    chars_page=text_chars(page), chars_billed=sum(text_chars(t) for _, t in missing))
+
+    new = []
+    for doc in batches(enumerate(t for _, t in missing)):
+        stats["calls"] += 1
+        translated = translate_document(client, doc.encode(), source, target).decode("utf-8")
+        got = {int(n): segment.strip() for n, segment in _BATCH_SEGMENT.findall(translated)}
+        ids = [int(n) for n in re.findall(r'id="tm-(\d+)"', doc)]
+        if not set(ids) <= got.keys():
+            raise RuntimeError(f"Translate dropped segments {sorted(set(ids) - got.keys())} of a batch")
+        new += [(missing[n][0], missing[n][1], got[n]) for n in ids]
+    if new:
+        memory.store(source, target, new)
+        found.update((h, translation) for h, _, translation in new)
+
+    out, pos = [], 0
+    for (s, e), key in zip(spans, keys):
+        out += [page[pos:s], found[key]]
+        pos = e
+    out.append(page[pos:])
+    return "".join(out).encode("utf-8"), stats
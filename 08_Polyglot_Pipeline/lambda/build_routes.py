@@ -0,0 +1,103 @@
+# Build step: writes lambda/routes.json, the route manifest of the edge function.
+#
+# The manifest says which pages of the translated site exist in which language,
+# so lambda.py only sends visitors to pages that were translated. It is made from
+# the site as it is deployed: English at the root, every other language of
+# lambda.py's SUPPORTED under its own prefix (es/..., fr/...). Only pages (.html,
+# .htm) are listed; assets are not routed by language.
+#
+# Format: {"languages": [codes], "pages": {path: mask}}. A path is the object key
+# below its language root, URL-encoded as it appears in request URIs
+# ("index.html", "talks/keynote.html"). Bit i of its mask is set if the page
+# exists in languages[i]. lambda.py loads it once per container, and looks up
+# pages with one dict lookup and one bit test.
+#
+# terraform apply bundles routes.json with lambda.py if it exists. Without it,
+# every page is taken to exist in every language (the behaviour before the
+# manifest). The manifest is a snapshot: the pipeline (buildspec.yml) does not
+# rebuild it, so run this and terraform apply again after every pipeline run that
+# adds, removes or translates pages. Pages added since are routed as if every
+# language had them. Lambda@Edge functions on viewer triggers may be at most 1 MB zipped,
+# so the size is printed.
+#
+# Usage:
+#   python lambda/build_routes.py --bucket <website bucket>      # after the pipeline has run
+#   python lambda/build_routes.py --site ./site                  # a local copy of the bucket
+#   terraform apply                                              # publishes a new version
+
+import argparse
+import importlib.util
+import json
+import os
+import urllib.parse
+import zlib
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+PAGE_SUFFIXES = (".html", ".htm")
+
+
+def edge_module():
+    """lambda.py ("lambda" is a keyword, so it cannot be imported by name)."""
+    spec = importlib.util.spec_from_file_location("edge", HERE / "lambda.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def site_keys(site):
+    """The object keys of a local site tree, with "/" as separator."""
+    for root, _, files in os.walk(site):
+        for name in files:
+            yield Path(root, name).relative_to(site).as_posix()
+
+
+def bucket_keys(bucket):
+    import boto3
+
+    pages = boto3.client("s3").get_paginator("list_objects_v2").paginate(Bucket=bucket)
+    for page in pages:
+        for obj in page.get("Contents", []):
+            yield obj["Key"]
+
+
+def build(keys, default, prefixed):
+    """The manifest of the pages among keys."""
+    languages = [default, *sorted(prefixed)]
+    bit = {code: 1 << i for i, code in enumerate(languages)}
+    pages = {}
+    for key in keys:
+        if not key.lower().endswith(PAGE_SUFFIXES):
+            continue
+        code, sep, rest = key.partition("/")
+        if not (sep and code in prefixed):
+            code, rest = default, key
+        path = urllib.parse.quote(rest)
+        pages[path] = pages.get(path, 0) | bit[code]
+    return {"languages": languages, "pages": dict(sorted(pages.items()))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the route manifest of the edge function.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--site", help="local directory laid out like the website bucket")
+    source.add_argument("--bucket", help="the website bucket")
+    parser.add_argument("--output", default=str(HERE / "routes.json"))
+    args = parser.parse_args(argv)
+
+    edge = edge_module()
+    keys = site_keys(args.site) if args.site else bucket_keys(args.bucket)
+    manifest = build(keys, edge.DEFAULT, edge.PREFIXED)
+    text = json.dumps(manifest, separators=(",", ":"))
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    counts = {code: sum(1 for mask in manifest["pages"].values() if mask >> i & 1)
+              for i, code in enumerate(manifest["languages"])}
+    print(f"{len(manifest['pages'])} pages: " + ", ".join(f"{c} {n}" for c, n in counts.items()))
+    print(f"{args.output}: {len(text)} bytes, about {len(zlib.compress(text.encode(), 9))} zipped")
+    return manifest
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-# Import required modules: re for regex, urllib.parse for URL parsing
-import re, urllib.parse as up
+# Import required modules: re for regex, urllib.parse for URL parsing,
+# functools for the Accept-Language cache, json and os for the route manifest
+import functools, json, os, re, urllib.parse as up
 
 # Supported language codes
 SUPPORTED = {"en", "es", "zh", "ar", "hi", "fr"}
@@ -7,9 +8,46 @@ SUPPORTED = {"en", "es", "zh", "ar", "hi", "fr"}
 DEFAULT   = "en"
 # Cookie name for preferred language
 COOKIE    = "prefLang"
+# Languages that live under their own prefix (/es/, /fr/, ...); English is the root
+PREFIXED  = frozenset(SUPPORTED - {DEFAULT})
+# Set-Cookie values, built once instead of on every request
+SET_COOKIE = {l: f"{COOKIE}={l}; Path=/; Max-Age=31536000; SameSite=Lax" for l in SUPPORTED}
+# Distinct Accept-Language values remembered per warm instance; browsers send few of them
+AL_CACHE_SIZE = 1024
+# How the cookie is refreshed when the visitor stays on the page they asked for:
+#   "response" - the request goes on, and the viewer-response run adds Set-Cookie
+#   "redirect" - a 301 to the same URI that carries Set-Cookie (one more round trip)
+# Lambda@Edge has no environment variables, so the mode is set here.
+COOKIE_MODE = "response"
+# Request header that hands the cookie from the viewer-request run to the viewer-response run
+COOKIE_HANDOFF = "x-pref-lang-set"
+# Route manifest written by build_routes.py: which pages exist in which language.
+# Bundled next to this file; without it, every page is taken to exist in every language.
+ROUTES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routes.json")
+
+# One Accept-Language element (RFC 7231 section 5.3.5): a language range,
+# optionally followed by ";q=<qvalue>", a number from 0 to 1 with up to 3 decimals
+_AL_ELEMENT = re.compile(
+    r"\s*(\*|[A-Za-z]{1,8}(?:-[A-Za-z0-9]{1,8})*)\s*"
+    r"(?:;\s*[qQ]\s*=\s*(0(?:\.[0-9]{0,3})?|1(?:\.0{0,3})?)\s*)?"
+)
 
 # ---------- helpers ----------
 
+# Load the route manifest: {page path: bit mask of its languages}, {code: bit}
+def _load_routes(path):
+    """Return (pages, bit per language); two empty dicts if there is no manifest."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}, {}
+    # Bit i of a mask stands for manifest["languages"][i]
+    return manifest["pages"], {code: 1 << i for i, code in enumerate(manifest["languages"])}
+
+# Loaded once per container, not per request
+ROUTES, LANG_BIT = _load_routes(ROUTES_FILE)
+
 # Parse the prefLang cookie from headers and return the language code
 def _parse_lang_cookie(headers):
     """Return the two-letter code from prefLang cookie, or None."""
@@ -35,20 +73,81 @@ def _pick_from_accept_language(headers):
     # If not present, return default
     if not al:
         return DEFAULT
-    langs = []
-    # Parse each language entry
-    for part in al[0]["value"].split(","):
-        m = re.match(r"\s*([A-Za-z\-]{2,})(?:;\s*q=([0-9.]+))?", part)
-        if m:
-            code = m.group(1).lower()[:2]
-            q    = float(m.group(2)) if m.group(2) else 1.0
-            langs.append((code, q))
-    # Sort by q value and return first supported
-    for code, _ in sorted(langs, key=lambda x: x[1], reverse=True):
-        if code in SUPPORTED:
+    # The same header strings arrive again and again: answer them from the cache
+    return _negotiate(al[0]["value"])[0]
+
+# Rank the supported languages for one Accept-Language value, in a single pass over it
+@functools.lru_cache(maxsize=AL_CACHE_SIZE)
+def _negotiate(value):
+    """
+    Return the acceptable supported languages, best first, ending with the default
+    language if it is not among them. Highest q wins, earlier elements win ties.
+    A regional range stands in for its language ("pt-BR" → pt), and "*" for the
+    default language if no element names it. q=0 means "not acceptable": "fr;q=0"
+    rules out fr even when "fr-CA" is listed. Malformed elements are skipped.
+    """
+    exact, regional = {}, {}                 # supported code -> (q, -position) of its best element
+    wildcard = None
+    for pos, part in enumerate(value.split(",")):
+        m = _AL_ELEMENT.fullmatch(part)
+        if not m:
+            continue
+        rng, q = m.group(1).lower(), float(m.group(2) or 1)
+        if rng == "*":
+            wildcard = wildcard or (q, -pos)
+            continue
+        code, sep, _ = rng.partition("-")
+        if code not in SUPPORTED:
+            continue
+        target = regional if sep else exact
+        # The first element of a range counts; of several regions, the best one
+        if code not in target or (sep and q > target[code][0]):
+            target[code] = (q, -pos)
+    # Sort by (q, -position): higher q first, then the earlier element
+    ranked = []
+    for code in exact.keys() | regional.keys():
+        if exact.get(code, (1.0,))[0] == 0:
+            continue
+        rank = max(exact.get(code, (0.0, 0)), regional.get(code, (0.0, 0)))
+        if rank[0] > 0:
+            ranked.append((rank, code))
+    if wildcard and wildcard[0] > 0 and DEFAULT not in exact and DEFAULT not in regional:
+        ranked.append((wildcard, DEFAULT))
+    order = tuple(code for _, code in sorted(ranked, reverse=True))
+    # If none supported (or acceptable), the default comes first; it is always the last resort
+    return order if DEFAULT in order else order + (DEFAULT,)
+
+# The visitor's languages, best first: the cookie, then Accept-Language, then the default
+def _preferences(cookie_lang, headers):
+    al = headers.get("accept-language")
+    order = _negotiate(al[0]["value"]) if al else (DEFAULT,)
+    return (cookie_lang, *order) if cookie_lang else order
+
+# The manifest key of a path below a language root: "" and "talks/" mean their index.html
+def _page_key(rest):
+    return rest + "index.html" if rest == "" or rest.endswith("/") else rest
+
+# Languages a page exists in, as a bit mask; 0 if the manifest does not list it
+def _page_langs(key):
+    return ROUTES.get(key, 0)
+
+# Whether reading a page in another language than the cookie's is the visitor's choice:
+# yes, unless the manifest says the cookie's language has no version of the page
+# (a page the manifest does not list, or no manifest at all, gives no such reason)
+def _chosen_over_cookie(cookie_lang, key):
+    mask = _page_langs(key)
+    return not cookie_lang or not mask or bool(mask & LANG_BIT.get(cookie_lang, 0))
+
+# The first of the preferred languages the page exists in; else the first that has it
+def _best_available(prefs, mask):
+    for code in prefs:
+        if mask & LANG_BIT.get(code, 0):
             return code
-    # If none supported, return default
-    return DEFAULT
+    return next(code for code, bit in LANG_BIT.items() if mask & bit)
+
+# The URI of a page in a language: English at the root, the others under their prefix
+def _page_uri(code, key):
+    return f"/{key}" if code == DEFAULT else f"/{code}/{key}"
 
 # Build a redirect response for CloudFront
 def _redirect(loc, set_cookie=None, permanent=False):
@@ -67,14 +166,39 @@ def _redirect(loc, set_cookie=None, permanent=False):
         "headers": hdrs,
     }
 
+# Refresh the cookie without changing the page the visitor gets
+def _refresh_cookie(req, lang):
+    # Old behaviour: send the browser back to the same URI with Set-Cookie
+    if COOKIE_MODE == "redirect":
+        return _redirect(req["uri"], set_cookie=SET_COOKIE[lang], permanent=True)
+    # Let the request through; _viewer_response adds Set-Cookie to its response
+    req["headers"][COOKIE_HANDOFF] = [{"key": "X-Pref-Lang-Set", "value": lang}]
+    return req
+
+# Add the Set-Cookie the viewer-request run asked for to the response
+def _viewer_response(cf):
+    resp = cf["response"]
+    # The request as the viewer-request run left it
+    lang = cf["request"]["headers"].get(COOKIE_HANDOFF)
+    if lang and lang[0]["value"] in SUPPORTED:
+        resp["headers"].setdefault("set-cookie", []).append(
+            {"key": "Set-Cookie", "value": SET_COOKIE[lang[0]["value"]]})
+    return resp
+
 # ---------- Lambda handler ----------
 
-# Main Lambda handler for CloudFront events
+# Main Lambda handler for CloudFront events: one function on both triggers
 def handler(event, context):
+    cf = event["Records"][0]["cf"]
+    if cf.get("config", {}).get("eventType") == "viewer-response":
+        return _viewer_response(cf)
+
     # Extract request and headers from event
-    req     = event["Records"][0]["cf"]["request"]
+    req     = cf["request"]
     headers = req["headers"]
     uri     = req["uri"]
+    # Only this function may ask for a cookie, not the viewer
+    headers.pop(COOKIE_HANDOFF, None)
 
     # 1) Honour cookie first
     cookie_lang = _parse_lang_cookie(headers)
@@ -85,38 +209,42 @@ def handler(event, context):
         lang = _pick_from_accept_language(headers)
 
     # 2) Requests that *already specify* a language stay as-is
-    for l in SUPPORTED - {DEFAULT}:
-        # If URI matches a supported language
-        if uri == f"/{l}" or uri.startswith(f"/{l}/"):
-            # Normalise bare "/es" → "/es/index.html"
-            if uri == f"/{l}":
-                return _redirect(f"/{l}/index.html", permanent=True)
-            # If user browsed to a *different* language than the cookie,
-            # refresh the cookie so future root requests match.
-            if cookie_lang != l:
-                return _redirect(
-                    uri,
-                    set_cookie=f"{COOKIE}={l}; Path=/; Max-Age=31536000; SameSite=Lax",
-                    permanent=True,
-                )
-            # Otherwise, just return the request as-is
-            return req
+    # The first path segment is the language, if it is one of ours ("/es", "/es/...")
+    l, sep, rest = uri[1:].partition("/")
+    if uri.startswith("/") and l in PREFIXED:
+        # Normalise bare "/es" → "/es/index.html"
+        if not sep:
+            return _redirect(f"/{l}/index.html", permanent=True)
+        # The page was never translated to l: send the visitor to the best version
+        # that exists instead of into a 404 (pages the manifest does not list go on)
+        key  = _page_key(rest)
+        mask = _page_langs(key)
+        if mask and not mask & LANG_BIT.get(l, 0):
+            code = _best_available(_preferences(cookie_lang, headers), mask)
+            return _redirect(_page_uri(code, key))
+        # If user browsed to a *different* language than the cookie,
+        # refresh the cookie so future root requests match.
+        if cookie_lang != l and _chosen_over_cookie(cookie_lang, key):
+            return _refresh_cookie(req, l)
+        # Otherwise, just return the request as-is
+        return req
 
     # 3) Root request: maybe redirect to preferred non-English language
-    if uri in ("", "/", "/index.html") and lang != DEFAULT:
-        return _redirect(
-            f"/{lang}/index.html",
-            set_cookie=f"{COOKIE}={lang}; Path=/; Max-Age=31536000; SameSite=Lax",
-        )
-
-    # 4) Everything else (English paths) — ensure cookie is set to en
-    if cookie_lang != DEFAULT:
+    if uri in ("", "/", "/index.html"):
+        mask = _page_langs("index.html")
+        # No home page in that language: the best one there is, and the cookie
+        # stays as it is (the visitor did not choose this language)
+        if mask and not mask & LANG_BIT.get(lang, 0):
+            code = _best_available(_preferences(cookie_lang, headers), mask)
+            return req if code == DEFAULT else _redirect(_page_uri(code, "index.html"))
+        if lang != DEFAULT:
+            return _redirect(f"/{lang}/index.html", set_cookie=SET_COOKIE[lang])
+
+    # 4) Everything else (English paths) — ensure cookie is set to en, unless the
+    # visitor reads English only because their language has no version of the page
+    if cookie_lang != DEFAULT and _chosen_over_cookie(cookie_lang, _page_key(uri[1:])):
         # keep serving the object but refresh the cookie once
-        return _redirect(
-            uri,
-            set_cookie=f"{COOKIE}=en; Path=/; Max-Age=31536000; SameSite=Lax",
-            permanent=True,
-        )
+        return _refresh_cookie(req, DEFAULT)
 
     # Return the request unchanged if no redirect is needed
     return req
@@ -7,13 +7,28 @@ resource "aws_lambda_function" "terraform_lambda_func" {
   runtime       = "python3.13"
   depends_on    = [aws_iam_role_policy_attachment.attach_iam_policy_to_iam_role]
   publish       = true
+  # A new manifest or code publishes a new version, which CloudFront then uses
+  source_code_hash = data.archive_file.zip_the_python_code.output_base64sha256
 }
 
-# Archive the Python code into a zip file for Lambda deployment
+# Archive the Python code into a zip file for Lambda deployment,
+# with the route manifest if lambda/build_routes.py has written one.
+# The manifest is a snapshot of the website bucket: the pipeline does not rebuild
+# it, so rebuild it and apply again whenever the pipeline adds pages or translations
 data "archive_file" "zip_the_python_code" {
   type        = "zip"
-  source_file = "${path.module}/lambda/lambda.py"
   output_path = "${path.module}/lambda/lambda.zip"
+  source {
+    content  = file("${path.module}/lambda/lambda.py")
+    filename = "lambda.py"
+  }
+  dynamic "source" {
+    for_each = fileexists("${path.module}/lambda/routes.json") ? ["routes.json"] : []
+    content {
+      content  = file("${path.module}/lambda/${source.value}")
+      filename = source.value
+    }
+  }
 }
 
 # IAM role for Lambda@Edge function